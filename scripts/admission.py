@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""Admission control for the socket listeners.
+
+Every accepted connection is checked before a handler, thread or SSH key
+exchange is spent on it:
+
+- a token bucket per source IP limits how fast one address may connect;
+- a per-IP cap limits how many sessions one address may hold open;
+- a global cap limits concurrent sessions across all listeners;
+- a global token bucket limits the overall connection rate.
+
+The per-IP checks run first, so a single noisy scanner is shed without
+using up the global budget. A shed connection is closed at once, or held
+open without a handler (tarpitted) for a while to slow the scanner down.
+Admitted and shed connections are counted and summarised periodically.
+"""
+
+import asyncio
+import time
+from collections import Counter, OrderedDict
+
+import settings
+
+# Source IPs whose buckets and session counts are remembered
+MAX_TRACKED_IPS = 65536
+# Shed IPs named in each summary, at most
+MAX_REPORTED_IPS = 10
+
+
+class Bucket:
+    __slots__ = ('tokens', 'updated')
+
+    def __init__(self, capacity, now):
+        self.tokens = capacity
+        self.updated = now
+
+    def take(self, rate, capacity, now):
+        """Spend one token if there is one"""
+        self.tokens = min(capacity, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class Admission:
+    """Admission state shared by the listeners on one event loop"""
+
+    def __init__(self, max_sessions=None, ip_sessions=None, ip_rate=None, ip_burst=None,
+                 accept_rate=None, accept_burst=None, tarpit=None, max_tarpit=None, workers=1):
+        self.max_sessions = settings.ADMISSION_MAX_SESSIONS if max_sessions is None else max_sessions
+        self.ip_sessions = settings.ADMISSION_IP_SESSIONS if ip_sessions is None else ip_sessions
+        self.ip_rate = settings.ADMISSION_IP_RATE if ip_rate is None else ip_rate
+        self.ip_burst = settings.ADMISSION_IP_BURST if ip_burst is None else ip_burst
+        self.accept_rate = settings.ADMISSION_ACCEPT_RATE if accept_rate is None else accept_rate
+        self.accept_burst = settings.ADMISSION_ACCEPT_BURST if accept_burst is None else accept_burst
+        self.tarpit_seconds = settings.ADMISSION_TARPIT if tarpit is None else tarpit
+        self.max_tarpit = settings.ADMISSION_MAX_TARPIT if max_tarpit is None else max_tarpit
+        if workers > 1:
+            # One of several processes sharing a port: the kernel spreads
+            # connections evenly, so each enforces its share of the limits
+            self.max_sessions = -(-self.max_sessions // workers)
+            self.ip_sessions = -(-self.ip_sessions // workers)
+            self.ip_rate /= workers
+            self.ip_burst = max(self.ip_burst / workers, 1)
+            self.accept_rate /= workers
+            self.accept_burst = max(self.accept_burst / workers, 1)
+            self.max_tarpit = -(-self.max_tarpit // workers)
+
+        now = time.monotonic()
+        self.accept_bucket = Bucket(self.accept_burst, now)
+        # ip -> [Bucket, open sessions], least recently seen first
+        self.ips = OrderedDict()
+        self.sessions = 0
+        self.tarpitted = 0
+        self.counts = Counter()
+        self.shed_ips = Counter()
+
+    def _ip_state(self, ip, now):
+        state = self.ips.get(ip)
+        if state is None:
+            state = self.ips[ip] = [Bucket(self.ip_burst, now), 0]
+            if len(self.ips) > MAX_TRACKED_IPS:
+                self._evict()
+        else:
+            self.ips.move_to_end(ip)
+        return state
+
+    def _evict(self):
+        # Forget the least recently seen IP without open sessions
+        for ip, (_, open_sessions) in self.ips.items():
+            if not open_sessions:
+                del self.ips[ip]
+                return
+
+    def admit(self, ip):
+        """Return None and open a session if the connection is admitted,
+        otherwise the reason it was shed"""
+        now = time.monotonic()
+        state = self._ip_state(ip, now)
+        if self.ip_rate and not state[0].take(self.ip_rate, self.ip_burst, now):
+            reason = 'ip_rate'
+        elif self.ip_sessions and state[1] >= self.ip_sessions:
+            reason = 'ip_sessions'
+        elif self.max_sessions and self.sessions >= self.max_sessions:
+            reason = 'sessions'
+        elif self.accept_rate and not self.accept_bucket.take(self.accept_rate, self.accept_burst, now):
+            reason = 'rate'
+        else:
+            state[1] += 1
+            self.sessions += 1
+            self.counts['admitted'] += 1
+            return None
+        self.counts['shed'] += 1
+        self.counts[reason] += 1
+        self.shed_ips[ip] += 1
+        return reason
+
+    def release(self, ip):
+        """Close a session opened by admit()"""
+        self.sessions -= 1
+        state = self.ips.get(ip)
+        if state is not None and state[1] > 0:
+            state[1] -= 1
+
+    def should_tarpit(self):
+        return self.tarpit_seconds > 0 and self.tarpitted < self.max_tarpit
+
+    async def hold(self, close):
+        """Keep a shed connection open for the tarpit time, then close it"""
+        self.tarpitted += 1
+        self.counts['tarpitted'] += 1
+        try:
+            await asyncio.sleep(self.tarpit_seconds)
+        finally:
+            self.tarpitted -= 1
+            close()
+
+    def shed(self, close):
+        """Dispose of a shed connection by tarpitting or closing it"""
+        if self.should_tarpit():
+            asyncio.ensure_future(self.hold(close))
+        else:
+            close()
+
+    def wrap(self, handler):
+        """Guard an asyncio stream handler with admission control"""
+        async def admitted_handler(reader, writer):
+            ip = (writer.get_extra_info('peername') or ('',))[0]
+            if self.admit(ip) is not None:
+                writer.transport.pause_reading()
+                self.shed(writer.transport.abort)
+                return
+            try:
+                await handler(reader, writer)
+            finally:
+                self.release(ip)
+        return admitted_handler
+
+    def summary(self):
+        counts = self.counts
+        line = (f"[+] Admission: {counts['admitted']} admitted, {counts['shed']} shed "
+                f"(ip rate {counts['ip_rate']}, ip sessions {counts['ip_sessions']}, "
+                f"sessions {counts['sessions']}, rate {counts['rate']}), "
+                f"{counts['tarpitted']} tarpitted, {self.sessions} open")
+        if self.shed_ips:
+            top = ', '.join(f"{ip} ({n})" for ip, n in self.shed_ips.most_common(MAX_REPORTED_IPS))
+            line += f"\n[!] Shed connections from: {top}"
+        return line
+
+    async def report(self, interval=None):
+        """Print a summary every interval while anything changes"""
+        interval = interval or settings.ADMISSION_REPORT_INTERVAL
+        last = None
+        while True:
+            await asyncio.sleep(interval)
+            current = (self.counts['admitted'], self.counts['shed'])
+            if current != last:
+                print(self.summary())
+                last = current
+            self.shed_ips.clear()
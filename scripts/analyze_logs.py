@@ -1,173 +1,359 @@
 #!/usr/bin/env python3
 
+import argparse
+import functools
 import json
 import os
 import sys
 import datetime
 from collections import Counter
 
-def load_logs(log_file):
-    entries = []
+import settings
+from codec import decoder_for
+from parallel import aggregate, log_shards
+from segments import open_segment
+from sketches import ExactCounter, make_counter, make_distinct
+
+def iter_logs(log_file):
+    """Yield parsed entries from a log file one at a time"""
+    decoder = decoder_for(log_file)
     try:
-        with open(log_file, 'r') as f:
-            for line in f:
-                try:
-                    entries.append(json.loads(line.strip()))
-                except:
-                    pass
+        with open_segment(log_file) as f:
+            yield from decoder.iter_lines(f)
     except FileNotFoundError:
         print(f"[!] Log file not found: {log_file}")
-    return entries
+    decoder.report(log_file)
+
+def load_logs(log_file):
+    return list(iter_logs(log_file))
 
 def load_geo_data():
     try:
-        with open("../logs/geolocation.json", "r") as f:
+        with open(os.path.join(settings.LOGS_DIR, 'geolocation.json'), "r") as f:
             return json.load(f)
     except FileNotFoundError:
         return {}
 
-def analyze_auth_attempts(entries, geo_data):
+class LogStats:
+    """Single-pass aggregates for the auth, web and FTP logs.
+
+    Memory grows with the number of distinct keys, not the number of events.
+    With a non-zero error the high-cardinality tallies become SpaceSaving
+    sketches and the unique-IP set a HyperLogLog, so memory stays bounded.
+    Entries outside [since, until), given as ISO timestamps, are skipped.
+    """
+
+    def __init__(self, geo_data=None, error=None, since=None, until=None):
+        self.geo_data = geo_data or {}
+        self.since = since
+        self.until = until
+        self.totals = Counter(auth=0, web=0, ftp=0)
+        self.all_ips = make_distinct(error)
+        self.all_countries = set()
+
+        self.auth_services = ExactCounter()
+        self.auth_ips = make_counter(error)
+        self.usernames = make_counter(error)
+        self.passwords = make_counter(error)
+        self.combos = make_counter(error)
+        self.countries = ExactCounter()
+
+        self.web_ips = make_counter(error)
+        self.paths = make_counter(error)
+        self.agents = make_counter(error)
+
+        self.ftp_ips = make_counter(error)
+        self.commands = make_counter(error)
+
+    def _add_ip(self, ip):
+        self.all_ips.add(ip)
+        if ip in self.geo_data:
+            country = self.geo_data[ip].get('country', 'Unknown')
+            self.all_countries.add(country)
+            return country
+        return None
+
+    def _in_window(self, entry):
+        if self.since is None and self.until is None:
+            return True
+        timestamp = entry.get('timestamp', '')
+        return (self.since is None or timestamp >= self.since) and \
+            (self.until is None or timestamp < self.until)
+
+    def add_auth(self, entry):
+        if not self._in_window(entry):
+            return
+        self.totals['auth'] += 1
+        country = self._add_ip(entry.get('source_ip', ''))
+        if country is not None:
+            self.countries.add(country)
+        username = entry.get('username', 'unknown')
+        password = entry.get('password', 'unknown')
+        self.auth_services.add(entry.get('service', 'unknown'))
+        self.auth_ips.add(entry.get('source_ip', 'unknown'))
+        self.usernames.add(username)
+        self.passwords.add(password)
+        self.combos.add((username, password))
+
+    def add_web(self, entry):
+        if not self._in_window(entry):
+            return
+        self.totals['web'] += 1
+        self._add_ip(entry.get('source_ip', ''))
+        self.web_ips.add(entry.get('source_ip', 'unknown'))
+        self.paths.add(entry.get('path', 'unknown'))
+        self.agents.add(entry.get('user_agent', 'unknown'))
+
+    def add_ftp(self, entry):
+        if not self._in_window(entry):
+            return
+        self.totals['ftp'] += 1
+        self._add_ip(entry.get('source_ip', ''))
+        self.ftp_ips.add(entry.get('source_ip', 'unknown'))
+        self.commands.add(entry.get('command', 'unknown'))
+
+    def update(self, other):
+        """Merge the aggregates of another LogStats, e.g. from another shard"""
+        self.totals.update(other.totals)
+        self.all_ips.update(other.all_ips)
+        self.all_countries.update(other.all_countries)
+        for name in ('auth_services', 'auth_ips', 'usernames', 'passwords', 'combos',
+                     'countries', 'web_ips', 'paths', 'agents', 'ftp_ips', 'commands'):
+            getattr(self, name).update(getattr(other, name))
+
+    def __getstate__(self):
+        # Partial results travel between processes without the geo table
+        state = self.__dict__.copy()
+        state['geo_data'] = None
+        return state
+
+    def auth_stats(self):
+        return {
+            'services': self.auth_services,
+            'ips': self.auth_ips,
+            'usernames': self.usernames,
+            'passwords': self.passwords,
+            'combos': self.combos,
+            'countries': self.countries,
+        }
+
+    def web_stats(self):
+        return {'ips': self.web_ips, 'paths': self.paths, 'agents': self.agents}
+
+    def ftp_stats(self):
+        return {'ips': self.ftp_ips, 'commands': self.commands}
+
+def count_auth_attempts(entries, geo_data):
+    stats = LogStats(geo_data)
+    for entry in entries:
+        stats.add_auth(entry)
+    return stats.auth_stats()
+
+def print_top_ips(ips, geo_data):
+    for ip, count in ips.most_common(10):
+        location = "Unknown"
+        if ip in geo_data:
+            location = f"{geo_data[ip].get('city', 'Unknown')}, {geo_data[ip].get('country', 'Unknown')}"
+        print(f"  {ip} ({location}): {count}")
+
+def print_auth_attempts(stats, geo_data):
     print("\n=== Authentication Attempts Analysis ===\n")
 
 
-    services = Counter(entry.get('service', 'unknown') for entry in entries)
     print("Attempts by Service:")
-    for service, count in services.most_common():
+    for service, count in stats['services'].most_common():
         print(f"  {service}: {count}")
 
 
-    ips = Counter(entry.get('source_ip', 'unknown') for entry in entries)
     print("\nTop 10 Source IPs:")
-    for ip, count in ips.most_common(10):
-        location = "Unknown"
-        if ip in geo_data:
-            location = f"{geo_data[ip].get('city', 'Unknown')}, {geo_data[ip].get('country', 'Unknown')}"
-        print(f"  {ip} ({location}): {count}")
+    print_top_ips(stats['ips'], geo_data)
 
 
-    usernames = Counter(entry.get('username', 'unknown') for entry in entries)
     print("\nTop 10 Usernames:")
-    for username, count in usernames.most_common(10):
+    for username, count in stats['usernames'].most_common(10):
         print(f"  {username}: {count}")
 
 
-    passwords = Counter(entry.get('password', 'unknown') for entry in entries)
     print("\nTop 10 Passwords:")
-    for password, count in passwords.most_common(10):
+    for password, count in stats['passwords'].most_common(10):
         print(f"  {password}: {count}")
 
 
-    combos = Counter((entry.get('username', 'unknown'), entry.get('password', 'unknown')) for entry in entries)
     print("\nTop 10 Username/Password Combinations:")
-    for (username, password), count in combos.most_common(10):
+    for (username, password), count in stats['combos'].most_common(10):
         print(f"  {username}:{password} - {count}")
 
 
-    countries = Counter()
-    for entry in entries:
-        ip = entry.get('source_ip', '')
-        if ip in geo_data:
-            country = geo_data[ip].get('country', 'Unknown')
-            countries[country] += 1
-
     print("\nAttacks by Country:")
-    for country, count in countries.most_common():
+    for country, count in stats['countries'].most_common():
         print(f"  {country}: {count}")
 
-def analyze_web_visits(entries, geo_data):
+def analyze_auth_attempts(entries, geo_data):
+    print_auth_attempts(count_auth_attempts(entries, geo_data), geo_data)
+
+def count_web_visits(entries):
+    stats = LogStats()
+    for entry in entries:
+        stats.add_web(entry)
+    return stats.web_stats()
+
+def print_web_visits(stats, geo_data):
     print("\n=== Web Visits Analysis ===\n")
 
 
-    ips = Counter(entry.get('source_ip', 'unknown') for entry in entries)
     print("Top 10 Source IPs:")
-    for ip, count in ips.most_common(10):
-        location = "Unknown"
-        if ip in geo_data:
-            location = f"{geo_data[ip].get('city', 'Unknown')}, {geo_data[ip].get('country', 'Unknown')}"
-        print(f"  {ip} ({location}): {count}")
+    print_top_ips(stats['ips'], geo_data)
 
 
-    paths = Counter(entry.get('path', 'unknown') for entry in entries)
     print("\nRequested Paths:")
-    for path, count in paths.most_common():
+    for path, count in stats['paths'].most_common():
         print(f"  {path}: {count}")
 
 
-    agents = Counter(entry.get('user_agent', 'unknown') for entry in entries)
     print("\nTop 10 User Agents:")
-    for agent, count in agents.most_common(10):
+    for agent, count in stats['agents'].most_common(10):
         print(f"  {agent}: {count}")
 
-def analyze_ftp_commands(entries, geo_data):
+def analyze_web_visits(entries, geo_data):
+    print_web_visits(count_web_visits(entries), geo_data)
+
+def count_ftp_commands(entries):
+    stats = LogStats()
+    for entry in entries:
+        stats.add_ftp(entry)
+    return stats.ftp_stats()
+
+def print_ftp_commands(stats, geo_data):
     print("\n=== FTP Commands Analysis ===\n")
 
 
-    ips = Counter(entry.get('source_ip', 'unknown') for entry in entries)
     print("Top 10 Source IPs:")
-    for ip, count in ips.most_common(10):
-        location = "Unknown"
-        if ip in geo_data:
-            location = f"{geo_data[ip].get('city', 'Unknown')}, {geo_data[ip].get('country', 'Unknown')}"
-        print(f"  {ip} ({location}): {count}")
+    print_top_ips(stats['ips'], geo_data)
 
 
-    commands = Counter(entry.get('command', 'unknown') for entry in entries)
     print("\nTop FTP Commands:")
-    for command, count in commands.most_common():
+    for command, count in stats['commands'].most_common():
         print(f"  {command}: {count}")
 
-def main():
-    print("=== Honeypot Log Analysis ===")
+def analyze_ftp_commands(entries, geo_data):
+    print_ftp_commands(count_ftp_commands(entries), geo_data)
 
-    auth_log = "../logs/auth_attempts.json"
-    web_log = "../logs/web_visits.json"
-    ftp_log = "../logs/ftp_commands.json"
+def print_overall(totals, unique_ips, countries):
+    print("\n=== Overall Statistics ===\n")
+    print(f"Total authentication attempts: {totals['auth']}")
+    print(f"Total web visits: {totals['web']}")
+    print(f"Total FTP commands: {totals['ftp']}")
 
-    auth_entries = load_logs(auth_log)
-    web_entries = load_logs(web_log)
-    ftp_entries = load_logs(ftp_log)
-    geo_data = load_geo_data()
+    print(f"Unique IP addresses: {unique_ips}")
 
-    if auth_entries:
-        analyze_auth_attempts(auth_entries, geo_data)
+    print(f"Countries detected: {len(countries)}")
+    print(f"Countries: {', '.join(sorted(countries))}")
+
+def print_stats(stats, geo_data):
+    if stats.totals['auth']:
+        print_auth_attempts(stats.auth_stats(), geo_data)
     else:
         print("[!] No authentication attempts found.")
 
-    if web_entries:
-        analyze_web_visits(web_entries, geo_data)
+    if stats.totals['web']:
+        print_web_visits(stats.web_stats(), geo_data)
     else:
         print("[!] No web visits found.")
 
-    if ftp_entries:
-        analyze_ftp_commands(ftp_entries, geo_data)
+    if stats.totals['ftp']:
+        print_ftp_commands(stats.ftp_stats(), geo_data)
     else:
         print("[!] No FTP commands found.")
 
+    print_overall(stats.totals, len(stats.all_ips), stats.all_countries)
+
+def analyze_store(store, geo_data):
+    """Run the same analysis with SQL aggregates over the event store, or
+    with Arrow aggregates over the Parquet archive"""
+    totals = {log: store.count(log) for log in ('auth', 'web', 'ftp')}
+
+    if totals['auth']:
+        ip_counts = store.counts('auth', 'source_ip')
+        countries = Counter()
+        for ip, count in ip_counts.items():
+            if ip in geo_data:
+                countries[geo_data[ip].get('country', 'Unknown')] += count
+        print_auth_attempts({
+            'services': store.counts('auth', 'service'),
+            'ips': Counter(dict(ip_counts.most_common(10))),
+            'usernames': store.counts('auth', 'username', limit=10),
+            'passwords': store.counts('auth', 'password', limit=10),
+            'combos': store.combo_counts(10),
+            'countries': countries,
+        }, geo_data)
+    else:
+        print("[!] No authentication attempts found.")
 
-    print("\n=== Overall Statistics ===\n")
-    print(f"Total authentication attempts: {len(auth_entries)}")
-    print(f"Total web visits: {len(web_entries)}")
-    print(f"Total FTP commands: {len(ftp_entries)}")
+    if totals['web']:
+        print_web_visits({
+            'ips': store.counts('web', 'source_ip', limit=10),
+            'paths': store.counts('web', 'path'),
+            'agents': store.counts('web', 'user_agent', limit=10),
+        }, geo_data)
+    else:
+        print("[!] No web visits found.")
 
+    if totals['ftp']:
+        print_ftp_commands({
+            'ips': store.counts('ftp', 'source_ip', limit=10),
+            'commands': store.counts('ftp', 'command'),
+        }, geo_data)
+    else:
+        print("[!] No FTP commands found.")
 
-    all_ips = set()
-    for entry in auth_entries:
-        all_ips.add(entry.get('source_ip', ''))
-    for entry in web_entries:
-        all_ips.add(entry.get('source_ip', ''))
-    for entry in ftp_entries:
-        all_ips.add(entry.get('source_ip', ''))
+    all_ips = store.distinct('source_ip')
+    countries = {geo_data[ip].get('country', 'Unknown') for ip in all_ips if ip in geo_data}
+    print_overall(totals, len(all_ips), countries)
 
-    print(f"Unique IP addresses: {len(all_ips)}")
+def main():
+    parser = argparse.ArgumentParser(description="Analyze honeypot logs")
+    parser.add_argument('--backend', choices=('json', 'sqlite', 'archive'),
+                        default='json' if settings.LOG_BACKEND == 'json' else 'sqlite')
+    parser.add_argument('--workers', type=int, default=1,
+                        help="parse logs in this many processes (1 = serial)")
+    parser.add_argument('--error', type=float, default=settings.SKETCH_ERROR,
+                        help="relative error for approximate top-N and unique counts (0 = exact)")
+    parser.add_argument('--since', help="only count events at or after this ISO timestamp (json backend)")
+    parser.add_argument('--until', help="only count events before this ISO timestamp (json backend)")
+    args = parser.parse_args()
 
+    print("=== Honeypot Log Analysis ===")
 
-    countries = set()
-    for ip in all_ips:
-        if ip in geo_data:
-            countries.add(geo_data[ip].get('country', 'Unknown'))
+    geo_data = load_geo_data()
 
-    print(f"Countries detected: {len(countries)}")
-    print(f"Countries: {', '.join(sorted(countries))}")
+    if args.backend == 'sqlite':
+        from event_store import EventStore
+        analyze_store(EventStore(), geo_data)
+        return
+    if args.backend == 'archive':
+        from archive import Archive
+        analyze_store(Archive(), geo_data)
+        return
+
+    # Rotated segments entirely outside the window are not read at all
+    jobs = [
+        (log_shards(os.path.join(settings.LOGS_DIR, 'auth_attempts.json'), args.since, args.until), 'add_auth'),
+        (log_shards(os.path.join(settings.LOGS_DIR, 'web_visits.json'), args.since, args.until), 'add_web'),
+        (log_shards(os.path.join(settings.LOGS_DIR, 'ftp_commands.json'), args.since, args.until), 'add_ftp'),
+    ]
+
+    factory = functools.partial(LogStats, geo_data, args.error, args.since, args.until)
+    if args.workers > 1:
+        stats = aggregate(jobs, factory, args.workers)
+    else:
+        stats = factory()
+        for paths, method in jobs:
+            add = getattr(stats, method)
+            for path in paths:
+                for entry in iter_logs(path):
+                    add(entry)
+
+    print_stats(stats, geo_data)
 
 if __name__ == "__main__":
     main()
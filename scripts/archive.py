@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""Columnar archive of closed log segments.
+
+Rotated log shards and segments (auth_attempts.json.N, the compressed
+auth_attempts.json-<time> files and friends) no longer change, so they can
+be converted once into zstd-compressed Parquet files partitioned by day and
+service:
+
+    archive/auth/day=2024-05-01/service=ssh/part-<fingerprint>.parquet
+
+IPs, usernames, passwords and the other repetitive text columns are
+dictionary encoded. A manifest records the fingerprint of every shard that
+has been converted, so rotation renumbering a shard does not archive it
+twice. The live log files are never archived.
+
+Archive answers the same queries as EventStore with vectorized Arrow
+kernels that only read the columns they need, so analyze_logs.py and
+generate_report.py run over it with ``--backend archive``. Needs pyarrow.
+"""
+
+import argparse
+import datetime
+import hashlib
+import json
+import os
+from collections import Counter
+
+import segments
+import settings
+from codec import decoder_for
+from event_store import COLUMNS, LOGS
+from parallel import log_shards
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+MANIFEST = 'manifest.json'
+# Columns stored in every part file; day and service live in the path
+STORED = tuple(c for c in COLUMNS if c != 'service')
+DICTIONARY_COLUMNS = ('source_ip', 'username', 'password', 'command', 'path', 'user_agent')
+FINGERPRINT_BYTES = 64 * 1024
+
+
+def require_pyarrow():
+    if pa is None:
+        raise SystemExit("[-] The Parquet archive needs pyarrow: pip3 install pyarrow")
+
+
+def schema():
+    fields = []
+    for column in STORED:
+        if column == 'timestamp':
+            fields.append(pa.field(column, pa.timestamp('us')))
+        elif column == 'source_port':
+            fields.append(pa.field(column, pa.int32()))
+        elif column in DICTIONARY_COLUMNS:
+            fields.append(pa.field(column, pa.dictionary(pa.int32(), pa.string())))
+        else:
+            fields.append(pa.field(column, pa.string()))
+    return pa.schema(fields)
+
+
+def partitioning():
+    return ds.partitioning(pa.schema([('day', pa.string()), ('service', pa.string())]), flavor='hive')
+
+
+def fingerprint(path):
+    """Identify a closed shard by its size and the bytes at both ends"""
+    size = os.path.getsize(path)
+    digest = hashlib.sha1(str(size).encode())
+    with open(path, 'rb') as f:
+        digest.update(f.read(FINGERPRINT_BYTES))
+        if size > FINGERPRINT_BYTES:
+            f.seek(max(FINGERPRINT_BYTES, size - FINGERPRINT_BYTES))
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def parse_timestamp(value):
+    """Naive datetime for an ISO timestamp (UTC if it carried an offset)"""
+    try:
+        dt = datetime.datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def _safe(value):
+    return str(value).replace('/', '_').replace(os.sep, '_') or 'unknown'
+
+
+def partition_shard(path):
+    """Parse one shard into {(day, service): {column: values}}"""
+    partitions = {}
+    decoder = decoder_for(path)
+    with segments.open_segment(path) as f:
+        for entry in decoder.iter_lines(f):
+            timestamp = parse_timestamp(entry.get('timestamp'))
+            day = timestamp.date().isoformat() if timestamp else 'undated'
+            key = (day, _safe(entry.get('service', 'unknown')))
+            columns = partitions.get(key)
+            if columns is None:
+                columns = partitions[key] = {column: [] for column in STORED}
+            columns['timestamp'].append(timestamp)
+            for column in STORED[1:]:
+                value = entry.get(column)
+                if column == 'source_port':
+                    value = value if isinstance(value, int) else None
+                elif value is not None and not isinstance(value, str):
+                    value = str(value)
+                columns[column].append(value)
+    decoder.report(path)
+    return partitions
+
+
+def write_part(path, columns, table_schema):
+    table = pa.table({field.name: pa.array(columns[field.name], type=field.type.value_type
+                                           if pa.types.is_dictionary(field.type) else field.type)
+                      for field in table_schema})
+    table = table.cast(table_schema)
+    # Dot-prefixed so readers skip a part that is still being written
+    tmp = os.path.join(os.path.dirname(path), '.' + os.path.basename(path) + '.tmp')
+    pq.write_table(table, tmp, compression='zstd', use_dictionary=list(DICTIONARY_COLUMNS))
+    os.replace(tmp, path)
+
+
+def load_manifest(archive_dir):
+    try:
+        with open(os.path.join(archive_dir, MANIFEST)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_manifest(archive_dir, manifest):
+    path = os.path.join(archive_dir, MANIFEST)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(path + '.tmp', path)
+
+
+def closed_shards(logs_dir):
+    """Yield (log, path) for every rotated shard; the live files and
+    segments still waiting to be compressed are skipped"""
+    for filename, log in LOGS.items():
+        live = os.path.join(logs_dir, filename)
+        pending = set(segments.segments(logs_dir, filename)) - \
+            set(segments.segments(logs_dir, filename, pending=False))
+        for path in log_shards(live):
+            if path != live and path not in pending:
+                yield log, path
+
+
+def archive_logs(logs_dir=None, archive_dir=None):
+    """Convert closed shards not yet in the archive; returns events archived"""
+    require_pyarrow()
+    logs_dir = logs_dir or settings.LOGS_DIR
+    archive_dir = archive_dir or settings.ARCHIVE_DIR
+    os.makedirs(archive_dir, exist_ok=True)
+    manifest = load_manifest(archive_dir)
+    table_schema = schema()
+
+    total = 0
+    for log, path in closed_shards(logs_dir):
+        key = fingerprint(path)
+        if key in manifest:
+            continue
+        events = 0
+        for (day, service), columns in partition_shard(path).items():
+            directory = os.path.join(archive_dir, log, f"day={day}", f"service={service}")
+            os.makedirs(directory, exist_ok=True)
+            # Named after the shard, so a conversion interrupted midway is overwritten on retry
+            write_part(os.path.join(directory, f"part-{key}.parquet"), columns, table_schema)
+            events += len(columns['timestamp'])
+        manifest[key] = {
+            'log': log,
+            'source': os.path.basename(path),
+            'events': events,
+            'archived': datetime.datetime.now().isoformat(),
+        }
+        save_manifest(archive_dir, manifest)
+        total += events
+        print(f"[+] Archived {events} events from {os.path.basename(path)}")
+    return total
+
+
+class Archive:
+    """Read-only queries over the archive, mirroring EventStore"""
+
+    def __init__(self, archive_dir=None):
+        require_pyarrow()
+        self.archive_dir = archive_dir or settings.ARCHIVE_DIR
+        self.datasets = {}
+
+    def close(self):
+        self.datasets.clear()
+
+    def _dataset(self, log):
+        if log not in self.datasets:
+            directory = os.path.join(self.archive_dir, log)
+            if os.path.isdir(directory):
+                full_schema = pa.unify_schemas([schema(), partitioning().schema])
+                self.datasets[log] = ds.dataset(directory, schema=full_schema, format='parquet',
+                                                partitioning=partitioning())
+            else:
+                self.datasets[log] = None
+        return self.datasets[log]
+
+    def _table(self, log, columns, filter=None):
+        dataset = self._dataset(log)
+        if dataset is None:
+            return pa.table({column: pa.array([], type=pa.string()) for column in columns})
+        return dataset.to_table(columns=list(columns), filter=filter)
+
+    @staticmethod
+    def _plain(array):
+        array = array.combine_chunks() if isinstance(array, pa.ChunkedArray) else array
+        return array.dictionary_decode() if pa.types.is_dictionary(array.type) else array
+
+    def count(self, log, service=None):
+        dataset = self._dataset(log)
+        if dataset is None:
+            return 0
+        return dataset.count_rows(filter=ds.field('service') == service if service else None)
+
+    def counts(self, log, column, limit=None, skip_empty=False):
+        """Counter of column values for one log, most common first"""
+        values = self._plain(self._table(log, [column])[column])
+        if skip_empty:
+            values = pc.filter(values, pc.and_(pc.is_valid(values), pc.not_equal(values, '')))
+        counted = pc.value_counts(values)
+        table = pa.table({'value': counted.field('values'), 'n': counted.field('counts')})
+        table = table.sort_by([('n', 'descending')])
+        if limit:
+            table = table.slice(0, limit)
+        return Counter(dict(zip(table['value'].to_pylist(), table['n'].to_pylist())))
+
+    def combo_counts(self, limit=10):
+        table = self._table('auth', ['username', 'password'])
+        table = pa.table({name: self._plain(table[name]) for name in ('username', 'password')})
+        grouped = table.group_by(['username', 'password']).aggregate([([], 'count_all')])
+        grouped = grouped.sort_by([('count_all', 'descending')]).slice(0, limit)
+        return Counter({(u, p): n for u, p, n in zip(grouped['username'].to_pylist(),
+                                                     grouped['password'].to_pylist(),
+                                                     grouped['count_all'].to_pylist())})
+
+    def distinct(self, column, log=None):
+        values = set()
+        for name in ([log] if log else LOGS.values()):
+            values.update(pc.unique(self._plain(self._table(name, [column])[column])).to_pylist())
+        return values
+
+    def hour_counts(self, log='auth'):
+        timestamps = self._table(log, ['timestamp'])['timestamp']
+        hours = [0] * 24
+        if len(timestamps):
+            counted = pc.value_counts(pc.hour(pc.drop_null(timestamps.cast(pa.timestamp('us')))))
+            for hour, count in zip(counted.field('values').to_pylist(), counted.field('counts').to_pylist()):
+                hours[hour] = count
+        return hours
+
+    def recent(self, log='auth', limit=10):
+        dataset = self._dataset(log)
+        if dataset is None:
+            return []
+        columns = list(STORED) + ['service']
+        table = dataset.to_table(columns=columns, filter=ds.field('timestamp').is_valid())
+        table = table.take(pc.select_k_unstable(table, limit, [('timestamp', 'descending')]))
+        table = table.sort_by([('timestamp', 'descending')])
+        entries = []
+        for row in table.to_pylist():
+            entry = {c: v for c, v in row.items() if v is not None}
+            entry['timestamp'] = entry['timestamp'].isoformat()
+            entries.append(entry)
+        return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert closed log shards into the Parquet archive")
+    parser.add_argument('--logs-dir', default=settings.LOGS_DIR)
+    parser.add_argument('--archive-dir', default=settings.ARCHIVE_DIR)
+    args = parser.parse_args()
+
+    total = archive_logs(args.logs_dir, args.archive_dir)
+    print(f"[+] Archived {total} events in {args.archive_dir}")
+
+
+if __name__ == '__main__':
+    main()
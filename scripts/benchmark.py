@@ -0,0 +1,1294 @@
+#!/usr/bin/env python3
+"""Load tests and microbenchmarks for the honeypot components.
+
+Run one benchmark per invocation, e.g. ``python3 benchmark.py idle``.
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def proc_status(pid):
+    """Return (rss_kb, threads) for a process from /proc"""
+    rss = threads = 0
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                rss = int(line.split()[1])
+            elif line.startswith("Threads:"):
+                threads = int(line.split()[1])
+    return rss, threads
+
+
+def wait_for_port(host, port, timeout=10):
+    import socket
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection((host, port), timeout=0.5).close()
+            return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+
+async def open_idle_sessions(host, ports, count, batch=500):
+    sessions = []
+    for start in range(0, count, batch):
+        tasks = [asyncio.open_connection(host, ports[i % len(ports)])
+                 for i in range(start, min(start + batch, count))]
+        for result in await asyncio.gather(*tasks, return_exceptions=True):
+            if not isinstance(result, Exception):
+                sessions.append(result)
+    return sessions
+
+
+def bench_idle(args):
+    """Hold N idle FTP/Telnet sessions open against the asyncio engine"""
+    import engine
+    import ftp_honeypot
+    import telnet_honeypot
+
+    engine.raise_fd_limit()
+    host = '127.0.0.1'
+    ports = [ftp_honeypot.FTP_PORT, telnet_honeypot.TELNET_PORT]
+    server = subprocess.Popen(
+        ['taskset', '-c', '0', sys.executable, os.path.join(SCRIPTS_DIR, 'engine.py'),
+         '--services', 'ftp,telnet', '--host', host],
+        stdout=subprocess.DEVNULL)
+    try:
+        if not all(wait_for_port(host, p) for p in ports):
+            print("[-] Engine did not start")
+            return 1
+        base_rss, base_threads = proc_status(server.pid)
+
+        async def hold():
+            start = time.time()
+            sessions = await open_idle_sessions(host, ports, args.sessions)
+            elapsed = time.time() - start
+            await asyncio.sleep(args.hold)
+            rss, threads = proc_status(server.pid)
+            print(f"[+] Open sessions: {len(sessions)}/{args.sessions} in {elapsed:.2f}s")
+            print(f"[+] Engine RSS: {base_rss} kB idle -> {rss} kB loaded "
+                  f"({(rss - base_rss) / max(len(sessions), 1):.2f} kB/session)")
+            print(f"[+] Engine threads: {base_threads} idle -> {threads} loaded")
+            alive = server.poll() is None
+            for _, writer in sessions:
+                writer.close()
+            return 0 if alive and len(sessions) == args.sessions else 1
+
+        return asyncio.run(hold())
+    finally:
+        server.terminate()
+        server.wait()
+
+
+FLOOD_SERVER = """
+import asyncio, signal, sys, time
+sys.path.insert(0, {scripts!r})
+import engine
+from admission import Admission
+
+def handshake(client, addr):
+    # Stand-in for an SSH key exchange: some CPU, a banner, then wait for the client
+    end = time.thread_time() + {cpu}
+    while time.thread_time() < end:
+        pass
+    try:
+        client.sendall(b"SSH-2.0-bench\\r\\n")
+        client.settimeout({hold})
+        client.recv(1)
+    except OSError:
+        pass
+    finally:
+        client.close()
+
+async def main():
+    admission = Admission() if {admission} else None
+    stop = asyncio.Event()
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+    task = asyncio.ensure_future(engine.serve_blocking({port}, handshake, host='127.0.0.1',
+                                                       admission=admission))
+    await stop.wait()
+    task.cancel()
+    if admission is not None:
+        print(admission.summary(), flush=True)
+
+asyncio.run(main())
+"""
+
+
+def cpu_seconds(pid):
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(')', 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+async def flood_round(port, args):
+    """Run one flooding source and several well-behaved ones against a port"""
+    import socket
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + args.duration
+    attacks = [0]
+    latencies = []
+    failures = [0]
+
+    async def connect(source):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setblocking(False)
+        sock.bind((source, 0))
+        try:
+            await asyncio.wait_for(loop.sock_connect(sock, ('127.0.0.1', port)), 2)
+        except BaseException:
+            sock.close()
+            raise
+        return sock
+
+    async def attacker():
+        # Connect as fast as possible and hold every connection without a banner
+        while loop.time() < deadline:
+            try:
+                sock = await connect('127.0.0.2')
+            except (OSError, asyncio.TimeoutError):
+                continue
+            attacks[0] += 1
+            await asyncio.sleep(args.hold)
+            sock.close()
+
+    async def visitor(source):
+        while loop.time() < deadline:
+            start = loop.time()
+            try:
+                sock = await connect(source)
+                try:
+                    banner = await asyncio.wait_for(loop.sock_recv(sock, 64), 3)
+                finally:
+                    sock.close()
+            except (OSError, asyncio.TimeoutError):
+                banner = b""
+            if banner.startswith(b"SSH-"):
+                latencies.append(loop.time() - start)
+            else:
+                failures[0] += 1
+            await asyncio.sleep(args.interval)
+
+    await asyncio.gather(*(attacker() for _ in range(args.concurrency)),
+                         *(visitor(f"127.0.1.{i + 1}") for i in range(args.visitors)))
+    return attacks[0], sorted(latencies), failures[0]
+
+
+def bench_flood(args):
+    """Flood a simulated SSH listener from one IP, with and without admission control"""
+    import socket
+    import engine
+
+    engine.raise_fd_limit()
+    for admission in (False, True):
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            port = probe.getsockname()[1]
+        script = FLOOD_SERVER.format(scripts=SCRIPTS_DIR, cpu=args.handshake_ms / 1000,
+                                     hold=args.hold, admission=admission, port=port)
+        server = subprocess.Popen([sys.executable, '-c', script], stdout=subprocess.PIPE, text=True)
+        try:
+            if not wait_for_port('127.0.0.1', port):
+                print("[-] Flood server did not start")
+                return 1
+            cpu = cpu_seconds(server.pid)
+            attacks, latencies, failures = asyncio.run(flood_round(port, args))
+            cpu = cpu_seconds(server.pid) - cpu
+        finally:
+            server.terminate()
+            summary = server.communicate()[0].strip()
+        served = len(latencies)
+        total = served + failures
+        print(f"[+] Admission {'on' if admission else 'off'}: "
+              f"{attacks:,} flood connections, server CPU {cpu:.1f}s")
+        if served:
+            print(f"    visitors served {served}/{total} ({100 * served / total:.0f}%), "
+                  f"p50 {latencies[served // 2] * 1000:.0f} ms, "
+                  f"p95 {latencies[int(served * 0.95)] * 1000:.0f} ms")
+        else:
+            print(f"    visitors served 0/{total}")
+        for line in summary.splitlines():
+            print(f"    {line}")
+    return 0
+
+
+HANDSHAKE_SERVER = """
+import asyncio, signal, sys
+sys.path.insert(0, {scripts!r})
+import engine
+
+async def main():
+    stop = asyncio.Event()
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+    task = asyncio.ensure_future(engine.ssh_listener({port}, host='127.0.0.1')[1])
+    await stop.wait()
+    task.cancel()
+
+asyncio.run(main())
+"""
+
+# Server configurations: (host key type, algorithm preset); rsa/default is
+# the original single RSA key with paramiko's full algorithm lists
+HANDSHAKE_CONFIGS = {
+    'rsa/default': ('rsa', 'default'),
+    'rsa/fast': ('rsa', 'fast'),
+    'ecdsa/fast': ('ecdsa', 'fast'),
+    'ed25519/fast': ('ed25519', 'fast'),
+}
+
+# Client key exchange preferences: a current client, and an older scanner
+# that asks for finite-field Diffie-Hellman first
+HANDSHAKE_CLIENTS = {
+    'modern': None,
+    'legacy': ('diffie-hellman-group16-sha512', 'diffie-hellman-group14-sha256',
+               'ecdh-sha2-nistp256', 'curve25519-sha256@libssh.org'),
+}
+
+
+def ssh_attempt(port, kex=None, passwords=1, linger=False):
+    """Handshake, try passwords, then close or wait for the server to hang up"""
+    import socket
+    import paramiko
+
+    transport = paramiko.Transport(socket.create_connection(('127.0.0.1', port), timeout=30))
+    try:
+        if kex:
+            transport.get_security_options().kex = kex
+        transport.start_client(timeout=30)
+        for i in range(passwords):
+            try:
+                transport.auth_password('root', f'bench{i}')
+            except paramiko.AuthenticationException:
+                pass
+        while linger and transport.is_active():
+            time.sleep(0.05)
+    except (paramiko.SSHException, EOFError, OSError):
+        if not linger:
+            raise
+    finally:
+        transport.close()
+
+
+def asyncssh_attempts(port, passwords):
+    """Try several passwords on one connection with an asyncssh client.
+
+    paramiko clients send a new service request before every password,
+    which asyncssh servers answer by disconnecting."""
+    import asyncssh
+
+    class Client(asyncssh.SSHClient):
+        def __init__(self):
+            self.left = passwords
+
+        def password_auth_requested(self):
+            if not self.left:
+                return None
+            self.left -= 1
+            return f'bench{self.left}'
+
+    async def attempt():
+        try:
+            async with asyncssh.connect('127.0.0.1', port, username='root', known_hosts=None,
+                                        client_factory=Client, preferred_auth='password'):
+                pass
+        except (asyncssh.Error, OSError):
+            pass
+
+    asyncio.run(attempt())
+
+
+def ssh_bench_env(tmp, **overrides):
+    env = dict(os.environ, HONEYPOT_CONFIG_DIR=os.path.join(tmp, 'config'),
+               HONEYPOT_LOGS_DIR=os.path.join(tmp, 'logs'))
+    os.makedirs(env['HONEYPOT_LOGS_DIR'], exist_ok=True)
+    env.update({f'HONEYPOT_{name.upper()}': str(value) for name, value in overrides.items()})
+    return env
+
+
+def start_ssh_server(env):
+    """Start an SSH listener pinned to core 0; returns (process, port)"""
+    import socket
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    server = subprocess.Popen(
+        ['taskset', '-c', '0', sys.executable, '-c', HANDSHAKE_SERVER.format(scripts=SCRIPTS_DIR, port=port)],
+        # paramiko logs a traceback for the port probe's empty connection
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if not wait_for_port('127.0.0.1', port, timeout=30):
+        server.terminate()
+        server.wait()
+        return None, port
+    return server, port
+
+
+def handshake_rate(server, port, count, concurrency, kex=None):
+    """(handshakes per server CPU second, per wall second)"""
+    import concurrent.futures
+    cpu = cpu_seconds(server.pid)
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(lambda _: ssh_attempt(port, kex), range(count)))
+    elapsed = time.perf_counter() - start
+    cpu = cpu_seconds(server.pid) - cpu
+    return count / max(cpu, 1e-6), count / elapsed
+
+
+def bench_handshake(args):
+    """SSH handshakes per second per server core for each host key and algorithm preset"""
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = ssh_bench_env(tmp, ssh_backend=args.backend, ssh_idle_timeout=args.idle_timeout,
+                            ssh_max_auth_attempts=args.max_attempts)
+        for config, (key_type, algorithms) in HANDSHAKE_CONFIGS.items():
+            server, port = start_ssh_server(dict(env, HONEYPOT_SSH_HOST_KEYS=key_type,
+                                                 HONEYPOT_SSH_ALGORITHMS=algorithms))
+            if server is None:
+                print(f"[-] SSH server for {config} did not start")
+                return 1
+            try:
+                rates = []
+                for client, kex in HANDSHAKE_CLIENTS.items():
+                    per_core, per_second = handshake_rate(server, port, args.handshakes, args.concurrency, kex)
+                    rates.append(f"{client} {per_core:7.1f}/s ({per_second:.1f}/s wall)")
+
+                # A client that stops trying: the server should hang up after
+                # the idle timeout, and after the last allowed attempt
+                start = time.perf_counter()
+                ssh_attempt(port, passwords=1, linger=True)
+                idle = time.perf_counter() - start
+                start = time.perf_counter()
+                if args.backend == 'asyncssh':
+                    asyncssh_attempts(port, args.max_attempts)
+                else:
+                    ssh_attempt(port, passwords=args.max_attempts, linger=True)
+                exhausted = time.perf_counter() - start
+            finally:
+                server.terminate()
+                server.wait()
+            print(f"[+] {config:13} handshakes per core: {', '.join(rates)}")
+            print(f"    session closed {idle:.1f}s after going idle, "
+                  f"{exhausted:.1f}s after {args.max_attempts} attempts")
+    return 0
+
+
+def hold_ssh_sessions(port, count, batch=50):
+    """Open SSH sessions that finish the key exchange and then sit idle"""
+    import concurrent.futures
+    import logging
+    import socket
+    import paramiko
+
+    # Sessions beyond the paramiko backend's worker pool are refused; skip the tracebacks
+    logging.getLogger('paramiko').setLevel(logging.CRITICAL)
+
+    def open_session(_):
+        try:
+            transport = paramiko.Transport(socket.create_connection(('127.0.0.1', port), timeout=30))
+            transport.start_client(timeout=30)
+            return transport
+        except (paramiko.SSHException, EOFError, OSError):
+            return None
+
+    with concurrent.futures.ThreadPoolExecutor(batch) as pool:
+        return list(pool.map(open_session, range(count)))
+
+
+def bench_ssh_backends(args):
+    """Compare RSS, threads and handshakes/sec of the paramiko and asyncssh SSH backends"""
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in ('paramiko', 'asyncssh'):
+            env = ssh_bench_env(tmp, ssh_backend=backend, ssh_idle_timeout=0, ssh_auth_timeout=0,
+                                ssh_max_auth_attempts=0)
+            server, port = start_ssh_server(env)
+            if server is None:
+                print(f"[-] {backend} SSH server did not start")
+                return 1
+            try:
+                per_core, per_second = handshake_rate(server, port, args.handshakes, args.concurrency)
+                base_rss, base_threads = proc_status(server.pid)
+                transports = hold_ssh_sessions(port, args.sessions)
+                time.sleep(args.hold)
+                rss, threads = proc_status(server.pid)
+                held = sum(1 for t in transports if t is not None and t.is_active())
+                for transport in transports:
+                    if transport is not None:
+                        transport.close()
+            finally:
+                server.terminate()
+                server.wait()
+            print(f"[+] {backend:8} {per_core:6.1f} handshakes/s per core ({per_second:.1f}/s wall)")
+            print(f"    {held}/{args.sessions} sessions held, RSS {base_rss} kB -> {rss} kB "
+                  f"({(rss - base_rss) / max(held, 1):.1f} kB/session), threads {base_threads} -> {threads}")
+    return 0
+
+
+SUPERVISOR_SERVER = """
+import sys
+sys.path.insert(0, {scripts!r})
+import supervisor
+supervisor.Supervisor(['ssh'], {workers}, '127.0.0.1', admission=False, ports={{'ssh': {port}}}).run()
+"""
+
+
+def bench_workers(args):
+    """SSH handshake throughput with 1..N SO_REUSEPORT worker processes"""
+    import concurrent.futures
+    import socket
+    import tempfile
+
+    cores = os.cpu_count()
+    baseline = None
+    for workers in args.workers:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = ssh_bench_env(tmp)
+            with socket.socket() as probe:
+                probe.bind(('127.0.0.1', 0))
+                port = probe.getsockname()[1]
+            server = subprocess.Popen(
+                [sys.executable, '-c', SUPERVISOR_SERVER.format(scripts=SCRIPTS_DIR, workers=workers, port=port)],
+                env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                if not wait_for_port('127.0.0.1', port, timeout=30):
+                    print(f"[-] Supervisor with {workers} workers did not start")
+                    return 1
+                time.sleep(1)
+                start = time.perf_counter()
+                with concurrent.futures.ProcessPoolExecutor(args.clients) as pool:
+                    list(pool.map(ssh_attempt, [port] * args.handshakes, chunksize=4))
+                elapsed = time.perf_counter() - start
+            finally:
+                server.terminate()
+                server.wait()
+            with open(os.path.join(env['HONEYPOT_LOGS_DIR'], 'auth_attempts.json'), 'rb') as f:
+                logged = sum(1 for _ in f)
+        rate = args.handshakes / elapsed
+        baseline = baseline or rate
+        print(f"[+] {workers} workers: {rate:6.1f} handshakes/s ({rate / baseline:.2f}x), "
+              f"{logged}/{args.handshakes} attempts logged by the supervisor")
+    if max(args.workers) > cores:
+        print(f"[!] Only {cores} CPUs here; workers beyond that cannot scale")
+    return 0
+
+
+# SSH, web, FTP, Telnet and dashboard ports, and the scripts start_honeypot.sh used to launch
+SENSOR_PORTS = (2222, 8080, 2121, 2323, 5000)
+SEPARATE_SCRIPTS = ('ssh_honeypot.py', 'web_honeypot.py', 'ftp_honeypot.py', 'telnet_honeypot.py', 'dashboard.py')
+
+
+def launch_until_ready(commands, env, timeout=30):
+    """Start the commands and wait until every sensor port accepts.
+    Returns (seconds to ready, total RSS in kB, processes)."""
+    start = time.perf_counter()
+    processes = [subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                 for command in commands]
+    ready = all(wait_for_port('127.0.0.1', port, timeout) for port in SENSOR_PORTS)
+    elapsed = time.perf_counter() - start
+    time.sleep(1)
+    rss = sum(proc_status(p.pid)[0] for p in processes)
+    return (elapsed if ready else None), rss, processes
+
+
+def bench_startup(args):
+    """Time to ready and memory of honeypot.py against one script per service"""
+    import tempfile
+
+    layouts = {
+        'honeypot.py': [[sys.executable, os.path.join(SCRIPTS_DIR, 'honeypot.py')]],
+        'separate scripts': [[sys.executable, os.path.join(SCRIPTS_DIR, script)]
+                             for script in SEPARATE_SCRIPTS],
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        env = ssh_bench_env(tmp, geo_interval=0)
+        # Generate the host keys once, outside the timed runs
+        subprocess.run([sys.executable, '-c', f"import sys; sys.path.insert(0, {SCRIPTS_DIR!r}); import ssh_honeypot"],
+                       env=env, stdout=subprocess.DEVNULL, check=True)
+        for name, commands in layouts.items():
+            times = []
+            for _ in range(args.runs):
+                elapsed, rss, processes = launch_until_ready(commands, env)
+                for process in processes:
+                    process.terminate()
+                for process in processes:
+                    process.wait()
+                if elapsed is None:
+                    print(f"[-] {name} did not open every port")
+                    return 1
+                times.append(elapsed)
+            print(f"[+] {name:16}: ready in {min(times):.2f}s (best of {args.runs}), "
+                  f"{len(commands)} process(es), {rss} kB RSS")
+    return 0
+
+
+def sample_auth_event(i):
+    return {
+        "timestamp": "2024-01-01T00:00:00.000000",
+        "source_ip": f"10.0.{(i >> 8) & 255}.{i & 255}",
+        "source_port": 40000 + i % 20000,
+        "username": "root",
+        "password": f"pass{i % 1000}",
+        "service": "ssh"
+    }
+
+
+def run_threads(threads, count, target):
+    import threading
+    per_thread = count // threads
+    workers = [threading.Thread(target=target, args=(t * per_thread, per_thread))
+               for t in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return time.perf_counter() - start
+
+
+def bench_sink(args):
+    """Compare per-event open/append/close with the batched log sink"""
+    import json
+    import tempfile
+    from log_sink import LogSink
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'direct.json')
+
+        def direct(offset, n):
+            for i in range(offset, offset + n):
+                with open(path, "a") as f:
+                    f.write(json.dumps(sample_auth_event(i)) + "\n")
+
+        elapsed = run_threads(args.threads, args.events, direct)
+        print(f"[+] open/append/close: {args.events / elapsed:,.0f} events/s")
+
+        for policy in ('none', 'interval', 'batch'):
+            sink = LogSink(logs_dir=tmp, fsync=policy)
+
+            def enqueue(offset, n):
+                for i in range(offset, offset + n):
+                    sink.log('sink.json', sample_auth_event(i))
+
+            start = time.perf_counter()
+            enqueue_time = run_threads(args.threads, args.events, enqueue)
+            sink.flush()
+            elapsed = time.perf_counter() - start
+            sink.close()
+            print(f"[+] log sink (fsync={policy}): {args.events / enqueue_time:,.0f} events/s enqueued, "
+                  f"{args.events / elapsed:,.0f} events/s written")
+            os.remove(os.path.join(tmp, 'sink.json'))
+    return 0
+
+
+def write_auth_log(path, count):
+    """Write a synthetic auth_attempts.json with count events"""
+    import random
+    rng = random.Random(42)
+    line = ('{{"timestamp": "2024-01-{day:02d}T{hour:02d}:{minute:02d}:00.000000", '
+            '"source_ip": "10.{a}.{b}.{c}", "source_port": {port}, "username": "{user}", '
+            '"password": "{password}", "service": "{service}"}}\n')
+    users = ['root', 'admin', 'ubuntu', 'pi', 'test', 'oracle', 'user', 'guest']
+    services = ['ssh', 'ftp', 'telnet', 'web_login']
+    with open(path, "w") as f:
+        for i in range(count):
+            f.write(line.format(day=1 + i * 28 // count, hour=(i // 60) % 24, minute=i % 60,
+                                a=rng.randrange(4), b=rng.randrange(256), c=rng.randrange(256),
+                                port=rng.randrange(1024, 65536), user=rng.choice(users),
+                                password=f"pass{int(rng.paretovariate(1.2))}",
+                                service=rng.choice(services)))
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    print(f"    {label}: {time.perf_counter() - start:.3f}s")
+    return result
+
+
+def bench_store(args):
+    """Compare JSON scans with SQLite aggregates at several log sizes"""
+    import json
+    import tempfile
+    from collections import Counter
+    from event_store import EventStore, import_logs
+
+    for size in [int(float(n)) for n in args.sizes.split(',')]:
+        with tempfile.TemporaryDirectory() as tmp:
+            log_path = os.path.join(tmp, 'auth_attempts.json')
+            print(f"[+] {size:,} events")
+            timed("generate log", lambda: write_auth_log(log_path, size))
+
+            def json_scan():
+                passwords = Counter()
+                in_window = 0
+                with open(log_path) as f:
+                    for line in f:
+                        entry = json.loads(line)
+                        passwords[entry.get('password', '')] += 1
+                        if '2024-01-10T00' <= entry.get('timestamp', '') < '2024-01-11T00':
+                            in_window += 1
+                return passwords.most_common(10), in_window
+
+            store = EventStore(os.path.join(tmp, 'events.db'))
+            timed("import into sqlite", lambda: import_logs(store, tmp, batch_size=50000))
+
+            def sql_queries():
+                top = store.counts('auth', 'password', limit=10).most_common()
+                window = store.db.execute(
+                    "SELECT COUNT(*) FROM events WHERE timestamp >= ? AND timestamp < ?",
+                    ('2024-01-10T00', '2024-01-11T00')).fetchone()[0]
+                return top, window
+
+            expected = timed("json scan (top-10 passwords + 1 day count)", json_scan)
+            got = timed("sqlite (top-10 passwords + 1 day count)", sql_queries)
+            timed("sqlite (1 day count only)", lambda: store.db.execute(
+                "SELECT COUNT(*) FROM events WHERE timestamp >= ? AND timestamp < ?",
+                ('2024-01-10T00', '2024-01-11T00')).fetchone())
+            store.close()
+            if expected != got:
+                print("[-] Results differ between JSON scan and SQLite")
+                return 1
+    return 0
+
+
+def bench_archive(args):
+    """Compare the size and query time of raw JSON shards and the Parquet archive"""
+    import json
+    import tempfile
+    from collections import Counter
+    from archive import Archive, archive_logs
+
+    with tempfile.TemporaryDirectory() as tmp:
+        shard = os.path.join(tmp, 'auth_attempts.json.1')
+        write_auth_log(shard, args.events)
+        archive_dir = os.path.join(tmp, 'archive')
+        timed("archive", lambda: archive_logs(tmp, archive_dir))
+        parquet = sum(os.path.getsize(os.path.join(d, f))
+                      for d, _, files in os.walk(archive_dir) for f in files if f.endswith('.parquet'))
+        json_size = os.path.getsize(shard)
+        print(f"[+] {args.events:,} events: JSON {json_size / 2**20:.1f} MB, "
+              f"Parquet {parquet / 2**20:.1f} MB ({json_size / parquet:.1f}x smaller)")
+
+        def json_scan():
+            usernames, passwords, hours = Counter(), Counter(), [0] * 24
+            with open(shard) as f:
+                for line in f:
+                    entry = json.loads(line)
+                    usernames[entry['username']] += 1
+                    passwords[entry['password']] += 1
+                    hours[int(entry['timestamp'][11:13])] += 1
+            return dict(usernames), dict(passwords), hours
+
+        def archive_queries():
+            store = Archive(archive_dir)
+            return (dict(store.counts('auth', 'username')), dict(store.counts('auth', 'password')),
+                    store.hour_counts('auth'))
+
+        expected = timed("json scan (usernames, passwords, hours)", json_scan)
+        got = timed("parquet (usernames, passwords, hours)", archive_queries)
+        if expected != got:
+            print("[-] Results differ between JSON scan and the archive")
+            return 1
+    return 0
+
+
+def bench_codec(args):
+    """Encode and decode throughput of each installed JSON backend"""
+    import codec
+
+    events = [sample_auth_event(i) for i in range(args.events)]
+    expected = None
+    for backend in codec.BACKENDS:
+        encode = codec.make_encoder(backend)
+        start = time.perf_counter()
+        lines = [encode(event) for event in events]
+        encode_time = time.perf_counter() - start
+
+        decoder = codec.Decoder(codec.AuthAttempt, backend)
+        start = time.perf_counter()
+        decoded = list(decoder.iter_lines(lines))
+        decode_time = time.perf_counter() - start
+
+        print(f"[+] {backend}: encode {args.events / encode_time:,.0f} events/s, "
+              f"decode {args.events / decode_time:,.0f} events/s")
+        if expected is None:
+            expected = decoded
+        elif decoded != expected:
+            print(f"[-] {backend} decoded different events")
+            return 1
+    return 0
+
+
+ANALYZE_MODES = {
+    'lists': "import analyze_logs as a; e = a.load_logs(path); a.count_auth_attempts(e, {})",
+    'stream': "import analyze_logs as a; s = a.LogStats()\nfor e in a.iter_logs(path): s.add_auth(e)",
+}
+
+
+def bench_analyze(args):
+    """Peak memory and time of list-based vs streaming log analysis"""
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = os.path.join(tmp, 'auth_attempts.json')
+        write_auth_log(log_path, args.events)
+        print(f"[+] {args.events:,} events, {os.path.getsize(log_path) / 2**20:.0f} MB")
+        for mode, code in ANALYZE_MODES.items():
+            script = (f"import resource, sys, time\nsys.path.insert(0, {SCRIPTS_DIR!r})\n"
+                      f"path = {log_path!r}\nstart = time.perf_counter()\n{code}\n"
+                      "print(time.perf_counter() - start, "
+                      "resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)")
+            out = subprocess.run([sys.executable, '-c', script], capture_output=True,
+                                 text=True, check=True).stdout.split()
+            print(f"    {mode}: {float(out[0]):.2f}s, peak RSS {int(out[1]) / 1024:.0f} MB")
+    return 0
+
+
+def zipf_stream(count, vocabulary, exponent=1.1, seed=7):
+    import itertools
+    import random
+    rng = random.Random(seed)
+    weights = list(itertools.accumulate(1 / (rank ** exponent) for rank in range(1, vocabulary + 1)))
+    return [f"pw{i}" for i in rng.choices(range(vocabulary), cum_weights=weights, k=count)]
+
+
+def bench_sketch(args):
+    """Check SpaceSaving/HyperLogLog accuracy against exact counts on Zipf data"""
+    from collections import Counter
+    from sketches import HyperLogLog, SpaceSaving
+
+    keys = zipf_stream(args.events, args.vocabulary)
+    exact = Counter(keys)
+    failures = 0
+
+    def check_topk(label, sketch):
+        nonlocal failures
+        bound = sketch.error_bound()
+        true_top = [k for k, _ in exact.most_common(args.top)]
+        reported = [k for k, _ in sketch.most_common(args.top)]
+        recall = len(set(true_top) & set(reported)) / args.top
+        worst = max(sketch[k] - exact[k] for k in true_top)
+        ok = all(0 <= sketch[k] - exact[k] <= bound for k in true_top)
+        failures += not ok
+        print(f"[{'+' if ok else '-'}] {label}: top-{args.top} recall {recall:.0%}, "
+              f"max overestimate {worst} (bound {bound:.0f}), {len(sketch)} keys kept "
+              f"vs {len(exact)} exact")
+
+    start = time.perf_counter()
+    sketch = SpaceSaving(args.error)
+    for key in keys:
+        sketch.add(key)
+    print(f"[+] SpaceSaving: {args.events / (time.perf_counter() - start):,.0f} adds/s")
+    check_topk("single sketch", sketch)
+
+    shards = [SpaceSaving(args.error) for _ in range(args.shards)]
+    for i, key in enumerate(keys):
+        shards[i % args.shards].add(key)
+    merged = shards[0]
+    for shard in shards[1:]:
+        merged.update(shard)
+    check_topk(f"merged from {args.shards} shards", merged)
+
+    hlls = [HyperLogLog(args.error * 10) for _ in range(args.shards)]
+    for i, key in enumerate(keys):
+        hlls[i % args.shards].add(key)
+    for hll in hlls[1:]:
+        hlls[0].update(hll)
+    estimate = hlls[0].estimate()
+    relative = abs(estimate - len(exact)) / len(exact)
+    limit = 3 * 1.04 / (hlls[0].m ** 0.5)
+    ok = relative <= limit
+    failures += not ok
+    print(f"[{'+' if ok else '-'}] HyperLogLog (p={hlls[0].p}, merged): {estimate:,.0f} "
+          f"vs {len(exact):,} distinct, error {relative:.2%} (limit {limit:.2%})")
+    return 1 if failures else 0
+
+
+def bench_parallel(args):
+    """Throughput of parallel log analysis by worker count"""
+    import functools
+    import tempfile
+    from analyze_logs import LogStats
+    from parallel import aggregate
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = os.path.join(tmp, 'auth_attempts.json')
+        # Generated lines average ~165 bytes
+        write_auth_log(log_path, int(args.size_mb * 2**20 / 165))
+        size_mb = os.path.getsize(log_path) / 2**20
+        print(f"[+] {size_mb:,.0f} MB log")
+
+        baseline = None
+        for workers in [int(w) for w in args.workers.split(',')]:
+            start = time.perf_counter()
+            stats = aggregate([([log_path], 'add_auth')], functools.partial(LogStats, {}, 0), workers)
+            elapsed = time.perf_counter() - start
+            result = {name: list(counter.items()) for name, counter in stats.auth_stats().items()}
+            if baseline is None:
+                baseline = result
+            same = "identical" if result == baseline else "DIFFERENT"
+            print(f"    {workers} workers: {size_mb / elapsed:,.1f} MB/s ({same})")
+            if result != baseline:
+                return 1
+    return 0
+
+
+GEO_FIXTURE = os.path.join(os.path.dirname(SCRIPTS_DIR), 'config', 'geoip_sample.csv')
+GEO_FIXTURE_CASES = {
+    '192.0.2.7': 'TEST-NET-1',
+    '198.51.100.255': 'TEST-NET-2',
+    '203.0.113.0': 'TEST-NET-3',
+    '45.0.255.255': 'Example Cloud',
+    '2001:db8::42': 'IPv6 Documentation',
+    '10.0.0.1': None,
+    '46.0.0.0': None,
+    'not-an-ip': None,
+}
+
+
+def bench_geo(args):
+    """Check the local GeoIP engine on the bundled fixture, then time lookups"""
+    import random
+    import socket
+    import tempfile
+    from geo_local import LocalGeoDB
+
+    db = LocalGeoDB(GEO_FIXTURE)
+    failures = 0
+    for ip, isp in GEO_FIXTURE_CASES.items():
+        location = db.lookup(ip)
+        got = location and location['isp']
+        if got != isp:
+            failures += 1
+            print(f"[-] {ip}: expected {isp}, got {got}")
+    shape = sorted(db.lookup('192.0.2.1'))
+    expected_shape = sorted(["country", "countryCode", "region", "city", "lat", "lon", "isp", "org"])
+    if shape != expected_shape:
+        failures += 1
+        print(f"[-] Location keys {shape} do not match get_ip_location")
+    print(f"[{'+' if not failures else '-'}] Fixture checks: {len(GEO_FIXTURE_CASES) + 1 - failures} passed")
+
+    rng = random.Random(3)
+    with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+        f.write("network,country,countryCode,region,city,lat,lon,isp,org\n")
+        # One /24 in every 4 of the first args.ranges * 4 blocks
+        for block in range(0, args.ranges * 4, 4):
+            start = (1 << 24) + block * 256
+            f.write(f"{socket.inet_ntoa(start.to_bytes(4, 'big'))}/24,Country{block % 200},"
+                    f"C{block % 200},Region,City,0,0,ISP{block % 1000},Org\n")
+        path = f.name
+    try:
+        start = time.perf_counter()
+        big = LocalGeoDB(path)
+        print(f"[+] Loaded {args.ranges:,} ranges in {time.perf_counter() - start:.2f}s")
+    finally:
+        os.remove(path)
+
+    ips = [socket.inet_ntoa(((1 << 24) + rng.randrange(args.ranges * 1024)).to_bytes(4, 'big'))
+           for _ in range(args.lookups)]
+    start = time.perf_counter()
+    found = sum(1 for location in big.lookup_many(ips).values() if location)
+    elapsed = time.perf_counter() - start
+    print(f"[+] Bulk lookup of {args.lookups:,} IPs: {elapsed:.2f}s "
+          f"({elapsed / args.lookups * 1e6:.2f} us/IP, {found:,} distinct IPs located)")
+    return 1 if failures else 0
+
+
+def start_geo_stub(window_requests=100, window_seconds=1.0, latency=0.005):
+    """Local ip-api.com stand-in with per-window rate limits and X-Rl/X-Ttl headers"""
+    import json
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    state = {'window_start': time.monotonic(), 'used': 0, 'throttled': 0}
+    lock = threading.Lock()
+
+    def location(ip):
+        return {"status": "success", "query": ip, "country": "Exampleland", "countryCode": "XL",
+                "regionName": "Region", "city": "City", "lat": 1.0, "lon": 2.0,
+                "isp": "ISP", "org": "Org"}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def _reply(self, status, body):
+            with lock:
+                now = time.monotonic()
+                if now - state['window_start'] >= window_seconds:
+                    state['window_start'], state['used'] = now, 0
+                state['used'] += 1
+                remaining = window_requests - state['used']
+                ttl = window_seconds - (now - state['window_start'])
+                if remaining < 0:
+                    state['throttled'] += 1
+                    status, body = 429, []
+            time.sleep(latency)
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.send_header('X-Rl', str(max(remaining, 0)))
+            self.send_header('X-Ttl', f"{max(ttl, 0):.3f}")
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            self._reply(200, location(self.path.split('?')[0].rsplit('/', 1)[-1]))
+
+        def do_POST(self):
+            ips = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            self._reply(200, [location(ip) for ip in ips])
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+def bench_resolver(args):
+    """Batched, rate-limited resolver vs the old one-IP-per-second loop"""
+    import requests
+    from geo_resolver import GeoResolver, parse_location
+
+    server, state = start_geo_stub()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    ips = [f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}" for i in range(args.ips)]
+    try:
+        # The old loop: one request per IP followed by a 1 second sleep
+        start = time.perf_counter()
+        for ip in ips[:args.baseline_sample]:
+            parse_location(requests.get(f"{base_url}/json/{ip}").json())
+            time.sleep(1)
+        per_ip = (time.perf_counter() - start) / args.baseline_sample
+        baseline = per_ip * args.ips
+        print(f"[+] Old loop: {per_ip:.3f}s/IP, ~{baseline:,.0f}s for {args.ips:,} IPs "
+              f"(extrapolated from {args.baseline_sample})")
+
+        resolver = GeoResolver(base_url=base_url, rate=100, burst=100, backoff=0.05)
+        start = time.perf_counter()
+        resolved = dict(resolver.resolve(ips))
+        elapsed = time.perf_counter() - start
+        resolver.close()
+        speedup = baseline / elapsed
+        print(f"[+] Resolver: {len(resolved):,} IPs in {elapsed:.2f}s, "
+              f"{state['throttled']} requests throttled, {speedup:,.0f}x faster")
+        return 0 if len(resolved) == args.ips and speedup >= 50 else 1
+    finally:
+        server.shutdown()
+
+
+def bench_rollups(args):
+    """Time-range top-N queries from rollup buckets vs scanning raw events"""
+    import datetime
+    import random
+    from collections import Counter
+    from rollups import Rollups, to_epoch
+
+    rng = random.Random(7)
+    first = datetime.datetime(2024, 1, 1)
+    step = args.days * 86400 / args.events
+    events = []
+    for i in range(args.events):
+        event = sample_auth_event(rng.randrange(args.events))
+        event["timestamp"] = (first + datetime.timedelta(seconds=i * step)).isoformat()
+        event["service"] = rng.choice(("ssh", "ftp", "telnet", "web_login"))
+        events.append(event)
+
+    rollups = Rollups(error=args.error)
+    start = time.perf_counter()
+    for event in events:
+        rollups.add(event)
+    elapsed = time.perf_counter() - start
+    print(f"[+] Rolled up {args.events:,} events over {args.days} days at "
+          f"{args.events / elapsed:,.0f} events/s into {rollups.bucket_count():,} buckets")
+
+    failures = 0
+    end = to_epoch(events[-1]["timestamp"])
+    for hours in (1, 24, 7 * 24, args.days * 24):
+        # Day-aligned ranges so bucket edges match the raw scan exactly
+        since = end - hours * 3600
+        since -= since % (3600 if hours < 24 * 7 else 86400)
+        raw = timed(f"raw scan, last {hours}h", lambda: Counter(
+            e["source_ip"] for e in events if to_epoch(e["timestamp"]) >= since))
+        read = sum(1 for _ in rollups.buckets(since))
+        timed(f"rollups top-10, last {hours}h ({read} buckets)", lambda: rollups.top('ip', 10, since))
+        top = rollups.top('ip', 10, since)
+        if args.error:
+            # Sketched counts only ever overestimate, by at most the error bound
+            worst = max(count - raw[ip] for ip, count in top)
+            print(f"[+] Top-10 IPs overcounted by at most {worst}, "
+                  f"{sum(1 for ip, _ in top if ip in dict(raw.most_common(10)))}/10 in the exact top 10")
+        elif rollups.counter('ip', since) != raw:
+            failures += 1
+            print(f"[-] Top IPs differ for the last {hours}h")
+    return 1 if failures else 0
+
+
+def bench_api(args):
+    """Dashboard JSON API latency: cold build, cached body and 304 revalidation"""
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['HONEYPOT_LOGS_DIR'] = tmp
+        os.environ['HONEYPOT_LOG_BACKEND'] = 'json'
+        write_auth_log(os.path.join(tmp, 'auth_attempts.json'), args.events)
+        import dashboard
+        client = dashboard.app.test_client()
+        timed(f"initial ingest of {args.events:,} events", lambda: client.get('/api/stats'))
+
+        for path in ('/api/stats', '/api/top/ip?limit=20', '/api/top/username?range=all&service=ssh',
+                     '/api/recent?limit=20', '/api/geo'):
+            start = time.perf_counter()
+            etag = client.get(path).headers['ETag']
+            cold = time.perf_counter() - start
+            start = time.perf_counter()
+            for _ in range(args.requests):
+                client.get(path)
+            cached = (time.perf_counter() - start) / args.requests
+            start = time.perf_counter()
+            for _ in range(args.requests):
+                response = client.get(path, headers={'If-None-Match': etag})
+            revalidated = (time.perf_counter() - start) / args.requests
+            if response.status_code != 304:
+                print(f"[-] {path}: expected 304, got {response.status_code}")
+                return 1
+            print(f"    {path}: cold {cold * 1000:.1f} ms, cached {cached * 1000:.2f} ms, "
+                  f"304 {revalidated * 1000:.2f} ms")
+    return 0
+
+
+def bench_stream(args):
+    """Fan-out of live events to many Server-Sent Events viewers"""
+    import json
+    import tempfile
+    import threading
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args):
+            pass
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['HONEYPOT_LOGS_DIR'] = tmp
+        os.environ['HONEYPOT_LOG_BACKEND'] = 'json'
+        os.environ['HONEYPOT_STREAM_POLL_INTERVAL'] = '0.1'
+        log_path = os.path.join(tmp, 'auth_attempts.json')
+        write_auth_log(log_path, args.log_events)
+        import dashboard
+        dashboard.ingester.refresh()
+
+        server = make_server('127.0.0.1', 0, dashboard.app, threaded=True, request_handler=QuietHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        port = server.server_port
+
+        async def viewer(received, connected):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(b"GET /api/stream HTTP/1.1\r\nHost: localhost\r\n\r\n")
+            await writer.drain()
+            await reader.readuntil(b"retry: 3000\n\n")
+            connected.append(1)
+            count = 0
+            while count < args.events:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line == b"event: attempt\n":
+                    count += 1
+            received.append(time.perf_counter())
+            writer.close()
+
+        async def run():
+            received, connected = [], []
+            tasks = [asyncio.create_task(viewer(received, connected)) for _ in range(args.viewers)]
+            while len(connected) < args.viewers:
+                await asyncio.sleep(0.05)
+            rss, threads = proc_status(os.getpid())
+            print(f"[+] {args.viewers} viewers connected to a {args.log_events:,}-event log: "
+                  f"{rss / 1024:.0f} MB RSS, {threads} threads")
+            start = time.perf_counter()
+            with open(log_path, "a") as f:
+                for i in range(args.events):
+                    f.write(json.dumps(sample_auth_event(i)) + "\n")
+                    f.flush()
+                    await asyncio.sleep(args.interval)
+            await asyncio.wait_for(asyncio.gather(*tasks), 60)
+            return start, received
+
+        start, received = asyncio.run(run())
+        server.shutdown()
+        delivered = sorted(t - start for t in received)
+        print(f"[+] {args.events} events delivered to {len(delivered)}/{args.viewers} viewers; "
+              f"last viewer done after {delivered[-1]:.2f}s, "
+              f"{dashboard.broadcaster.published} messages encoded once each")
+        return 0 if len(delivered) == args.viewers else 1
+
+
+REPORT_SETUP = """
+import os, generate_report as g
+s = g.collect_stats(g.iter_logs(path), recent_limit=recent)
+"""
+
+REPORT_MODES = {
+    'one string': ("t = g.get_environment().get_template('report.html')\n"
+                   "html = t.render(date='', total_attacks=0, unique_ips=0, countries=0, top_usernames=[],"
+                   " top_passwords=[], attacks=s['recent_attacks'], geo_data={}, pages=1, charts=[])\n"
+                   "open(g.REPORT_PATH, 'w').write(html)"),
+    'streamed pages': "g.generate_html_report(s, {}, 'json', page_size=page_size)",
+}
+
+
+def bench_report(args):
+    """Peak memory and time of rendering a large report as one string vs streamed pages"""
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = os.path.join(tmp, 'auth_attempts.json')
+        write_auth_log(log_path, args.events)
+        env = dict(os.environ, HONEYPOT_REPORTS_DIR=tmp, HONEYPOT_LOGS_DIR=tmp)
+        print(f"[+] {args.events:,} recent attacks, {args.page_size:,} per page")
+        for mode, code in REPORT_MODES.items():
+            script = (f"import resource, sys, time\nsys.path.insert(0, {SCRIPTS_DIR!r})\n"
+                      f"path, recent, page_size = {log_path!r}, {args.events}, {args.page_size}\n"
+                      f"{REPORT_SETUP}\nbase = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss\n"
+                      f"start = time.perf_counter()\n{code}\n"
+                      "print(time.perf_counter() - start, "
+                      "resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base)")
+            out = subprocess.run([sys.executable, '-c', script], capture_output=True,
+                                 text=True, check=True, env=env).stdout.split()
+            print(f"    {mode}: {float(out[-2]):.2f}s, peak RSS growth {int(out[-1]) / 1024:.0f} MB")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Honeypot load tests and benchmarks")
+    sub = parser.add_subparsers(dest='benchmark', required=True)
+
+    idle = sub.add_parser('idle', help=bench_idle.__doc__)
+    idle.add_argument('--sessions', type=int, default=10000)
+    idle.add_argument('--hold', type=float, default=5.0)
+    idle.set_defaults(func=bench_idle)
+
+    sink = sub.add_parser('sink', help=bench_sink.__doc__)
+    sink.add_argument('--events', type=int, default=200000)
+    sink.add_argument('--threads', type=int, default=4)
+    sink.set_defaults(func=bench_sink)
+
+    store = sub.add_parser('store', help=bench_store.__doc__)
+    store.add_argument('--sizes', default='1e6',
+                       help="comma separated event counts, e.g. 1e6,1e7,5e7")
+    store.set_defaults(func=bench_store)
+
+    analyze = sub.add_parser('analyze', help=bench_analyze.__doc__)
+    analyze.add_argument('--events', type=int, default=1000000)
+    analyze.set_defaults(func=bench_analyze)
+
+    sketch = sub.add_parser('sketch', help=bench_sketch.__doc__)
+    sketch.add_argument('--events', type=int, default=1000000)
+    sketch.add_argument('--vocabulary', type=int, default=500000)
+    sketch.add_argument('--error', type=float, default=0.001)
+    sketch.add_argument('--top', type=int, default=10)
+    sketch.add_argument('--shards', type=int, default=4)
+    sketch.set_defaults(func=bench_sketch)
+
+    par = sub.add_parser('parallel', help=bench_parallel.__doc__)
+    par.add_argument('--size-mb', type=float, default=512)
+    par.add_argument('--workers', default=f"1,2,4,{os.cpu_count()}")
+    par.set_defaults(func=bench_parallel)
+
+    geo = sub.add_parser('geo', help=bench_geo.__doc__)
+    geo.add_argument('--ranges', type=int, default=500000)
+    geo.add_argument('--lookups', type=int, default=1000000)
+    geo.set_defaults(func=bench_geo)
+
+    resolver = sub.add_parser('resolver', help=bench_resolver.__doc__)
+    resolver.add_argument('--ips', type=int, default=10000)
+    resolver.add_argument('--baseline-sample', type=int, default=5)
+    resolver.set_defaults(func=bench_resolver)
+
+    roll = sub.add_parser('rollups', help=bench_rollups.__doc__)
+    roll.add_argument('--events', type=int, default=1000000)
+    roll.add_argument('--days', type=int, default=90)
+    roll.add_argument('--error', type=float, default=0,
+                      help="per-bucket sketch error; 0 checks exact counters against a raw scan")
+    roll.set_defaults(func=bench_rollups)
+
+    api = sub.add_parser('api', help=bench_api.__doc__)
+    api.add_argument('--events', type=int, default=500000)
+    api.add_argument('--requests', type=int, default=1000)
+    api.set_defaults(func=bench_api)
+
+    stream = sub.add_parser('stream', help=bench_stream.__doc__)
+    stream.add_argument('--viewers', type=int, default=500)
+    stream.add_argument('--events', type=int, default=100)
+    stream.add_argument('--interval', type=float, default=0.01)
+    stream.add_argument('--log-events', type=int, default=1000000)
+    stream.set_defaults(func=bench_stream)
+
+    flood = sub.add_parser('flood', help=bench_flood.__doc__)
+    flood.add_argument('--duration', type=float, default=10)
+    flood.add_argument('--concurrency', type=int, default=200, help="flood connections in flight")
+    flood.add_argument('--visitors', type=int, default=20, help="well-behaved source IPs")
+    flood.add_argument('--interval', type=float, default=1, help="seconds between a visitor's connections")
+    flood.add_argument('--hold', type=float, default=5, help="seconds each flood connection stays open")
+    flood.add_argument('--handshake-ms', type=float, default=5, help="CPU per simulated handshake")
+    flood.set_defaults(func=bench_flood)
+
+    ssh = sub.add_parser('handshake', help=bench_handshake.__doc__)
+    ssh.add_argument('--handshakes', type=int, default=100, help="handshakes per client type")
+    ssh.add_argument('--concurrency', type=int, default=4)
+    ssh.add_argument('--idle-timeout', type=float, default=2, help="server idle timeout for the linger test")
+    ssh.add_argument('--max-attempts', type=int, default=3)
+    ssh.add_argument('--backend', choices=('paramiko', 'asyncssh'), default='paramiko')
+    ssh.set_defaults(func=bench_handshake)
+
+    backends = sub.add_parser('ssh-backends', help=bench_ssh_backends.__doc__)
+    backends.add_argument('--handshakes', type=int, default=100)
+    backends.add_argument('--concurrency', type=int, default=4)
+    backends.add_argument('--sessions', type=int, default=500, help="idle sessions held open")
+    backends.add_argument('--hold', type=float, default=2, help="seconds to hold them before measuring")
+    backends.set_defaults(func=bench_ssh_backends)
+
+    workers = sub.add_parser('workers', help=bench_workers.__doc__)
+    workers.add_argument('--workers', type=lambda v: [int(n) for n in v.split(',')], default=[1, 2, 4],
+                         help="comma separated worker counts")
+    workers.add_argument('--handshakes', type=int, default=400)
+    workers.add_argument('--clients', type=int, default=8, help="client processes")
+    workers.set_defaults(func=bench_workers)
+
+    startup = sub.add_parser('startup', help=bench_startup.__doc__)
+    startup.add_argument('--runs', type=int, default=3)
+    startup.set_defaults(func=bench_startup)
+
+    codec_parser = sub.add_parser('codec', help=bench_codec.__doc__)
+    codec_parser.add_argument('--events', type=int, default=500000)
+    codec_parser.set_defaults(func=bench_codec)
+
+    archive = sub.add_parser('archive', help=bench_archive.__doc__)
+    archive.add_argument('--events', type=int, default=1000000)
+    archive.set_defaults(func=bench_archive)
+
+    report = sub.add_parser('report', help=bench_report.__doc__)
+    report.add_argument('--events', type=int, default=200000)
+    report.add_argument('--page-size', type=int, default=1000)
+    report.set_defaults(func=bench_report)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Fan-out of live events to Server-Sent Events clients.
+
+One background thread drives the shared log (or event store) tail; whatever
+it finds is published once, pre-encoded, and appended to a bounded buffer
+per connected client. A client that falls behind loses its oldest messages
+instead of holding up the others, and is told how many it missed so it can
+resynchronise. Per-client cost depends on the event rate, not on log size.
+"""
+
+import json
+import threading
+import time
+from collections import deque
+
+import settings
+
+
+def sse_message(event, data):
+    """Encode one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class Subscriber:
+    def __init__(self, buffer_size):
+        self.queue = deque(maxlen=buffer_size)
+        self.dropped = 0
+
+
+class Broadcaster:
+    def __init__(self, buffer_size=None):
+        self.buffer_size = buffer_size or settings.STREAM_BUFFER
+        self.subscribers = set()
+        self.condition = threading.Condition()
+        self.published = 0
+        self.thread = None
+
+    def subscribe(self):
+        subscriber = Subscriber(self.buffer_size)
+        with self.condition:
+            self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self.condition:
+            self.subscribers.discard(subscriber)
+
+    def publish(self, messages, skipped=0):
+        """Queue encoded messages for every subscriber, dropping each
+        subscriber's oldest messages when its buffer is full. ``skipped``
+        counts messages the publisher already left out."""
+        if not messages:
+            return
+        with self.condition:
+            for subscriber in self.subscribers:
+                overflow = len(subscriber.queue) + len(messages) - self.buffer_size
+                subscriber.dropped += skipped + max(overflow, 0)
+                subscriber.queue.extend(messages)
+            self.published += len(messages)
+            self.condition.notify_all()
+
+    def wait(self, subscriber, timeout):
+        """Block until messages are queued or the timeout passes; return the
+        messages and how many were dropped since the last call"""
+        with self.condition:
+            if not subscriber.queue:
+                self.condition.wait(timeout)
+            messages = list(subscriber.queue)
+            subscriber.queue.clear()
+            dropped, subscriber.dropped = subscriber.dropped, 0
+        return messages, dropped
+
+    def start(self, poll, interval=None):
+        """Call poll() every interval seconds in a daemon thread, once"""
+        interval = settings.STREAM_POLL_INTERVAL if interval is None else interval
+        with self.condition:
+            if self.thread is not None:
+                return
+            self.thread = threading.Thread(target=self._run, args=(poll, interval), daemon=True)
+        self.thread.start()
+
+    def _run(self, poll, interval):
+        while True:
+            try:
+                poll()
+            except Exception as e:
+                print(f"[-] Live event poll failed: {e}")
+            time.sleep(interval)
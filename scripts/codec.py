@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""Encoding and decoding of log events.
+
+Each log has a typed schema (AuthAttempt, WebVisit, FtpCommand). Events are
+decoded as plain dicts holding only the schema's fields. A line that is not
+a JSON object, or whose fields have the wrong types, counts as malformed.
+Fields may be missing, but only the Optional ones may be null: readers sort
+and compare timestamps, so a null timestamp is malformed.
+
+The fastest available backend is used: msgspec, which validates while it
+parses, then orjson, then the standard library. HONEYPOT_JSON_BACKEND picks
+one explicitly. Every backend writes one compact JSON object per line.
+"""
+
+import json
+import os
+from typing import Any, Dict, Optional, TypedDict, get_args, get_type_hints
+
+import settings
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class AuthAttempt(TypedDict, total=False):
+    timestamp: str
+    source_ip: Optional[str]
+    source_port: Optional[int]
+    username: Optional[str]
+    password: Optional[str]
+    service: Optional[str]
+    user_agent: Optional[str]
+
+
+class WebVisit(TypedDict, total=False):
+    timestamp: str
+    source_ip: Optional[str]
+    source_port: Optional[int]
+    user_agent: Optional[str]
+    path: Optional[str]
+    service: Optional[str]
+
+
+class FtpCommand(TypedDict, total=False):
+    timestamp: str
+    source_ip: Optional[str]
+    source_port: Optional[int]
+    service: Optional[str]
+    command: Optional[str]
+
+
+# Log file name -> schema of its events
+SCHEMAS = {
+    'auth_attempts.json': AuthAttempt,
+    'web_visits.json': WebVisit,
+    'ftp_commands.json': FtpCommand,
+}
+
+BACKENDS = tuple(name for name, module in (('msgspec', msgspec), ('orjson', orjson)) if module) + ('json',)
+
+
+def _field_types(schema):
+    """{field: accepted types} for a schema; Optional fields accept None"""
+    return {name: get_args(hint) or (hint,) for name, hint in get_type_hints(schema).items()}
+
+
+def _check(entry, fields):
+    """Keep the schema's fields of a decoded value, or raise ValueError"""
+    if not isinstance(entry, dict):
+        raise ValueError("not an object")
+    if fields is None:
+        return entry
+    checked = {}
+    for key, value in entry.items():
+        types = fields.get(key)
+        if types is None:
+            continue
+        if type(value) not in types:
+            raise ValueError(f"bad type for {key}")
+        checked[key] = value
+    return checked
+
+
+def default_backend():
+    backend = settings.JSON_BACKEND or BACKENDS[0]
+    if backend not in BACKENDS:
+        raise ValueError(f"JSON backend {backend} is not installed (available: {', '.join(BACKENDS)})")
+    return backend
+
+
+def schema_for(path):
+    """The schema of a log file, its rotated shards and segments"""
+    name = os.path.basename(path)
+    for filename, schema in SCHEMAS.items():
+        if name.startswith(filename):
+            return schema
+    return None
+
+
+def make_encoder(backend=None):
+    """Return a function turning an event dict into one line of bytes"""
+    backend = backend or default_backend()
+    if backend == 'msgspec':
+        encode = msgspec.json.Encoder().encode
+        return lambda entry: encode(entry) + b"\n"
+    if backend == 'orjson':
+        return lambda entry: orjson.dumps(entry, option=orjson.OPT_APPEND_NEWLINE)
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+    return lambda entry: (dumps(entry) + "\n").encode('utf-8')
+
+
+class Decoder:
+    """Decode log lines against one schema and count the malformed ones"""
+
+    def __init__(self, schema=None, backend=None):
+        self.backend = backend or default_backend()
+        self.schema = schema
+        self.malformed = 0
+        if self.backend == 'msgspec':
+            self._decode = msgspec.json.Decoder(schema or Dict[str, Any]).decode
+            self._errors = (msgspec.DecodeError,)
+        else:
+            loads = orjson.loads if self.backend == 'orjson' else json.loads
+            fields = _field_types(schema) if schema else None
+            self._decode = lambda line: _check(loads(line), fields)
+            self._errors = (ValueError, TypeError)
+
+    def decode(self, line):
+        """The event on a line, or None for blank and malformed lines"""
+        try:
+            return self._decode(line)
+        except self._errors:
+            if line.strip():
+                self.malformed += 1
+            return None
+
+    def iter_lines(self, lines):
+        decode = self.decode
+        for line in lines:
+            entry = decode(line)
+            if entry is not None:
+                yield entry
+
+    def report(self, path):
+        """Warn about malformed lines seen so far in ``path``"""
+        if self.malformed:
+            print(f"[!] Skipped {self.malformed} malformed lines in {os.path.basename(path)}")
+
+
+def decoder_for(path, backend=None):
+    return Decoder(schema_for(path), backend)
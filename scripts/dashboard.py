@@ -1,45 +1,59 @@
 #!/usr/bin/env python3
 
-from flask import Flask, render_template_string, jsonify, request
+from flask import Flask, render_template_string, jsonify, redirect, request, send_from_directory, url_for
+import hashlib
 import json
 import os
 import datetime
+import threading
+from collections import OrderedDict
+
+import settings
+from broadcast import Broadcaster, sse_message
+from honeypot import read_health
+from ingest import Ingester
+from report_jobs import ReportJobs
+from rollups import Rollups, from_epoch, now, to_epoch
 
 app = Flask(__name__)
 
-def load_auth_attempts():
-    attempts = []
-    try:
-        with open("../logs/auth_attempts.json", "r") as f:
-            for line in f:
-                try:
-                    attempts.append(json.loads(line))
-                except:
-                    pass
-    except FileNotFoundError:
-        pass
-    return attempts
+DASHBOARD_PORT = 5000
 
-def load_web_visits():
-    visits = []
-    try:
-        with open("../logs/web_visits.json", "r") as f:
-            for line in f:
-                try:
-                    visits.append(json.loads(line))
-                except:
-                    pass
-    except FileNotFoundError:
-        pass
-    return visits
+ingester = Ingester(since=from_epoch(now() - int(settings.DASHBOARD_HISTORY_DAYS * 86400))
+                   if settings.DASHBOARD_HISTORY_DAYS else None)
+store = None
+store_lock = threading.Lock()
+store_rollups = Rollups()
+store_last_id = 0
+store_last_web_id = 0
+
+# Time ranges selectable on the dashboard, in seconds
+RANGES = {'1h': 3600, '24h': 86400, '7d': 7 * 86400, '30d': 30 * 86400}
+GEO_PATH = os.path.join(settings.LOGS_DIR, 'geolocation.json')
+# Seconds between comment lines on an idle event stream
+STREAM_KEEPALIVE = 15
+
+broadcaster = Broadcaster()
+geo_cache = {'mtime': None, 'data': {}}
 
 def load_geo_data():
     try:
-        with open("../logs/geolocation.json", "r") as f:
+        with open(GEO_PATH, "r") as f:
             return json.load(f)
     except FileNotFoundError:
         return {}
 
+def cached_geo_data():
+    """Geolocation data, reloaded only when the file changes"""
+    try:
+        mtime = os.stat(GEO_PATH).st_mtime_ns
+    except FileNotFoundError:
+        return {}
+    if geo_cache['mtime'] != mtime:
+        geo_cache['data'] = load_geo_data()
+        geo_cache['mtime'] = mtime
+    return geo_cache['data']
+
 DASHBOARD_TEMPLATE = '''
 <!DOCTYPE html>
 <html>
@@ -60,6 +74,8 @@ DASHBOARD_TEMPLATE = '''
         tr:nth-child(even) { background-color: #f2f2f2; }
         .refresh-btn { background-color: #4CAF50; color: white; border: none; padding: 10px 15px; border-radius: 4px; cursor: pointer; }
         .refresh-btn:hover { background-color: #45a049; }
+        .ranges a { margin-left: 10px; color: #4CAF50; }
+        .ranges a.active { font-weight: bold; color: #333; }
         .tabs { display: flex; margin-bottom: 20px; }
         .tab { padding: 10px 20px; background-color: #ddd; cursor: pointer; margin-right: 5px; border-radius: 5px 5px 0 0; }
         .tab.active { background-color: white; }
@@ -75,6 +91,12 @@ DASHBOARD_TEMPLATE = '''
     <div class="container">
         <h1>Advanced Honeypot Dashboard</h1>
         <button class="refresh-btn" onclick="location.reload()">Refresh Data</button>
+        <span class="ranges">
+            <a href="?range=all"{% if selected_range == 'all' %} class="active"{% endif %}>All time</a>
+            {% for name in ranges %}
+            <a href="?range={{ name }}"{% if selected_range == name %} class="active"{% endif %}>Last {{ name }}</a>
+            {% endfor %}
+        </span>
 
         <div class="tabs">
             <div class="tab active" onclick="showTab('overview')">Overview</div>
@@ -86,23 +108,23 @@ DASHBOARD_TEMPLATE = '''
             <div class="stats">
                 <div class="stat-card">
                     <h3>Total Attacks</h3>
-                    <div class="number">{{ total_attacks }}</div>
+                    <div class="number" id="total-attacks">{{ total_attacks }}</div>
                 </div>
                 <div class="stat-card">
                     <h3>Unique IPs</h3>
-                    <div class="number">{{ unique_ips }}</div>
+                    <div class="number" id="unique-ips">{{ unique_ips }}</div>
                 </div>
                 <div class="stat-card">
                     <h3>SSH Attacks</h3>
-                    <div class="number">{{ ssh_attacks }}</div>
+                    <div class="number" id="ssh-attacks">{{ ssh_attacks }}</div>
                 </div>
                 <div class="stat-card">
                     <h3>Web Attacks</h3>
-                    <div class="number">{{ web_attacks }}</div>
+                    <div class="number" id="web-attacks">{{ web_attacks }}</div>
                 </div>
                 <div class="stat-card">
                     <h3>FTP Attacks</h3>
-                    <div class="number">{{ ftp_attacks }}</div>
+                    <div class="number" id="ftp-attacks">{{ ftp_attacks }}</div>
                 </div>
                 <div class="stat-card">
                     <h3>Countries</h3>
@@ -111,7 +133,7 @@ DASHBOARD_TEMPLATE = '''
             </div>
             <div class="card">
                 <h2>Recent Authentication Attempts</h2>
-                <table>
+                <table id="recent-attempts">
                     <tr>
                         <th>Time</th>
                         <th>Source IP</th>
@@ -285,6 +307,23 @@ DASHBOARD_TEMPLATE = '''
             });
         }
 
+        function showReportJob(job) {
+            const status = document.getElementById('report-status');
+            if (job.status === 'done') {
+                status.innerHTML = 'Report generated successfully! <a href="/report" target="_blank">View Report</a>';
+            } else if (job.status === 'failed') {
+                status.innerHTML = 'Error generating report: ' + job.error;
+            } else {
+                status.innerHTML = 'Generating report... (' + job.status + ')';
+                setTimeout(() => {
+                    fetch('/report_status/' + job.id)
+                        .then(response => response.json())
+                        .then(data => showReportJob(data.job))
+                        .catch(error => { status.innerHTML = 'Error: ' + error; });
+                }, 1000);
+            }
+        }
+
         function generateReport() {
             document.getElementById('report-status').innerHTML = 'Generating report...';
 
@@ -292,8 +331,7 @@ DASHBOARD_TEMPLATE = '''
                 .then(response => response.json())
                 .then(data => {
                     if (data.success) {
-                        document.getElementById('report-status').innerHTML = 
-                            'Report generated successfully! <a href="/report" target="_blank">View Report</a>';
+                        showReportJob(data.job);
                     } else {
                         document.getElementById('report-status').innerHTML = 'Error generating report: ' + data.error;
                     }
@@ -302,84 +340,204 @@ DASHBOARD_TEMPLATE = '''
                     document.getElementById('report-status').innerHTML = 'Error: ' + error;
                 });
         }
+
+        // Live updates for the all-time view
+        function addAttempt(attempt) {
+            const table = document.getElementById('recent-attempts');
+            const row = table.insertRow(1);
+            const geo = attempt.geo ? attempt.geo.city + ', ' + attempt.geo.country : 'Unknown';
+            [attempt.timestamp, attempt.source_ip, geo, attempt.service, attempt.username, attempt.password]
+                .forEach(value => { row.insertCell().textContent = value === undefined ? '' : value; });
+            while (table.rows.length > 11) {
+                table.deleteRow(-1);
+            }
+        }
+
+        function reloadRecent() {
+            fetch('/api/recent?limit=10')
+                .then(response => response.json())
+                .then(data => {
+                    const table = document.getElementById('recent-attempts');
+                    while (table.rows.length > 1) {
+                        table.deleteRow(-1);
+                    }
+                    data.items.reverse().forEach(addAttempt);
+                });
+        }
+
+        if (window.EventSource && {{ 'true' if selected_range == 'all' else 'false' }}) {
+            const source = new EventSource('/api/stream');
+            source.addEventListener('attempt', event => addAttempt(JSON.parse(event.data)));
+            source.addEventListener('dropped', reloadRecent);
+            source.addEventListener('stats', event => {
+                const stats = JSON.parse(event.data);
+                document.getElementById('total-attacks').textContent = stats.total_attacks;
+                document.getElementById('unique-ips').textContent = stats.unique_ips;
+                document.getElementById('ssh-attacks').textContent = stats.services.ssh || 0;
+                document.getElementById('web-attacks').textContent = stats.services.web_login || 0;
+                document.getElementById('ftp-attacks').textContent = stats.services.ftp || 0;
+            });
+        }
     </script>
 </body>
 </html>
 '''
 
-@app.route('/')
-def dashboard():
-    auth_attempts = load_auth_attempts()
-    web_visits = load_web_visits()
-    geo_data = load_geo_data()
+def range_stats(rollups, start, recent, geo_data):
+    """Dashboard statistics for the events since ``start`` from the rollups"""
+    ips = rollups.counter('ip', start)
+    return {
+        'total_attacks': rollups.total(start),
+        'unique_ips': rollups.distinct_ips(start),
+        'services': dict(rollups.services(start)),
+        'recent': [entry for entry in recent if (to_epoch(entry.get('timestamp')) or 0) >= start],
+        'top_ips': ips.most_common(10),
+        'top_usernames': rollups.top('username', 10, start),
+        'top_passwords': rollups.top('password', 10, start),
+        'countries': rollups.countries(geo_data, start),
+    }
+
+def ingested_stats(geo_data, start=None):
+    """Dashboard statistics from the incrementally tailed JSON logs"""
+    ingester.refresh()
+    with ingester.lock:
+        auth = ingester.auth
+        if start is not None:
+            return range_stats(ingester.rollups, start, auth.recent(10), geo_data)
+        return {
+            'total_attacks': auth.total,
+            'unique_ips': len(ingester.unique_ips),
+            'services': dict(auth.services),
+            'recent': auth.recent(10),
+            'top_ips': auth.ips.most_common(10),
+            'top_usernames': auth.usernames.most_common(10),
+            'top_passwords': auth.passwords.most_common(10),
+            'countries': ingester.rollups.countries(geo_data),
+        }
 
+def sync_store():
+    """Open the event store and fold rows inserted since the last call into
+    the rollups; the caller holds store_lock"""
+    global store, store_last_id, store_last_web_id
+    from event_store import EventStore
+    if store is None:
+        store = EventStore()
+    attempts = []
+    rows = store.events_after('auth', store_last_id)
+    while rows:
+        for _, entry in rows:
+            store_rollups.add(entry)
+            attempts.append(entry)
+        store_last_id = rows[-1][0]
+        rows = store.events_after('auth', store_last_id)
+    # Web visitors only count towards the distinct IPs
+    rows = store.events_after('web', store_last_web_id)
+    while rows:
+        for _, entry in rows:
+            store_rollups.add_visit(entry)
+        store_last_web_id = rows[-1][0]
+        rows = store.events_after('web', store_last_web_id)
+    if attempts and broadcaster.subscribers:
+        publish_attempts(attempts, {
+            'total_attacks': store.count('auth'),
+            'unique_ips': store.count_distinct('source_ip', ('auth', 'web')),
+            'services': dict(store.counts('auth', 'service')),
+        })
+
+def publish_attempts(attempts, stats):
+    """Encode new attempts and the updated counters once and queue them for
+    every live client"""
+    geo_data = cached_geo_data()
+    skipped = max(len(attempts) - broadcaster.buffer_size, 0)
+    messages = []
+    for entry in attempts[skipped:]:
+        ip = entry.get('source_ip', '')
+        messages.append(sse_message('attempt', dict(entry, geo=geo_data[ip]) if ip in geo_data else entry))
+    messages.append(sse_message('stats', stats))
+    broadcaster.publish(messages, skipped)
+
+def on_ingested(attempts):
+    if not broadcaster.subscribers:
+        return
+    with ingester.lock:
+        stats = {
+            'total_attacks': ingester.auth.total,
+            'unique_ips': len(ingester.unique_ips),
+            'services': dict(ingester.auth.services),
+        }
+    publish_attempts(attempts, stats)
+
+ingester.listeners.append(on_ingested)
+
+def store_stats(geo_data, start=None):
+    """Dashboard statistics from SQL aggregates over the event store"""
+    with store_lock:
+        sync_store()
+        if start is not None:
+            return range_stats(store_rollups, start, store.recent('auth', 10), geo_data)
+        return {
+            'total_attacks': store.count('auth'),
+            'unique_ips': store.count_distinct('source_ip', ('auth', 'web')),
+            'services': dict(store.counts('auth', 'service')),
+            'recent': store.recent('auth', 10),
+            'top_ips': store.counts('auth', 'source_ip', limit=10).most_common(),
+            'top_usernames': store.counts('auth', 'username', limit=10, skip_empty=True).most_common(),
+            'top_passwords': store.counts('auth', 'password', limit=10, skip_empty=True).most_common(),
+            'countries': store_rollups.countries(geo_data),
+        }
 
-    total_attacks = len(auth_attempts)
+def service_status(name):
+    """Running or Stopped, from honeypot.py's health file or, for services
+    started on their own, their pid file"""
+    health = read_health()
+    if health is not None and health['status'] == 'running':
+        return "Running" if health['services'].get(name, {}).get('state') == 'running' else "Stopped"
+    return "Running" if os.path.exists(os.path.join(settings.LOGS_DIR, f"{name}_honeypot.pid")) else "Stopped"
 
-    unique_ips = set()
-    for attempt in auth_attempts:
-        unique_ips.add(attempt.get('source_ip', ''))
-    for visit in web_visits:
-        unique_ips.add(visit.get('source_ip', ''))
+@app.route('/')
+def dashboard():
+    selected_range = request.args.get('range', 'all')
+    start = now() - RANGES[selected_range] if selected_range in RANGES else None
+    geo_data = cached_geo_data()
+    if settings.LOG_BACKEND == 'json':
+        stats = ingested_stats(geo_data, start)
+    else:
+        stats = store_stats(geo_data, start)
 
-    ssh_attacks = sum(1 for a in auth_attempts if a.get('service') == 'ssh')
-    web_attacks = sum(1 for a in auth_attempts if a.get('service') == 'web_login')
-    ftp_attacks = sum(1 for a in auth_attempts if a.get('service') == 'ftp')
+    total_attacks = stats['total_attacks']
+    unique_ips = stats['unique_ips']
 
+    ssh_attacks = stats['services'].get('ssh', 0)
+    web_attacks = stats['services'].get('web_login', 0)
+    ftp_attacks = stats['services'].get('ftp', 0)
 
-    recent_attempts = sorted(auth_attempts, key=lambda x: x.get('timestamp', ''), reverse=True)[:10]
+    top_ips = stats['top_ips']
+    top_usernames = stats['top_usernames']
+    top_passwords = stats['top_passwords']
 
 
-    for attempt in recent_attempts:
+    recent_attempts = []
+    for attempt in stats['recent']:
         ip = attempt.get('source_ip', '')
         if ip in geo_data:
-            attempt['geo'] = geo_data[ip]
-
-
-    ip_counts = {}
-    for attempt in auth_attempts:
-        ip = attempt.get('source_ip', '')
-        ip_counts[ip] = ip_counts.get(ip, 0) + 1
-
-    top_ips = sorted(ip_counts.items(), key=lambda x: x[1], reverse=True)[:10]
-
-    username_counts = {}
-    for attempt in auth_attempts:
-        username = attempt.get('username', '')
-        if username:
-            username_counts[username] = username_counts.get(username, 0) + 1
-
-    top_usernames = sorted(username_counts.items(), key=lambda x: x[1], reverse=True)[:10]
-
-
-    password_counts = {}
-    for attempt in auth_attempts:
-        password = attempt.get('password', '')
-        if password:
-            password_counts[password] = password_counts.get(password, 0) + 1
-
-    top_passwords = sorted(password_counts.items(), key=lambda x: x[1], reverse=True)[:10]
+            attempt = dict(attempt, geo=geo_data[ip])
+        recent_attempts.append(attempt)
 
 
-    countries = {}
-    for ip, data in geo_data.items():
-        country = data.get('country', 'Unknown')
-        countries[country] = countries.get(country, 0) + 1
-
-    countries_count = sorted(countries.items(), key=lambda x: x[1], reverse=True)
+    countries_count = stats['countries'].most_common()
 
 
-    ssh_status = "Running" if os.path.exists("../logs/ssh_honeypot.pid") else "Stopped"
-    web_status = "Running" if os.path.exists("../logs/web_honeypot.pid") else "Stopped"
-    ftp_status = "Running" if os.path.exists("../logs/ftp_honeypot.pid") else "Stopped"
+    ssh_status = service_status('ssh')
+    web_status = service_status('web')
+    ftp_status = service_status('ftp')
 
     return render_template_string(DASHBOARD_TEMPLATE, 
                                  total_attacks=total_attacks,
-                                 unique_ips=len(unique_ips),
+                                 unique_ips=unique_ips,
                                  ssh_attacks=ssh_attacks,
                                  web_attacks=web_attacks,
                                  ftp_attacks=ftp_attacks,
-                                 countries=len(countries),
+                                 countries=len(countries_count),
                                  recent_attempts=recent_attempts,
                                  top_ips=top_ips,
                                  top_usernames=top_usernames,
@@ -388,24 +546,324 @@ def dashboard():
                                  countries_count=countries_count,
                                  ssh_status=ssh_status,
                                  web_status=web_status,
-                                 ftp_status=ftp_status)
+                                 ftp_status=ftp_status,
+                                 ranges=RANGES,
+                                 selected_range=selected_range if start is not None else 'all')
+
+# JSON API. Responses are cached per request until the data version (events
+# ingested plus the geolocation file's mtime) changes, and carry an ETag so
+# polling clients get a 304 while nothing is new.
+
+API_DEFAULT_LIMIT = 10
+API_MAX_LIMIT = 100
+TOP_DIMENSIONS = ('ip', 'username', 'password', 'service', 'country')
+
+class ResponseCache:
+    """Serialized API responses keyed on the request, valid for one data version"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, version):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self.entries.move_to_end(key)
+            return entry[1], entry[2]
+
+    def put(self, key, version, body):
+        etag = hashlib.blake2b(body.encode(), digest_size=8).hexdigest()
+        with self.lock:
+            self.entries[key] = (version, etag, body)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return etag, body
+
+api_cache = ResponseCache()
+
+def data_version():
+    """High-water mark of ingested events plus the geolocation file's mtime"""
+    if settings.LOG_BACKEND == 'json':
+        ingester.refresh()
+        version = ingester.version
+    else:
+        with store_lock:
+            sync_store()
+            version = store_last_id
+    try:
+        geo_mtime = os.stat(GEO_PATH).st_mtime_ns
+    except FileNotFoundError:
+        geo_mtime = 0
+    return version, geo_mtime
+
+def data_source():
+    """The rollups for the configured backend and the lock guarding them"""
+    if settings.LOG_BACKEND == 'json':
+        return ingester.rollups, ingester.lock
+    return store_rollups, store_lock
+
+def parse_time(value):
+    ts = to_epoch(value)
+    if ts is None:
+        try:
+            ts = int(value)
+        except ValueError:
+            raise ValueError(f"invalid timestamp {value!r}")
+    return ts
+
+def parse_query(args):
+    """Filters and paging from the query string: range (1h/24h/7d/30d/all) or
+    since/until (ISO timestamps or epoch seconds), service (comma-separated),
+    limit and cursor"""
+    start = end = None
+    selected = args.get('range', 'all')
+    if selected in RANGES:
+        start = now() - RANGES[selected]
+    elif selected != 'all':
+        raise ValueError(f"unknown range {selected!r}")
+    if args.get('since'):
+        start = parse_time(args['since'])
+    if args.get('until'):
+        end = parse_time(args['until'])
+    services = set(filter(None, args.get('service', '').split(','))) or None
+    try:
+        limit = min(max(int(args.get('limit', API_DEFAULT_LIMIT)), 1), API_MAX_LIMIT)
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    return {'start': start, 'end': end, 'services': services,
+            'limit': limit, 'cursor': args.get('cursor') or None}
+
+def paginate(items, query):
+    """Offset-cursor page of a ranked list"""
+    try:
+        offset = int(query['cursor'] or 0)
+    except ValueError:
+        raise ValueError("invalid cursor")
+    end = offset + query['limit']
+    return {'items': items[offset:end],
+            'next_cursor': str(end) if end < len(items) else None}
+
+def in_range(entry, query):
+    if query['services'] and entry.get('service') not in query['services']:
+        return False
+    if query['start'] is None and query['end'] is None:
+        return True
+    ts = to_epoch(entry.get('timestamp'))
+    if ts is None:
+        return False
+    return ((query['start'] is None or ts >= query['start']) and
+            (query['end'] is None or ts < query['end']))
+
+def cached_json(build):
+    """Serve build(query, geo_data) as JSON from the response cache,
+    answering 304 when the client's ETag is still current"""
+    version = data_version()
+    key = (request.path, tuple(sorted(request.args.items(multi=True))))
+    if request.args.get('range') in RANGES:
+        # Relative ranges move with the clock; recompute at most once a minute
+        key += (now() // 60,)
+
+    cached = api_cache.get(key, version)
+    if cached is None:
+        try:
+            query = parse_query(request.args)
+            payload = build(query, cached_geo_data())
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        cached = api_cache.put(key, version, json.dumps(payload))
+
+    etag, body = cached
+    response = app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+def build_stats(query, geo_data):
+    rollups, lock = data_source()
+    start, end, services = query['start'], query['end'], query['services']
+    with lock:
+        service_counts = rollups.services(start, end)
+        if services:
+            service_counts = {s: n for s, n in service_counts.items() if s in services}
+        return {
+            'total_attacks': rollups.total(start, end, services),
+            'unique_ips': rollups.distinct_ips(start, end, services),
+            'services': dict(service_counts),
+            'countries': len(rollups.countries(geo_data, start, end, services)),
+        }
+
+def build_top(dimension):
+    def build(query, geo_data):
+        rollups, lock = data_source()
+        start, end, services = query['start'], query['end'], query['services']
+        with lock:
+            if dimension == 'service':
+                counts = rollups.services(start, end)
+                if services:
+                    counts = {s: n for s, n in counts.items() if s in services}
+                ranked = sorted(counts.items(), key=lambda item: item[1], reverse=True)
+            elif dimension == 'country':
+                ranked = rollups.countries(geo_data, start, end, services).most_common()
+            else:
+                ranked = rollups.counter(dimension, start, end, services).most_common()
+        return paginate([{'value': value, 'count': count} for value, count in ranked], query)
+    return build
+
+def build_recent(query, geo_data):
+    """Newest attempts first. The JSON backend pages through the attempts the
+    ingester retains; the SQLite backend pages through the whole table."""
+    if settings.LOG_BACKEND == 'json':
+        before = None
+        if query['cursor']:
+            seq, _, timestamp = query['cursor'].partition(':')
+            try:
+                before = (timestamp, int(seq))
+            except ValueError:
+                raise ValueError("invalid cursor")
+        with ingester.lock:
+            items = ingester.auth.recent_items()
+        page = []
+        for timestamp, seq, entry in items:
+            if before is not None and (timestamp, seq) >= before:
+                continue
+            if in_range(entry, query):
+                page.append((f"{seq}:{timestamp}", entry))
+                if len(page) > query['limit']:
+                    break
+    else:
+        try:
+            before = int(query['cursor']) if query['cursor'] else None
+        except ValueError:
+            raise ValueError("invalid cursor")
+        since = from_epoch(query['start']) if query['start'] is not None else None
+        until = from_epoch(query['end']) if query['end'] is not None else None
+        with store_lock:
+            rows = store.recent_page('auth', query['limit'] + 1, before, query['services'], since, until)
+        page = [(str(row_id), entry) for row_id, entry in rows]
+
+    more = len(page) > query['limit']
+    page = page[:query['limit']]
+    items = []
+    for _, entry in page:
+        ip = entry.get('source_ip', '')
+        items.append(dict(entry, geo=geo_data[ip]) if ip in geo_data else entry)
+    return {'items': items, 'next_cursor': page[-1][0] if more else None}
+
+def build_geo(query, geo_data):
+    """Geolocated attacker IPs by attempt count, with per-country totals"""
+    rollups, lock = data_source()
+    start, end, services = query['start'], query['end'], query['services']
+    with lock:
+        ips = rollups.counter('ip', start, end, services)
+    countries = {}
+    located = []
+    for ip, count in ips.most_common():
+        location = geo_data.get(ip)
+        if location:
+            located.append(dict(location, ip=ip, count=count))
+            country = location.get('country', 'Unknown')
+            countries[country] = countries.get(country, 0) + count
+    result = paginate(located, query)
+    result['countries'] = countries
+    return result
+
+@app.route('/api/stats')
+def api_stats():
+    return cached_json(build_stats)
+
+@app.route('/api/recent')
+def api_recent():
+    return cached_json(build_recent)
+
+@app.route('/api/top/<dimension>')
+def api_top(dimension):
+    if dimension not in TOP_DIMENSIONS:
+        return jsonify({'error': f"unknown dimension {dimension!r}, expected one of "
+                                 f"{', '.join(TOP_DIMENSIONS)}"}), 404
+    return cached_json(build_top(dimension))
+
+@app.route('/api/geo')
+def api_geo():
+    return cached_json(build_geo)
+
+@app.route('/api/stream')
+def api_stream():
+    """Server-Sent Events: "attempt" for each new auth attempt, "stats" with
+    the updated counters, and "dropped" when this client fell behind"""
+    broadcaster.start(data_version)
+    subscriber = broadcaster.subscribe()
+
+    def stream():
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                messages, dropped = broadcaster.wait(subscriber, STREAM_KEEPALIVE)
+                if dropped:
+                    yield sse_message('dropped', {'count': dropped})
+                yield ''.join(messages) if messages else ': keepalive\n\n'
+        finally:
+            broadcaster.unsubscribe(subscriber)
+
+    return app.response_class(stream(), mimetype='text/event-stream',
+                              headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def report_stats():
+    """Report statistics from the dashboard's live aggregates"""
+    if settings.LOG_BACKEND == 'json':
+        ingester.refresh()
+        with ingester.lock:
+            auth = ingester.auth
+            return {
+                "hours": ingester.rollups.hour_of_day(),
+                "services": dict(auth.services),
+                "total_attacks": auth.total,
+                "unique_ips": len(auth.distinct_ips),
+                "top_usernames": auth.usernames.most_common(10),
+                "top_passwords": auth.passwords.most_common(10),
+                "recent_attacks": auth.recent(settings.REPORT_RECENT),
+            }
+    from generate_report import collect_store_stats
+    with store_lock:
+        sync_store()
+        return collect_store_stats(store)
+
+def render_report(params):
+    import generate_report
+    os.makedirs(generate_report.IMAGES_DIR, exist_ok=True)
+    generate_report.generate_html_report(report_stats(), cached_geo_data())
+    return generate_report.REPORT_PATH
+
+report_jobs = ReportJobs(render_report)
 
 @app.route('/generate_report')
 def generate_report():
     try:
-
-        os.system('python3 generate_report.py')
-        return jsonify({"success": True})
+        job = report_jobs.submit({'format': 'html'}, data_version())
+        return jsonify({"success": True, "job": job})
     except Exception as e:
         return jsonify({"success": False, "error": str(e)})
 
+@app.route('/report_status/<job_id>')
+def report_status(job_id):
+    job = report_jobs.status(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": "unknown job"}), 404
+    return jsonify({"success": True, "job": job})
+
 @app.route('/report')
 def view_report():
-    try:
-        with open("../reports/honeypot_report.html", "r") as f:
-            return f.read()
-    except FileNotFoundError:
+    if not os.path.exists(os.path.join(settings.REPORTS_DIR, 'honeypot_report.html')):
         return "Report not found. Please generate a report first."
+    # Serve from /report/ so the page links and chart images resolve
+    return redirect(url_for('report_file', name='honeypot_report.html'))
+
+@app.route('/report/<path:name>')
+def report_file(name):
+    return send_from_directory(settings.REPORTS_DIR, name)
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=False)
+    app.run(host='0.0.0.0', port=DASHBOARD_PORT, debug=False)
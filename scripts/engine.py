@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""Shared asyncio engine hosting the raw-socket honeypot services.
+
+FTP and Telnet run as coroutine handlers on a single event loop, so an idle
+session costs one socket and a small coroutine frame instead of a thread.
+SSH with the default paramiko backend needs a blocking socket, so its
+listener accepts on the loop and hands each connection to a bounded worker
+pool; the asyncssh backend runs its sessions on the loop as well. All listeners
+share one admission controller that sheds excess connections before any
+handler, thread or key exchange is spent on them.
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import resource
+import socket
+
+import settings
+from admission import Admission
+from log_sink import exit_on_sigterm
+
+LISTEN_HOST = '0.0.0.0'
+LISTEN_BACKLOG = 1024
+SSH_WORKERS = 64
+
+
+def raise_fd_limit():
+    """Raise the soft open-file limit to the hard limit"""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return hard
+
+
+def stream_service(name):
+    """Return (port, handler) for a service that runs as a coroutine"""
+    if name == 'ftp':
+        import ftp_honeypot
+        return ftp_honeypot.FTP_PORT, ftp_honeypot.handle_client
+    if name == 'telnet':
+        import telnet_honeypot
+        return telnet_honeypot.TELNET_PORT, telnet_honeypot.handle_client
+    raise ValueError(f"Unknown stream service: {name}")
+
+
+def listen_socket(host, port, reuse_port=False):
+    """A non-blocking listening TCP socket. With ``reuse_port`` several
+    processes can bind the same port and the kernel spreads connections
+    across them."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(LISTEN_BACKLOG)
+    sock.setblocking(False)
+    return sock
+
+
+async def serve_blocking(port, handler, workers=SSH_WORKERS, host=LISTEN_HOST, admission=None,
+                         reuse_port=False):
+    """Accept on the event loop and run a blocking handler in a bounded pool.
+
+    Connections refused by admission control are shed on the loop, and
+    connections beyond the pool size are closed straight away instead of
+    queueing up behind busy workers. When the listener is cancelled, open
+    sessions are shut down so their handlers return promptly.
+    """
+    loop = asyncio.get_running_loop()
+    pool = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+    slots = asyncio.Semaphore(workers)
+    active = set()
+
+    sock = listen_socket(host, port, reuse_port)
+
+    def release(client, ip):
+        active.discard(client)
+        slots.release()
+        if admission is not None:
+            admission.release(ip)
+
+    try:
+        while True:
+            client, addr = await loop.sock_accept(sock)
+            if admission is not None and admission.admit(addr[0]) is not None:
+                admission.shed(client.close)
+                continue
+            if slots.locked():
+                if admission is not None:
+                    admission.release(addr[0])
+                client.close()
+                continue
+            await slots.acquire()
+            client.setblocking(True)
+            active.add(client)
+            future = loop.run_in_executor(pool, handler, client, addr)
+            future.add_done_callback(lambda _, c=client, ip=addr[0]: release(c, ip))
+    finally:
+        sock.close()
+        for client in list(active):
+            try:
+                client.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        pool.shutdown(wait=False)
+
+
+def http_server(app, port, host=LISTEN_HOST, reuse_port=False):
+    """A threaded werkzeug server for a WSGI app, bound through
+    listen_socket so it can share the port with other processes"""
+    from werkzeug.serving import make_server
+    sock = listen_socket(host, port, reuse_port)
+    sock.setblocking(True)
+    try:
+        # werkzeug serves on a duplicate of the descriptor
+        return make_server(host, port, app, threaded=True, fd=sock.fileno())
+    finally:
+        sock.close()
+
+
+def ssh_listener(port=None, host=LISTEN_HOST, admission=None, reuse_port=False):
+    """Return (port, coroutine) serving SSH with the configured backend"""
+    if settings.SSH_BACKEND == 'asyncssh':
+        import ssh_async
+        port = port or ssh_async.SSH_PORT
+        return port, ssh_async.serve(port, host, admission, reuse_port)
+    if settings.SSH_BACKEND == 'paramiko':
+        import ssh_honeypot
+        port = port or ssh_honeypot.SSH_PORT
+        return port, serve_blocking(port, ssh_honeypot.handle_connection, host=host, admission=admission,
+                                    reuse_port=reuse_port)
+    raise ValueError(f"Unknown SSH backend: {settings.SSH_BACKEND} (choose paramiko or asyncssh)")
+
+
+async def start_service(name, host=LISTEN_HOST, admission=None, reuse_port=False, port=None):
+    """Start one service's listener. Returns its port and either the asyncio
+    server or, for SSH, the task running the listener."""
+    if name == 'ssh':
+        port, listener = ssh_listener(port, host, admission, reuse_port)
+        print(f"[+] SSH honeypot ({settings.SSH_BACKEND}) listening on port {port}")
+        return port, asyncio.ensure_future(listener)
+
+    default_port, handler = stream_service(name)
+    port = port or default_port
+    if admission is not None:
+        handler = admission.wrap(handler)
+    server = await asyncio.start_server(handler, host, port, reuse_address=True,
+                                        reuse_port=reuse_port or None, backlog=LISTEN_BACKLOG)
+    print(f"[+] {name.upper()} honeypot listening on port {port}")
+    return port, server
+
+
+async def start_services(names, host=LISTEN_HOST, admission=None, reuse_port=False, ports=None):
+    """Start listeners for the named services and return the asyncio servers
+    and background tasks that keep them running. ``ports`` overrides the
+    default port of any service."""
+    ports = ports or {}
+    servers = []
+    tasks = []
+    if admission is not None:
+        tasks.append(asyncio.ensure_future(admission.report()))
+    for name in names:
+        _, runner = await start_service(name, host, admission, reuse_port, ports.get(name))
+        (tasks if isinstance(runner, asyncio.Future) else servers).append(runner)
+    return servers, tasks
+
+
+async def serve(names, host=LISTEN_HOST, admission=True, reuse_port=False, ports=None, workers=1):
+    admission = Admission(workers=workers) if admission else None
+    servers, tasks = await start_services(names, host, admission, reuse_port, ports)
+    try:
+        await asyncio.gather(*(s.serve_forever() for s in servers), *tasks)
+    finally:
+        for server in servers:
+            server.close()
+
+
+def run(names, host=LISTEN_HOST, admission=True, reuse_port=False, ports=None, workers=1):
+    """Run the given services on one event loop until interrupted"""
+    limit = raise_fd_limit()
+    print(f"[+] Open file limit: {limit}")
+    exit_on_sigterm()
+    try:
+        asyncio.run(serve(names, host, admission, reuse_port, ports, workers))
+    except KeyboardInterrupt:
+        print("[!] Shutting down honeypot engine")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run honeypot services on one event loop")
+    parser.add_argument('--services', default='ftp,telnet,ssh',
+                        help="comma separated list of services (ftp, telnet, ssh)")
+    parser.add_argument('--host', default=LISTEN_HOST)
+    parser.add_argument('--no-admission', action='store_true',
+                        help="accept every connection (no rate limits or session caps)")
+    args = parser.parse_args()
+    run([s.strip() for s in args.services.split(',') if s.strip()], args.host, not args.no_admission)
+
+
+if __name__ == '__main__':
+    main()
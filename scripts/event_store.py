@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""SQLite event store, an alternative to the newline-delimited JSON logs.
+
+Events from every log go into one WAL-mode table indexed on the columns the
+dashboard, analyzer and report generator group or filter by, so they can
+answer top-N and time queries with SQL aggregates.
+"""
+
+import argparse
+import os
+import sqlite3
+from collections import Counter
+
+import settings
+from codec import decoder_for
+
+COLUMNS = ('timestamp', 'source_ip', 'source_port', 'service', 'username',
+           'password', 'command', 'path', 'user_agent')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    log TEXT NOT NULL,
+    timestamp TEXT,
+    source_ip TEXT,
+    source_port INTEGER,
+    service TEXT,
+    username TEXT,
+    password TEXT,
+    command TEXT,
+    path TEXT,
+    user_agent TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_events_timestamp ON events(timestamp);
+CREATE INDEX IF NOT EXISTS idx_events_source_ip ON events(source_ip);
+CREATE INDEX IF NOT EXISTS idx_events_service ON events(service);
+CREATE INDEX IF NOT EXISTS idx_events_username ON events(username);
+'''
+
+INSERT = (f"INSERT INTO events (log, {', '.join(COLUMNS)}) "
+          f"VALUES (?, {', '.join('?' * len(COLUMNS))})")
+
+# Log file name -> value stored in the "log" column
+LOGS = {
+    'auth_attempts.json': 'auth',
+    'web_visits.json': 'web',
+    'ftp_commands.json': 'ftp',
+}
+
+
+class EventStore:
+    def __init__(self, path=None):
+        self.path = path or settings.EVENT_DB
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def insert_many(self, log, entries):
+        """Insert a batch of events from one log in a single transaction"""
+        rows = [(log, *(entry.get(c) for c in COLUMNS)) for entry in entries]
+        with self.db:
+            self.db.executemany(INSERT, rows)
+        return len(rows)
+
+    def count(self, log, service=None):
+        sql = "SELECT COUNT(*) FROM events WHERE log = ?"
+        params = [log]
+        if service:
+            sql += " AND service = ?"
+            params.append(service)
+        return self.db.execute(sql, params).fetchone()[0]
+
+    def counts(self, log, column, limit=None, skip_empty=False):
+        """Counter of column values for one log, most common first"""
+        sql = f"SELECT {column}, COUNT(*) AS n FROM events WHERE log = ?"
+        if skip_empty:
+            sql += f" AND {column} IS NOT NULL AND {column} != ''"
+        sql += f" GROUP BY {column} ORDER BY n DESC, MIN(id)"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return Counter(dict(self.db.execute(sql, (log,)).fetchall()))
+
+    def combo_counts(self, limit=10):
+        sql = ("SELECT username, password, COUNT(*) AS n FROM events WHERE log = 'auth' "
+               "GROUP BY username, password ORDER BY n DESC, MIN(id) LIMIT ?")
+        return Counter({(u, p): n for u, p, n in self.db.execute(sql, (limit,))})
+
+    def distinct(self, column, log=None):
+        sql = f"SELECT DISTINCT {column} FROM events"
+        params = ()
+        if log:
+            sql += " WHERE log = ?"
+            params = (log,)
+        return {row[0] for row in self.db.execute(sql, params)}
+
+    def count_distinct(self, column, logs):
+        """Number of distinct column values across several logs, counted in
+        SQLite rather than by building the sets"""
+        sql = (f"SELECT COUNT(*) FROM (SELECT DISTINCT {column} FROM events "
+               f"WHERE log IN ({', '.join('?' * len(logs))}))")
+        return self.db.execute(sql, tuple(logs)).fetchone()[0]
+
+    def hour_counts(self, log='auth'):
+        sql = ("SELECT CAST(substr(timestamp, 12, 2) AS INTEGER) AS hour, COUNT(*) "
+               "FROM events WHERE log = ? AND length(timestamp) >= 13 GROUP BY hour")
+        hours = [0] * 24
+        for hour, count in self.db.execute(sql, (log,)):
+            if hour is not None and 0 <= hour < 24:
+                hours[hour] = count
+        return hours
+
+    def events_after(self, log, after_id=0, limit=10000):
+        """Return (id, entry) pairs for events inserted after ``after_id``"""
+        sql = (f"SELECT id, {', '.join(COLUMNS)} FROM events WHERE log = ? AND id > ? "
+               f"ORDER BY id LIMIT ?")
+        return [(row[0], {c: v for c, v in zip(COLUMNS, row[1:]) if v is not None})
+                for row in self.db.execute(sql, (log, after_id, limit))]
+
+    def recent_page(self, log, limit, before_id=None, services=None, since=None, until=None):
+        """Return (id, entry) pairs newest first, optionally filtered by id
+        cursor, service and [since, until) ISO timestamps"""
+        sql = f"SELECT id, {', '.join(COLUMNS)} FROM events WHERE log = ?"
+        params = [log]
+        if before_id is not None:
+            sql += " AND id < ?"
+            params.append(before_id)
+        if services:
+            sql += f" AND service IN ({', '.join('?' * len(services))})"
+            params.extend(services)
+        if since:
+            sql += " AND timestamp >= ?"
+            params.append(since)
+        if until:
+            sql += " AND timestamp < ?"
+            params.append(until)
+        sql += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        return [(row[0], {c: v for c, v in zip(COLUMNS, row[1:]) if v is not None})
+                for row in self.db.execute(sql, params)]
+
+    def recent(self, log='auth', limit=10):
+        sql = (f"SELECT {', '.join(COLUMNS)} FROM events WHERE log = ? "
+               f"ORDER BY timestamp DESC LIMIT ?")
+        return [{c: v for c, v in zip(COLUMNS, row) if v is not None}
+                for row in self.db.execute(sql, (log, limit))]
+
+
+def import_logs(store, logs_dir=None, batch_size=10000):
+    """One-shot import of the existing JSON logs"""
+    logs_dir = logs_dir or settings.LOGS_DIR
+    for filename, log in LOGS.items():
+        path = os.path.join(logs_dir, filename)
+        if not os.path.exists(path):
+            continue
+        total = 0
+        batch = []
+        decoder = decoder_for(path)
+        with open(path, "rb") as f:
+            for entry in decoder.iter_lines(f):
+                batch.append(entry)
+                if len(batch) >= batch_size:
+                    total += store.insert_many(log, batch)
+                    batch = []
+        if batch:
+            total += store.insert_many(log, batch)
+        print(f"[+] Imported {total} events from {filename}")
+        decoder.report(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import JSON logs into the SQLite event store")
+    parser.add_argument('--db', default=settings.EVENT_DB)
+    parser.add_argument('--logs-dir', default=settings.LOGS_DIR)
+    args = parser.parse_args()
+
+    store = EventStore(args.db)
+    import_logs(store, args.logs_dir)
+    store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,30 +1,26 @@
 #!/usr/bin/env python3
-import socket
-import threading
+import asyncio
 import datetime
-import json
-import os
 
-
-if not os.path.exists("../logs"):
-    os.makedirs("../logs")
+from log_sink import log_event
 
 FTP_PORT = 2121
 BANNER = "220 FTP Server Ready\r\n"
+IDLE_TIMEOUT = 300
 
-def handle_client(client_socket, addr):
-    client_ip = addr[0]
-    client_port = addr[1]
+async def handle_client(reader, writer):
+    client_ip, client_port = writer.get_extra_info('peername')[:2]
 
 
-    client_socket.send(BANNER.encode())
+    writer.write(BANNER.encode())
 
     username = None
     password = None
 
     try:
         while True:
-            data = client_socket.recv(1024).decode().strip()
+            data = await asyncio.wait_for(reader.read(1024), IDLE_TIMEOUT)
+            data = data.decode().strip()
             if not data:
                 break
 
@@ -37,13 +33,12 @@ def handle_client(client_socket, addr):
                 "command": data
             }
 
-            with open("../logs/ftp_commands.json", "a") as f:
-                f.write(json.dumps(log_entry) + "\n")
+            log_event('ftp_commands.json', log_entry)
 
 
             if data.startswith("USER"):
                 username = data[5:]
-                client_socket.send("331 Password required\r\n".encode())
+                writer.write("331 Password required\r\n".encode())
 
 
             elif data.startswith("PASS"):
@@ -59,41 +54,28 @@ def handle_client(client_socket, addr):
                         "service": "ftp"
                     }
 
-                    with open("../logs/auth_attempts.json", "a") as f:
-                        f.write(json.dumps(log_entry) + "\n")
+                    log_event('auth_attempts.json', log_entry)
 
                     print(f"[+] FTP login attempt: {username}:{password} from {client_ip}")
 
-                client_socket.send("530 Login incorrect\r\n".encode())
+                writer.write("530 Login incorrect\r\n".encode())
 
 
             else:
-                client_socket.send("530 Please login with USER and PASS\r\n".encode())
+                writer.write("530 Please login with USER and PASS\r\n".encode())
+
+            await writer.drain()
 
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
     except Exception as e:
         print(f"[-] Error: {e}")
     finally:
-        client_socket.close()
+        writer.close()
 
 def main():
-    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-
-    server.bind(('0.0.0.0', FTP_PORT))
-    server.listen(5)
-
-    print(f"[+] FTP honeypot listening on port {FTP_PORT}")
-
-    try:
-        while True:
-            client, addr = server.accept()
-            client_handler = threading.Thread(target=handle_client, args=(client, addr))
-            client_handler.daemon = True
-            client_handler.start()
-    except KeyboardInterrupt:
-        print("[!] Shutting down FTP honeypot")
-    finally:
-        server.close()
+    import engine
+    engine.run(['ftp'])
 
 if __name__ == "__main__":
     main()
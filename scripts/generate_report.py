@@ -1,327 +1,605 @@
 #!/usr/bin/env python3
+import argparse
+import concurrent.futures
+import functools
+import hashlib
+import heapq
 import json
 import datetime
 import os
-import matplotlib.pyplot as plt
-from jinja2 import Template
+from jinja2 import DictLoader, Environment, FileSystemBytecodeCache
 import time
 
-def load_logs(filename):
-    """Load log entries from a file"""
-    data = []
+import settings
+from codec import decoder_for
+from geo_cache import write_json_atomic
+from parallel import aggregate, log_shards
+from rollups import Rollups
+from segments import open_segment
+from sketches import make_counter, make_distinct
+
+IMAGES_DIR = os.path.join(settings.REPORTS_DIR, 'images')
+REPORT_PATH = os.path.join(settings.REPORTS_DIR, 'honeypot_report.html')
+# Content hashes of the data behind each rendered chart file
+CHART_MANIFEST = os.path.join(IMAGES_DIR, 'charts.json')
+# Bump when the chart styling changes so cached files are redrawn
+CHART_VERSION = 1
+CHART_FORMATS = ('png', 'svg', 'json')
+
+def iter_logs(filename):
+    """Yield log entries from a file one at a time"""
+    decoder = decoder_for(filename)
     try:
-        with open(filename, "r") as f:
-            for line in f:
-                try:
-                    data.append(json.loads(line))
-                except:
-                    pass
+        with open_segment(filename) as f:
+            yield from decoder.iter_lines(f)
     except FileNotFoundError:
         pass
-    return data
+    decoder.report(filename)
 
 def load_geo_data():
     """Load geolocation data"""
     try:
-        with open("../logs/geolocation.json", "r") as f:
+        with open(os.path.join(settings.LOGS_DIR, 'geolocation.json'), "r") as f:
             return json.load(f)
     except FileNotFoundError:
         return {}
 
-def generate_time_chart(auth_attempts):
-    """Generate chart showing attacks by hour of day"""
-    # Count attacks by hour
-    hours = [0] * 24
-    for attempt in auth_attempts:
-        try:
-            timestamp = datetime.datetime.fromisoformat(attempt.get("timestamp", ""))
-            hours[timestamp.hour] += 1
-        except:
-            pass
-
-    # Create chart
-    plt.figure(figsize=(10, 6))
-    plt.bar(range(24), hours, color='#4CAF50')
-    plt.xlabel('Hour of Day')
-    plt.ylabel('Number of Attacks')
-    plt.title('Attack Distribution by Hour')
-    plt.xticks(range(24))
-    plt.grid(axis='y', linestyle='--', alpha=0.7)
-
-    # Ensure directory exists
-    os.makedirs("../reports/images", exist_ok=True)
-
-    # Save chart
-    plt.savefig("../reports/images/time_distribution.png")
-    plt.close()
-
-    return hours
-
-def generate_service_chart(auth_attempts):
-    """Generate chart showing attacks by service"""
-    # Count attacks by service
-    services = {}
-    for attempt in auth_attempts:
-        service = attempt.get("service", "unknown")
-        services[service] = services.get(service, 0) + 1
-    # Create chart
-    plt.figure(figsize=(8, 8))
-    labels = list(services.keys())
-    sizes = list(services.values())
-    colors = ['#4CAF50', '#2196F3', '#FFC107', '#F44336', '#9C27B0']
-    plt.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=140, colors=colors)
-    plt.axis('equal')
-    plt.title('Attacks by Service')
-
-    # Save chart
-    plt.savefig("../reports/images/service_distribution.png")
-    plt.close()
-
-    return services
-
-def generate_country_chart(geo_data):
-    """Generate chart showing attacks by country"""
-    # Count attacks by country
+def time_chart_spec(hours):
+    """Chart data for attacks by hour of day"""
+    return {
+        "kind": "bar",
+        "title": "Attack Distribution by Hour",
+        "xlabel": "Hour of Day",
+        "ylabel": "Number of Attacks",
+        "labels": list(range(24)),
+        "values": list(hours),
+        "colors": ["#4CAF50"],
+        "figsize": [10, 6],
+        "grid": True,
+    }
+
+def service_chart_spec(services):
+    """Chart data for attacks by service"""
+    return {
+        "kind": "pie",
+        "title": "Attacks by Service",
+        "labels": list(services.keys()),
+        "values": list(services.values()),
+        "colors": ["#4CAF50", "#2196F3", "#FFC107", "#F44336", "#9C27B0"],
+        "figsize": [8, 8],
+    }
+
+def country_chart_spec(geo_data):
+    """Chart data for the top 10 countries by number of attackers"""
+    # Count attackers by country
     countries = {}
     for ip, data in geo_data.items():
         country = data.get("country", "Unknown")
         countries[country] = countries.get(country, 0) + 1
 
-    # Sort by count
-    sorted_countries = sorted(countries.items(), key=lambda x: x[1], reverse=True)
-
-    # Take top 10
-    top_countries = sorted_countries[:10]
-
-    # Create chart
-    plt.figure(figsize=(10, 6))
-    plt.bar([x[0] for x in top_countries], [x[1] for x in top_countries], color='#2196F3')
-    plt.xlabel('Country')
-    plt.ylabel('Number of Attackers')
-    plt.title('Attackers by Country')
-    plt.xticks(rotation=45, ha='right')
-    plt.tight_layout()
-
-    # Save chart
-    plt.savefig("../reports/images/country_distribution.png")
-    plt.close()
-
-    return dict(top_countries)
-
-def generate_html_report(auth_attempts, web_visits, geo_data):
-    """Generate HTML report with all data and charts"""
-    # Generate charts
-    generate_time_chart(auth_attempts)
-    generate_service_chart(auth_attempts)
-    generate_country_chart(geo_data)
-
-    # Calculate statistics
-    total_attacks = len(auth_attempts)
-    unique_ips = len(set(a.get("source_ip", "") for a in auth_attempts))
-
-    # Count by service
-    services = {}
-    for attempt in auth_attempts:
+    # Top 10 by count
+    top_countries = sorted(countries.items(), key=lambda x: x[1], reverse=True)[:10]
+
+    return {
+        "kind": "bar",
+        "title": "Attackers by Country",
+        "xlabel": "Country",
+        "ylabel": "Number of Attackers",
+        "labels": [x[0] for x in top_countries],
+        "values": [x[1] for x in top_countries],
+        "colors": ["#2196F3"],
+        "figsize": [10, 6],
+        "rotate_labels": True,
+    }
+
+def render_chart(spec, path, fmt):
+    """Draw one chart with the object-oriented Agg API and save it"""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=spec["figsize"])
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.set_title(spec["title"])
+    if spec["kind"] == "pie":
+        ax.pie(spec["values"], labels=spec["labels"], autopct='%1.1f%%', startangle=140,
+               colors=spec["colors"])
+        ax.axis('equal')
+    else:
+        ax.bar([str(label) for label in spec["labels"]], spec["values"], color=spec["colors"][0])
+        ax.set_xlabel(spec["xlabel"])
+        ax.set_ylabel(spec["ylabel"])
+        if spec.get("grid"):
+            ax.grid(axis='y', linestyle='--', alpha=0.7)
+        if spec.get("rotate_labels"):
+            for label in ax.get_xticklabels():
+                label.set_rotation(45)
+                label.set_ha('right')
+            fig.tight_layout()
+    fig.savefig(path, format=fmt)
+    return path
+
+def chart_digest(spec):
+    data = json.dumps([CHART_VERSION, spec], sort_keys=True).encode()
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+def render_charts(specs, fmt='png', workers=1):
+    """Render the charts whose data changed since the last run.
+
+    ``specs`` maps chart names to chart data. Returns how many were drawn;
+    "json" charts are drawn by the browser and never rendered here.
+    """
+    if fmt == 'json':
+        return 0
+    os.makedirs(IMAGES_DIR, exist_ok=True)
+    try:
+        with open(CHART_MANIFEST, "r") as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        manifest = {}
+
+    stale = []
+    for name, spec in specs.items():
+        filename = f"{name}.{fmt}"
+        digest = chart_digest(spec)
+        path = os.path.join(IMAGES_DIR, filename)
+        if manifest.get(filename) != digest or not os.path.exists(path):
+            stale.append((spec, path, fmt))
+            manifest[filename] = digest
+
+    if workers > 1 and len(stale) > 1:
+        with concurrent.futures.ProcessPoolExecutor(min(workers, len(stale))) as pool:
+            list(pool.map(render_chart, *zip(*stale)))
+    else:
+        for task in stale:
+            render_chart(*task)
+
+    write_json_atomic(CHART_MANIFEST, manifest)
+    print(f"[+] Rendered {len(stale)} of {len(specs)} charts ({len(specs) - len(stale)} unchanged)")
+    return len(stale)
+
+class ReportStats:
+    """Report statistics accumulated one auth attempt at a time"""
+
+    def __init__(self, recent_limit=None):
+        self.recent_limit = recent_limit or settings.REPORT_RECENT
+        self.rollups = Rollups()
+        self.services = {}
+        self.usernames = make_counter()
+        self.passwords = make_counter()
+        self.ips = make_distinct()
+        self.recent = []
+        self.total = 0
+
+    def add(self, attempt):
+        self.total += 1
+        self.rollups.add(attempt)
         service = attempt.get("service", "unknown")
-        services[service] = services.get(service, 0) + 1
+        self.services[service] = self.services.get(service, 0) + 1
+        self.ips.add(attempt.get("source_ip", ""))
 
-    # Count usernames and passwords
-    usernames = {}
-    passwords = {}
-    for attempt in auth_attempts:
+        # Count usernames and passwords
         username = attempt.get("username", "")
         password = attempt.get("password", "")
-
         if username:
-            usernames[username] = usernames.get(username, 0) + 1
+            self.usernames.add(username)
         if password:
-            passwords[password] = passwords.get(password, 0) + 1
-
-    # Get top 10 usernames and passwords
-    top_usernames = sorted(usernames.items(), key=lambda x: x[1], reverse=True)[:10]
-    top_passwords = sorted(passwords.items(), key=lambda x: x[1], reverse=True)[:10]
-
-    # Get recent attacks (last 20)
-    recent_attacks = sorted(auth_attempts, key=lambda x: x.get("timestamp", ""), reverse=True)[:20]
-
-    # Add geolocation data to recent attacks
-    for attack in recent_attacks:
-        ip = attack.get("source_ip", "")
-        if ip in geo_data:
-            attack["geo"] = geo_data[ip]
-
-    # HTML template
-    template_str = """
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Honeypot Security Report</title>
-        <style>
-            body { font-family: Arial, sans-serif; margin: 0; padding: 0; background-color: #f5f5f5; color: #333; }
-            .container { max-width: 1200px; margin: 0 auto; padding: 20px; }
-            .header { background-color: #2c3e50; color: white; padding: 20px; margin-bottom: 20px; border-radius: 5px; }
-            .section { margin-bottom: 30px; background: white; padding: 20px; border-radius: 5px; box-shadow: 0 2px 5px rgba(0,0,0,0.1); }
-            h1, h2, h3 { margin-top: 0; }
-            .stats { display: flex; flex-wrap: wrap; justify-content: space-between; margin-bottom: 20px; }
-            .stat-box { flex: 1; min-width: 200px; background-color: white; padding: 15px; margin: 10px; border-radius: 5px; text-align: center; box-shadow: 0 2px 5px rgba(0,0,0,0.1); }
-            .stat-box h3 { margin-top: 0; color: #2c3e50; }
-            .stat-box p { font-size: 24px; font-weight: bold; margin: 10px 0; color: #4CAF50; }
-            .chart-container { text-align: center; margin: 20px 0; }
-            .chart-container img { max-width: 100%; height: auto; border-radius: 5px; box-shadow: 0 2px 5px rgba(0,0,0,0.1); }
-            table { width: 100%; border-collapse: collapse; margin: 20px 0; }
-            th, td { padding: 12px 15px; text-align: left; border-bottom: 1px solid #ddd; }
-            th { background-color: #4CAF50; color: white; }
-            tr:hover { background-color: #f5f5f5; }
-            .footer { text-align: center; margin-top: 30px; padding: 20px; color: #777; }
-        </style>
-    </head>
-    <body>
-        <div class="header">
-            <div class="container">
-                <h1>Honeypot Security Report</h1>
-                <p>Generated on {{ date }}</p>
-            </div>
-        </div>
+            self.passwords.add(password)
+
+        # Keep the most recent attacks, oldest position first on ties
+        self._keep_recent((attempt.get("timestamp", ""), -self.total, attempt))
+
+    def _keep_recent(self, item):
+        if len(self.recent) < self.recent_limit:
+            heapq.heappush(self.recent, item)
+        elif item > self.recent[0]:
+            heapq.heapreplace(self.recent, item)
+
+    def update(self, other):
+        """Merge statistics from a later shard of the log"""
+        self.rollups.update(other.rollups)
+        for service, count in other.services.items():
+            self.services[service] = self.services.get(service, 0) + count
+        self.usernames.update(other.usernames)
+        self.passwords.update(other.passwords)
+        self.ips.update(other.ips)
+        for timestamp, position, attempt in other.recent:
+            self._keep_recent((timestamp, position - self.total, attempt))
+        self.total += other.total
+
+    def as_dict(self):
+        return {
+            "hours": self.rollups.hour_of_day(),
+            "services": self.services,
+            "total_attacks": self.total,
+            "unique_ips": len(self.ips),
+            # Top 10 usernames and passwords
+            "top_usernames": self.usernames.most_common(10),
+            "top_passwords": self.passwords.most_common(10),
+            "recent_attacks": [item[2] for item in heapq.nlargest(self.recent_limit, self.recent)],
+        }
+
+def collect_stats(auth_attempts, recent_limit=None):
+    """Compute report statistics from an iterable of auth attempts"""
+    stats = ReportStats(recent_limit)
+    for attempt in auth_attempts:
+        stats.add(attempt)
+    return stats.as_dict()
+
+def collect_store_stats(store, recent_limit=None):
+    """Compute report statistics with SQL aggregates over the event store
+    (or Arrow aggregates over the Parquet archive)"""
+    return {
+        "hours": store.hour_counts('auth'),
+        "services": dict(store.counts('auth', 'service')),
+        "total_attacks": store.count('auth'),
+        "unique_ips": len(store.distinct('source_ip', 'auth')),
+        "top_usernames": store.counts('auth', 'username', limit=10, skip_empty=True).most_common(),
+        "top_passwords": store.counts('auth', 'password', limit=10, skip_empty=True).most_common(),
+        "recent_attacks": store.recent('auth', recent_limit or settings.REPORT_RECENT),
+    }
+
+LAYOUT_TEMPLATE = """
+<!DOCTYPE html>
+<html>
+<head>
+    <title>{% block title %}Honeypot Security Report{% endblock %}</title>
+    <style>
+        body { font-family: Arial, sans-serif; margin: 0; padding: 0; background-color: #f5f5f5; color: #333; }
+        .container { max-width: 1200px; margin: 0 auto; padding: 20px; }
+        .header { background-color: #2c3e50; color: white; padding: 20px; margin-bottom: 20px; border-radius: 5px; }
+        .section { margin-bottom: 30px; background: white; padding: 20px; border-radius: 5px; box-shadow: 0 2px 5px rgba(0,0,0,0.1); }
+        h1, h2, h3 { margin-top: 0; }
+        .stats { display: flex; flex-wrap: wrap; justify-content: space-between; margin-bottom: 20px; }
+        .stat-box { flex: 1; min-width: 200px; background-color: white; padding: 15px; margin: 10px; border-radius: 5px; text-align: center; box-shadow: 0 2px 5px rgba(0,0,0,0.1); }
+        .stat-box h3 { margin-top: 0; color: #2c3e50; }
+        .stat-box p { font-size: 24px; font-weight: bold; margin: 10px 0; color: #4CAF50; }
+        .chart-container { text-align: center; margin: 20px 0; }
+        .chart-container img { max-width: 100%; height: auto; border-radius: 5px; box-shadow: 0 2px 5px rgba(0,0,0,0.1); }
+        .json-chart { width: 100%; max-width: 800px; height: 400px; }
+        table { width: 100%; border-collapse: collapse; margin: 20px 0; }
+        th, td { padding: 12px 15px; text-align: left; border-bottom: 1px solid #ddd; }
+        th { background-color: #4CAF50; color: white; }
+        tr:hover { background-color: #f5f5f5; }
+        .pager { text-align: center; margin: 20px 0; }
+        .pager a, .pager span { margin: 0 8px; }
+        .footer { text-align: center; margin-top: 30px; padding: 20px; color: #777; }
+    </style>
+</head>
+<body>
+    <div class="header">
         <div class="container">
-            <div class="section">
-                <h2>Executive Summary</h2>
-                <div class="stats">
-                    <div class="stat-box">
-                        <h3>Total Attacks</h3>
-                        <p>{{ total_attacks }}</p>
-                    </div>
-                    <div class="stat-box">
-                        <h3>Unique IPs</h3>
-                        <p>{{ unique_ips }}</p>
-                    </div>
-                    <div class="stat-box">
-                        <h3>Countries</h3>
-                        <p>{{ countries }}</p>
-                    </div>
-                </div>
-            </div>
-
-            <div class="section">
-                <h2>Attack Distribution</h2>
-                <div class="chart-container">
-                    <h3>Attacks by Service</h3>
-                    <img src="images/service_distribution.png" alt="Service Distribution">
+            <h1>Honeypot Security Report</h1>
+            <p>Generated on {{ date }}</p>
+        </div>
+    </div>
+    <div class="container">
+{% block content %}{% endblock %}
+        <div class="footer">
+            <p>Generated by Kali Honeypot System</p>
+        </div>
+    </div>
+    <script>
+        // Draw inline JSON charts as SVG bars and pies
+        const SVG = 'http://www.w3.org/2000/svg';
+        function svgElement(parent, name, attrs, text) {
+            const el = document.createElementNS(SVG, name);
+            Object.entries(attrs).forEach(([key, value]) => el.setAttribute(key, value));
+            if (text !== undefined) el.textContent = text;
+            parent.appendChild(el);
+            return el;
+        }
+        document.querySelectorAll('.json-chart').forEach(svg => {
+            const chart = JSON.parse(svg.dataset.chart);
+            const width = 800, height = 400, total = chart.values.reduce((a, b) => a + b, 0);
+            svg.setAttribute('viewBox', `0 0 ${width} ${height}`);
+            if (chart.kind === 'pie') {
+                let angle = 0;
+                chart.values.forEach((value, i) => {
+                    const start = angle, end = angle + 2 * Math.PI * value / (total || 1);
+                    angle = end;
+                    const point = a => [200 + 150 * Math.cos(a), 200 + 150 * Math.sin(a)];
+                    const [x1, y1] = point(start), [x2, y2] = point(end);
+                    const large = end - start > Math.PI ? 1 : 0;
+                    const color = chart.colors[i % chart.colors.length];
+                    svgElement(svg, 'path', {d: `M200,200 L${x1},${y1} A150,150 0 ${large} 1 ${x2},${y2} Z`, fill: color});
+                    svgElement(svg, 'rect', {x: 420, y: 60 + i * 30, width: 20, height: 20, fill: color});
+                    svgElement(svg, 'text', {x: 450, y: 75 + i * 30},
+                               `${chart.labels[i]} (${(100 * value / (total || 1)).toFixed(1)}%)`);
+                });
+            } else {
+                const max = Math.max(1, ...chart.values), slot = (width - 60) / Math.max(1, chart.values.length);
+                chart.values.forEach((value, i) => {
+                    const barHeight = (height - 60) * value / max;
+                    const bar = svgElement(svg, 'rect', {x: 50 + i * slot + slot * 0.1, y: height - 40 - barHeight,
+                                                         width: slot * 0.8, height: barHeight, fill: chart.colors[0]});
+                    svgElement(bar, 'title', {}, value);
+                    svgElement(svg, 'text', {x: 50 + i * slot + slot / 2, y: height - 25, 'text-anchor': 'middle',
+                                             'font-size': 11}, chart.labels[i]);
+                });
+            }
+        });
+    </script>
+</body>
+</html>
+"""
+
+MACROS_TEMPLATE = """
+{% macro attacks_table(attacks, geo_data) %}
+    <table>
+        <tr>
+            <th>Time</th>
+            <th>Source IP</th>
+            <th>Location</th>
+            <th>Service</th>
+            <th>Username</th>
+            <th>Password</th>
+        </tr>
+        {% for attack in attacks %}
+        <tr>
+            <td>{{ attack.timestamp }}</td>
+            <td>{{ attack.source_ip }}</td>
+            <td>
+                {% set geo = geo_data.get(attack.source_ip) %}
+                {% if geo %}
+                    {{ geo.city }}, {{ geo.country }}
+                {% else %}
+                    Unknown
+                {% endif %}
+            </td>
+            <td>{{ attack.service }}</td>
+            <td>{{ attack.username }}</td>
+            <td>{{ attack.password }}</td>
+        </tr>
+        {% endfor %}
+    </table>
+{% endmacro %}
+
+{% macro pager(page, pages) %}
+{% if pages > 1 %}
+<div class="pager">
+    {% if page > 1 %}<a href="{{ page_file(1) }}">First</a><a href="{{ page_file(page - 1) }}">Previous</a>{% endif %}
+    <span>Page {{ page }} of {{ pages }}</span>
+    {% if page < pages %}<a href="{{ page_file(page + 1) }}">Next</a><a href="{{ page_file(pages) }}">Last</a>{% endif %}
+</div>
+{% endif %}
+{% endmacro %}
+"""
+
+REPORT_TEMPLATE = """
+{% extends "layout.html" %}
+{% from "macros.html" import attacks_table, pager %}
+{% block content %}
+        <div class="section">
+            <h2>Executive Summary</h2>
+            <div class="stats">
+                <div class="stat-box">
+                    <h3>Total Attacks</h3>
+                    <p>{{ total_attacks }}</p>
                 </div>
-                <div class="chart-container">
-                    <h3>Attacks by Time of Day</h3>
-                    <img src="images/time_distribution.png" alt="Time Distribution">
+                <div class="stat-box">
+                    <h3>Unique IPs</h3>
+                    <p>{{ unique_ips }}</p>
                 </div>
-                <div class="chart-container">
-                    <h3>Attackers by Country</h3>
-                    <img src="images/country_distribution.png" alt="Country Distribution">
+                <div class="stat-box">
+                    <h3>Countries</h3>
+                    <p>{{ countries }}</p>
                 </div>
             </div>
+        </div>
 
-            <div class="section">
-                <h2>Top Attack Vectors</h2>
-                <div style="display: flex; flex-wrap: wrap;">
-                    <div style="flex: 1; min-width: 300px; margin-right: 20px;">
-                        <h3>Top Usernames</h3>
-                        <table>
-                            <tr>
-                                <th>Username</th>
-                                <th>Count</th>
-                            </tr>
-                            {% for username, count in top_usernames %}
-                            <tr>
-                                <td>{{ username }}</td>
-                                <td>{{ count }}</td>
-                            </tr>
-                            {% endfor %}
-                        </table>
-                    </div>
-                    <div style="flex: 1; min-width: 300px;">
-                        <h3>Top Passwords</h3>
-                        <table>
-                            <tr>
-                                <th>Password</th>
-                                <th>Count</th>
-                            </tr>
-                            {% for password, count in top_passwords %}
-                            <tr>
-                                <td>{{ password }}</td>
-                                <td>{{ count }}</td>
-                            </tr>
-                            {% endfor %}
-                        </table>
-                    </div>
-                </div>
-            </div>
-            <div class="section">
-                <h2>Recent Attacks</h2>
-                <table>
-                    <tr>
-                        <th>Time</th>
-                        <th>Source IP</th>
-                        <th>Location</th>
-                        <th>Service</th>
-                        <th>Username</th>
-                        <th>Password</th>
-                    </tr>
-                    {% for attack in recent_attacks %}
-                    <tr>
-                        <td>{{ attack.timestamp }}</td>
-                        <td>{{ attack.source_ip }}</td>
-                        <td>
-                            {% if attack.geo %}
-                                {{ attack.geo.city }}, {{ attack.geo.country }}
-                            {% else %}
-                                Unknown
-                            {% endif %}
-                        </td>
-                        <td>{{ attack.service }}</td>
-                        <td>{{ attack.username }}</td>
-                        <td>{{ attack.password }}</td>
-                    </tr>
-                    {% endfor %}
-                </table>
+        <div class="section">
+            <h2>Attack Distribution</h2>
+            {% for chart in charts %}
+            <div class="chart-container">
+                <h3>{{ chart.heading }}</h3>
+                {% if chart.src %}
+                <img src="{{ chart.src }}" alt="{{ chart.heading }}">
+                {% else %}
+                <svg class="json-chart" data-chart='{{ chart.spec | tojson }}'></svg>
+                {% endif %}
             </div>
+            {% endfor %}
+        </div>
 
-            <div class="footer">
-                <p>Generated by Kali Honeypot System</p>
+        <div class="section">
+            <h2>Top Attack Vectors</h2>
+            <div style="display: flex; flex-wrap: wrap;">
+                <div style="flex: 1; min-width: 300px; margin-right: 20px;">
+                    <h3>Top Usernames</h3>
+                    <table>
+                        <tr>
+                            <th>Username</th>
+                            <th>Count</th>
+                        </tr>
+                        {% for username, count in top_usernames %}
+                        <tr>
+                            <td>{{ username }}</td>
+                            <td>{{ count }}</td>
+                        </tr>
+                        {% endfor %}
+                    </table>
+                </div>
+                <div style="flex: 1; min-width: 300px;">
+                    <h3>Top Passwords</h3>
+                    <table>
+                        <tr>
+                            <th>Password</th>
+                            <th>Count</th>
+                        </tr>
+                        {% for password, count in top_passwords %}
+                        <tr>
+                            <td>{{ password }}</td>
+                            <td>{{ count }}</td>
+                        </tr>
+                        {% endfor %}
+                    </table>
+                </div>
             </div>
         </div>
-    </body>
-    </html>
-    """
-
-    # Render template
-    template = Template(template_str)
-    html = template.render(
-        date=datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        <div class="section">
+            <h2>Recent Attacks</h2>
+            {{ attacks_table(attacks, geo_data) }}
+            {{ pager(1, pages) }}
+        </div>
+{% endblock %}
+"""
+
+RECENT_TEMPLATE = """
+{% extends "layout.html" %}
+{% from "macros.html" import attacks_table, pager %}
+{% block title %}Honeypot Security Report - Recent Attacks, Page {{ page }}{% endblock %}
+{% block content %}
+        <div class="section">
+            <h2>Recent Attacks</h2>
+            {{ pager(page, pages) }}
+            {{ attacks_table(attacks, geo_data) }}
+            {{ pager(page, pages) }}
+        </div>
+{% endblock %}
+"""
+
+TEMPLATES = {
+    "layout.html": LAYOUT_TEMPLATE,
+    "macros.html": MACROS_TEMPLATE,
+    "report.html": REPORT_TEMPLATE,
+    "recent.html": RECENT_TEMPLATE,
+}
+
+_environment = None
+
+def page_path(page):
+    """Path of one report page; page 1 is the main report"""
+    if page == 1:
+        return REPORT_PATH
+    root, ext = os.path.splitext(REPORT_PATH)
+    return f"{root}_{page}{ext}"
+
+def page_file(page):
+    return os.path.basename(page_path(page))
+
+def remove_stale_pages(pages):
+    """Delete numbered pages left over from a longer previous report"""
+    page = pages + 1
+    while os.path.exists(page_path(page)):
+        os.remove(page_path(page))
+        page += 1
+
+def get_environment():
+    """Template environment, compiled once per process and cached as
+    bytecode on disk across runs"""
+    global _environment
+    if _environment is None:
+        os.makedirs(settings.TEMPLATE_CACHE_DIR, exist_ok=True)
+        env = Environment(loader=DictLoader(TEMPLATES),
+                          bytecode_cache=FileSystemBytecodeCache(settings.TEMPLATE_CACHE_DIR),
+                          autoescape=True)
+        env.globals["page_file"] = page_file
+        _environment = env
+    return _environment
+
+def write_streamed(path, template, **context):
+    """Render a template chunk by chunk into a temp file, then rename it
+    over the target so readers never see a half-written page"""
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        f.writelines(template.generate(**context))
+    os.replace(tmp, path)
+
+def generate_html_report(stats, geo_data, chart_format=None, workers=1, page_size=None):
+    """Generate HTML report with all data and charts"""
+    # Generate charts
+    chart_format = chart_format or settings.REPORT_CHART_FORMAT
+    specs = {
+        "service_distribution": service_chart_spec(stats["services"]),
+        "time_distribution": time_chart_spec(stats["hours"]),
+        "country_distribution": country_chart_spec(geo_data),
+    }
+    render_charts(specs, chart_format, workers)
+    headings = {
+        "service_distribution": "Attacks by Service",
+        "time_distribution": "Attacks by Time of Day",
+        "country_distribution": "Attackers by Country",
+    }
+    charts = [{
+        "heading": headings[name],
+        "src": None if chart_format == 'json' else f"images/{name}.{chart_format}",
+        "spec": spec,
+    } for name, spec in specs.items()]
+
+    total_attacks = stats["total_attacks"]
+    unique_ips = stats["unique_ips"]
+    top_usernames = stats["top_usernames"]
+    top_passwords = stats["top_passwords"]
+    recent_attacks = stats["recent_attacks"]
+    date = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    # Recent attacks go on the main page and continue on numbered pages
+    page_size = page_size or settings.REPORT_PAGE_SIZE
+    pages = max(1, -(-len(recent_attacks) // page_size))
+    env = get_environment()
+    write_streamed(REPORT_PATH, env.get_template("report.html"),
+        date=date,
         total_attacks=total_attacks,
         unique_ips=unique_ips,
         countries=len(set(data.get("country", "Unknown") for data in geo_data.values())),
         top_usernames=top_usernames,
         top_passwords=top_passwords,
-        recent_attacks=recent_attacks
+        attacks=recent_attacks[:page_size],
+        geo_data=geo_data,
+        pages=pages,
+        charts=charts
     )
-
-    # Save HTML report
-    with open("../reports/honeypot_report.html", "w") as f:
-        f.write(html)
-
-    print(f"[+] Report generated: ../reports/honeypot_report.html")
+    recent_template = env.get_template("recent.html")
+    for page in range(2, pages + 1):
+        write_streamed(page_path(page), recent_template,
+                       date=date,
+                       attacks=recent_attacks[(page - 1) * page_size:page * page_size],
+                       geo_data=geo_data,
+                       page=page,
+                       pages=pages)
+    remove_stale_pages(pages)
+
+    print(f"[+] Report generated: {REPORT_PATH}" + (f" ({pages} pages)" if pages > 1 else ""))
 
 def main():
+    parser = argparse.ArgumentParser(description="Generate the honeypot HTML report")
+    parser.add_argument('--backend', choices=('json', 'sqlite', 'archive'),
+                        default='json' if settings.LOG_BACKEND == 'json' else 'sqlite')
+    parser.add_argument('--workers', type=int, default=1,
+                        help="parse logs and render charts in this many processes (1 = serial)")
+    parser.add_argument('--chart-format', choices=CHART_FORMATS, default=settings.REPORT_CHART_FORMAT,
+                        help="png or svg image files, or json drawn inline by the browser")
+    parser.add_argument('--recent', type=int, default=settings.REPORT_RECENT,
+                        help="number of most recent attacks to list")
+    parser.add_argument('--page-size', type=int, default=settings.REPORT_PAGE_SIZE,
+                        help="recent attacks per HTML page")
+    args = parser.parse_args()
+
     print("[+] Generating honeypot report...")
 
     # Create reports directory if it doesn't exist
-    os.makedirs("../reports", exist_ok=True)
-    os.makedirs("../reports/images", exist_ok=True)
+    os.makedirs(settings.REPORTS_DIR, exist_ok=True)
+    os.makedirs(IMAGES_DIR, exist_ok=True)
 
     # Load data
-    auth_attempts = load_logs("../logs/auth_attempts.json")
-    web_visits = load_logs("../logs/web_visits.json")
     geo_data = load_geo_data()
+    if args.backend == 'sqlite':
+        from event_store import EventStore
+        stats = collect_store_stats(EventStore(), args.recent)
+    elif args.backend == 'archive':
+        from archive import Archive
+        stats = collect_store_stats(Archive(), args.recent)
+    else:
+        paths = log_shards(os.path.join(settings.LOGS_DIR, 'auth_attempts.json'))
+        if args.workers > 1:
+            stats = aggregate([(paths, 'add')], functools.partial(ReportStats, args.recent),
+                              args.workers).as_dict()
+        else:
+            stats = collect_stats((entry for path in paths for entry in iter_logs(path)), args.recent)
 
     # Generate report
-    generate_html_report(auth_attempts, web_visits, geo_data)
+    generate_html_report(stats, geo_data, args.chart_format, args.workers, args.page_size)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Persistent geolocation cache with per-entry TTL and negative caching.
+
+Entries live in an append-only journal: one JSON line per lookup, the last
+line for an IP wins. Every lookup is on disk as soon as it completes, so an
+interrupted run resumes where it stopped. A torn final line from a crash is
+ignored on load, and compaction rewrites the journal atomically.
+"""
+
+import json
+import os
+import time
+
+import settings
+
+
+class GeoCache:
+    def __init__(self, path=None, ttl=None, negative_ttl=None):
+        self.path = path or settings.GEO_CACHE_PATH
+        self.ttl = settings.GEO_CACHE_TTL if ttl is None else ttl
+        self.negative_ttl = settings.GEO_NEGATIVE_TTL if negative_ttl is None else negative_ttl
+        self.entries = {}
+        self.journal_lines = 0
+        self._load()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.journal = open(self.path, "a")
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        self.entries[record["ip"]] = (record["ts"], record["data"])
+                    except (ValueError, KeyError, TypeError):
+                        continue
+                    self.journal_lines += 1
+        except FileNotFoundError:
+            pass
+
+    def _fresh(self, ip, now=None):
+        entry = self.entries.get(ip)
+        if entry is None:
+            return False
+        ts, data = entry
+        ttl = self.ttl if data is not None else self.negative_ttl
+        return (now or time.time()) - ts < ttl
+
+    def get(self, ip):
+        """Return the cached location for an IP, or None if unknown, failed
+        or expired"""
+        if self._fresh(ip):
+            return self.entries[ip][1]
+        return None
+
+    def needs_lookup(self, ips):
+        """Return the IPs that are new or whose entry has expired"""
+        now = time.time()
+        return [ip for ip in ips if not self._fresh(ip, now)]
+
+    def expired(self):
+        """Return the IPs whose successful lookup has expired"""
+        now = time.time()
+        return {ip for ip, (ts, data) in self.entries.items()
+                if data is not None and not self._fresh(ip, now)}
+
+    def put(self, ip, data):
+        """Record a lookup result; None caches a failed lookup"""
+        ts = time.time()
+        self.entries[ip] = (ts, data)
+        self.journal.write(json.dumps({"ip": ip, "ts": ts, "data": data}) + "\n")
+        self.journal.flush()
+        self.journal_lines += 1
+
+    def locations(self):
+        """Fresh successful lookups as {ip: location}"""
+        now = time.time()
+        return {ip: data for ip, (ts, data) in self.entries.items()
+                if data is not None and self._fresh(ip, now)}
+
+    def compact(self):
+        """Rewrite the journal with one line per IP, atomically"""
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            for ip, (ts, data) in self.entries.items():
+                f.write(json.dumps({"ip": ip, "ts": ts, "data": data}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.journal.close()
+        os.replace(tmp, self.path)
+        self.journal = open(self.path, "a")
+        self.journal_lines = len(self.entries)
+
+    def close(self):
+        self.journal.flush()
+        os.fsync(self.journal.fileno())
+        if self.journal_lines > 2 * len(self.entries):
+            self.compact()
+        self.journal.close()
+
+
+def write_json_atomic(path, data):
+    """Write JSON to a temp file and rename it over the target"""
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
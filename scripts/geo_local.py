@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""Offline IP geolocation from a local CIDR-range database.
+
+A CSV database is loaded into sorted arrays of range starts and ends, one set
+for IPv4 and one for IPv6, and each lookup is a binary search. MaxMind .mmdb
+files are read through the optional maxminddb package. Lookups return the
+same dict shape as geolocation.get_ip_location, so the dashboard and reports
+work unchanged.
+
+CSV columns: network,country,countryCode,region,city,lat,lon,isp,org where
+network is a CIDR block or a "first-last" address range.
+"""
+
+import argparse
+import bisect
+import csv
+import ipaddress
+import socket
+import time
+from array import array
+
+FIELDS = ("country", "countryCode", "region", "city", "lat", "lon", "isp", "org")
+
+
+def parse_network(network):
+    """Return (version, first, last) integer bounds for a CIDR or range"""
+    address, _, prefix = network.strip().partition('/')
+    if prefix and '.' in address:
+        # Fast path for IPv4 CIDR blocks, the bulk of any real database
+        first = int.from_bytes(socket.inet_pton(socket.AF_INET, address), 'big')
+        host_bits = 32 - int(prefix)
+        first &= ~((1 << host_bits) - 1)
+        return 4, first, first | ((1 << host_bits) - 1)
+    if '-' in network:
+        first, last = (ipaddress.ip_address(part.strip()) for part in network.split('-', 1))
+        return first.version, int(first), int(last)
+    net = ipaddress.ip_network(network.strip(), strict=False)
+    return net.version, int(net.network_address), int(net.broadcast_address)
+
+
+class _Ranges:
+    def __init__(self, typecode):
+        self.starts = array(typecode) if typecode else []
+        self.ends = array(typecode) if typecode else []
+        self.records = array('I')
+
+    def build(self, rows):
+        rows.sort()
+        for first, last, record in rows:
+            self.starts.append(first)
+            self.ends.append(last)
+            self.records.append(record)
+
+    def find(self, value):
+        i = bisect.bisect_right(self.starts, value) - 1
+        if i >= 0 and value <= self.ends[i]:
+            return self.records[i]
+        return None
+
+
+class LocalGeoDB:
+    def __init__(self, path):
+        self.path = path
+        self.records = []
+        self.v4 = _Ranges('I' if array('I').itemsize >= 4 else 'L')
+        self.v6 = _Ranges(None)
+        self.reader = None
+        if path.endswith('.mmdb'):
+            import maxminddb
+            self.reader = maxminddb.open_database(path)
+        else:
+            self._load_csv(path)
+
+    def _load_csv(self, path):
+        interned = {}
+        rows = {4: [], 6: []}
+        with open(path, newline='') as f:
+            for row in csv.DictReader(f):
+                version, first, last = parse_network(row['network'])
+                record = tuple(row.get(field, '') for field in FIELDS)
+                index = interned.get(record)
+                if index is None:
+                    index = interned[record] = len(self.records)
+                    self.records.append(self._to_dict(record))
+                rows[version].append((first, last, index))
+        self.v4.build(rows[4])
+        self.v6.build(rows[6])
+
+    @staticmethod
+    def _to_dict(record):
+        location = dict(zip(FIELDS, record))
+        for field in ("lat", "lon"):
+            try:
+                location[field] = float(location[field])
+            except (TypeError, ValueError):
+                location[field] = 0.0
+        return location
+
+    @staticmethod
+    def _from_mmdb(record):
+        names = lambda part: (part or {}).get('names', {}).get('en', '')
+        subdivisions = record.get('subdivisions') or [{}]
+        location = record.get('location', {})
+        return {
+            "country": names(record.get('country')),
+            "countryCode": record.get('country', {}).get('iso_code', ''),
+            "region": names(subdivisions[0]),
+            "city": names(record.get('city')),
+            "lat": location.get('latitude', 0.0),
+            "lon": location.get('longitude', 0.0),
+            "isp": record.get('isp', record.get('autonomous_system_organization', '')),
+            "org": record.get('organization', record.get('autonomous_system_organization', '')),
+        }
+
+    def lookup(self, ip):
+        """Return the location dict for an IP, or None if not covered"""
+        if self.reader is not None:
+            try:
+                record = self.reader.get(ip)
+            except ValueError:
+                return None
+            return self._from_mmdb(record) if record else None
+
+        try:
+            index = self.v4.find(int.from_bytes(socket.inet_pton(socket.AF_INET, ip), 'big'))
+        except OSError:
+            try:
+                index = self.v6.find(int.from_bytes(socket.inet_pton(socket.AF_INET6, ip), 'big'))
+            except OSError:
+                return None
+        return None if index is None else dict(self.records[index])
+
+    def lookup_many(self, ips):
+        """Look up many IPs at once, returning {ip: location or None}"""
+        return {ip: self.lookup(ip) for ip in set(ips)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Look up IPs in a local geolocation database")
+    parser.add_argument('database')
+    parser.add_argument('ips', nargs='+')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    db = LocalGeoDB(args.database)
+    print(f"[+] Loaded {args.database} in {time.perf_counter() - start:.2f}s")
+    for ip in args.ips:
+        print(f"  {ip}: {db.lookup(ip)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""Concurrent, batched IP geolocation against ip-api.com style providers.
+
+IPs are sent to the provider's batch endpoint up to 100 at a time from a
+small thread pool that shares one pooled HTTP session. A token bucket keeps
+the request rate under the provider's limit and is re-synchronised from the
+X-Rl (requests left) and X-Ttl (seconds until reset) response headers.
+Throttled or failed batches, including error statuses and bodies that are
+not a list of results, are retried with exponential backoff; a batch that
+keeps failing only skips its own IPs.
+"""
+
+import concurrent.futures
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import settings
+
+FIELDS = "status,message,query,country,countryCode,regionName,city,lat,lon,isp,org"
+
+
+def parse_location(data):
+    """Convert an ip-api.com response object to our location dict"""
+    if data.get("status") != "success":
+        return None
+    return {
+        "country": data["country"],
+        "countryCode": data["countryCode"],
+        "region": data["regionName"],
+        "city": data["city"],
+        "lat": data["lat"],
+        "lon": data["lon"],
+        "isp": data["isp"],
+        "org": data["org"]
+    }
+
+
+class TokenBucket:
+    """Thread-safe token bucket whose budget follows rate-limit headers"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.blocked_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(wait)
+
+    def observe(self, remaining, reset_in):
+        """Match the bucket to the provider's view of the current window"""
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens = min(self.tokens, remaining)
+            if remaining <= 0:
+                self.blocked_until = max(self.blocked_until, now + reset_in)
+            elif reset_in > 0:
+                self.rate = remaining / reset_in
+
+    def pause(self, seconds):
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class GeoResolver:
+    def __init__(self, base_url=None, workers=None, batch_size=None, rate=None,
+                 burst=None, retries=4, backoff=1.0, timeout=10):
+        self.base_url = (base_url or settings.GEO_API_URL).rstrip('/')
+        self.workers = workers or settings.GEO_WORKERS
+        self.batch_size = min(batch_size or settings.GEO_BATCH_SIZE, 100)
+        self.bucket = TokenBucket(rate or settings.GEO_RATE, burst or settings.GEO_BURST)
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _observe_headers(self, response):
+        try:
+            self.bucket.observe(int(response.headers['X-Rl']), float(response.headers['X-Ttl']))
+        except (KeyError, ValueError):
+            pass
+
+    def _resolve_batch(self, ips):
+        for attempt in range(self.retries + 1):
+            self.bucket.acquire()
+            try:
+                response = self.session.post(f"{self.base_url}/batch", params={"fields": FIELDS},
+                                             json=ips, timeout=self.timeout)
+            except requests.RequestException as e:
+                print(f"[-] Geolocation batch failed: {e}")
+                time.sleep(self.backoff * 2 ** attempt)
+                continue
+
+            self._observe_headers(response)
+            delay = self.backoff * 2 ** attempt
+            if not 200 <= response.status_code < 300:
+                try:
+                    delay = max(delay, float(response.headers['X-Ttl']))
+                except (KeyError, ValueError):
+                    pass
+                if response.status_code != 429:
+                    print(f"[-] Geolocation batch failed: HTTP {response.status_code}")
+                self.bucket.pause(delay)
+                continue
+
+            try:
+                results = response.json()
+                if not isinstance(results, list):
+                    raise ValueError("not a list of results")
+                wanted = set(ips)
+                return {data.get("query"): parse_location(data) for data in results
+                        if data.get("query") in wanted}
+            except (ValueError, KeyError, AttributeError) as e:
+                print(f"[-] Malformed geolocation response: {e!r}")
+                self.bucket.pause(delay)
+
+        print(f"[-] Giving up on a batch of {len(ips)} IPs after {self.retries + 1} attempts")
+        return {}
+
+    def resolve(self, ips):
+        """Yield (ip, location) pairs as batches complete.
+
+        Failed lookups yield None; IPs whose batch kept failing are not
+        yielded so they can be retried on a later run.
+        """
+        ips = list(ips)
+        batches = [ips[i:i + self.batch_size] for i in range(0, len(ips), self.batch_size)]
+        with concurrent.futures.ThreadPoolExecutor(self.workers) as pool:
+            futures = [pool.submit(self._resolve_batch, batch) for batch in batches]
+            for future in concurrent.futures.as_completed(futures):
+                try:
+                    locations = future.result()
+                except Exception as e:
+                    print(f"[-] Geolocation batch failed: {e!r}")
+                    continue
+                yield from locations.items()
+
+    def close(self):
+        self.session.close()
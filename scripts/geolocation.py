@@ -1,94 +1,105 @@
 #!/usr/bin/env python3
+import argparse
 import json
 import requests
 import os
-import time
+
+import settings
+from codec import decoder_for
+from geo_cache import GeoCache, write_json_atomic
+from geo_resolver import GeoResolver, parse_location
+from parallel import log_shards
+from segments import open_segment
+
+_local_db = None
+
+def local_db():
+    """Return the local geolocation database if one is configured"""
+    global _local_db
+    if _local_db is None and settings.GEO_DB:
+        from geo_local import LocalGeoDB
+        _local_db = LocalGeoDB(settings.GEO_DB)
+    return _local_db
 
 def get_ip_location(ip):
-    """Get geolocation data for an IP address using ip-api.com"""
+    """Get geolocation data for an IP address from the local database or
+    ip-api.com"""
+    db = local_db()
+    if db is not None:
+        return db.lookup(ip)
     try:
-        response = requests.get(f"http://ip-api.com/json/{ip}")
-        data = response.json()
-        if data["status"] == "success":
-            return {
-                "country": data["country"],
-                "countryCode": data["countryCode"],
-                "region": data["regionName"],
-                "city": data["city"],
-                "lat": data["lat"],
-                "lon": data["lon"],
-                "isp": data["isp"],
-                "org": data["org"]
-            }
+        response = requests.get(f"{settings.GEO_API_URL}/json/{ip}")
+        return parse_location(response.json())
     except Exception as e:
         print(f"[-] Error getting location for {ip}: {e}")
     return None
 
-def process_ips():
-    """Process all IPs from logs and get their geolocation"""
-    # Create geolocation directory if it doesn't exist
-    if not os.path.exists("../logs"):
-        os.makedirs("../logs")
+# Logs whose source IPs are geolocated
+IP_LOGS = ('auth_attempts.json', 'web_visits.json', 'ftp_commands.json')
 
-    # Get all unique IPs from logs
+def collect_ips(since=None):
+    """Collect the unique remote IPs seen in the logs, skipping rotated
+    segments that ended before ``since`` (an ISO timestamp)"""
     ips = set()
-
-    # Auth attempts
-    try:
-        with open("../logs/auth_attempts.json", "r") as f:
-            for line in f:
-                try:
-                    data = json.loads(line)
+    for name in IP_LOGS:
+        for path in log_shards(os.path.join(settings.LOGS_DIR, name), since):
+            decoder = decoder_for(path)
+            with open_segment(path) as f:
+                for data in decoder.iter_lines(f):
                     ip = data.get("source_ip")
                     if ip and ip != "127.0.0.1" and ip != "localhost":
                         ips.add(ip)
-                except:
-                    pass
-    except FileNotFoundError:
-        pass
+            decoder.report(path)
+    return ips
 
-    # Web visits
-    try:
-        with open("../logs/web_visits.json", "r") as f:
-            for line in f:
-                try:
-                    data = json.loads(line)
-                    ip = data.get("source_ip")
-                    if ip and ip != "127.0.0.1" and ip != "localhost":
-                        ips.add(ip)
-                except:
-                    pass
-    except FileNotFoundError:
-        pass
+def process_ips(since=None, cache=None, ips=None):
+    """Process all IPs from logs and get their geolocation. A long-running
+    caller can pass its open GeoCache to keep it between runs, and the IPs
+    it has seen since the last run instead of rescanning the logs. Cached
+    locations that have expired are looked up again either way."""
+    # Create geolocation directory if it doesn't exist
+    os.makedirs(settings.LOGS_DIR, exist_ok=True)
 
-    # FTP commands
-    try:
-        with open("../logs/ftp_commands.json", "r") as f:
-            for line in f:
-                try:
-                    data = json.loads(line)
-                    ip = data.get("source_ip")
-                    if ip and ip != "127.0.0.1" and ip != "localhost":
-                        ips.add(ip)
-                except:
-                    pass
-    except FileNotFoundError:
-        pass
+    # Only look up IPs that are new or whose cache entry has expired
+    shared = cache is not None
+    cache = cache if shared else GeoCache()
+    geo_path = os.path.join(settings.LOGS_DIR, 'geolocation.json')
+    if not cache.entries and os.path.exists(geo_path):
+        # Seed a new cache from the last run's output
+        with open(geo_path, "r") as f:
+            for ip, location in json.load(f).items():
+                cache.put(ip, location)
+    # Refresh expired locations too: an IP that is not in this run's logs
+    # would otherwise drop out of geolocation.json for good
+    ips = collect_ips(since) if ips is None else set(ips)
+    pending = cache.needs_lookup(ips | cache.expired())
+    print(f"[+] {len(pending)} IPs need geolocation")
 
-    # Get geolocation for each IP
-    geo_data = {}
-    for ip in ips:
-        print(f"[+] Getting geolocation for {ip}")
-        location = get_ip_location(ip)
-        if location:
-            geo_data[ip] = location
-        time.sleep(1)  # Rate limiting to avoid API blocks
+    try:
+        db = local_db()
+        if db is not None:
+            for ip, location in db.lookup_many(pending).items():
+                cache.put(ip, location)
+        elif pending:
+            # Batched, rate-limited lookups; each result is cached as it arrives
+            resolver = GeoResolver()
+            try:
+                for ip, location in resolver.resolve(pending):
+                    cache.put(ip, location)
+            finally:
+                resolver.close()
+    finally:
+        if not shared:
+            cache.close()
 
     # Save geolocation data
-    with open(os.path.join(LOGS_DIR , 'geolocation.json'), "w") as f:
-        json.dump(geo_data, f, indent=2)
+    geo_data = cache.locations()
+    write_json_atomic(geo_path, geo_data)
     print(f"[+] Processed geolocation for {len(geo_data)} IPs")
     return geo_data
 
 if __name__ == "__main__":
-    process_ips()
+    parser = argparse.ArgumentParser(description="Geolocate the IPs seen in the honeypot logs")
+    parser.add_argument('--since', help="skip rotated log segments that ended before this ISO timestamp; "
+                                        "IPs already in the cache are kept and refreshed when they expire")
+    process_ips(parser.parse_args().since)
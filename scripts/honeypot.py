@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""Single entry point that runs the whole sensor in one process.
+
+start_honeypot.sh used to launch five interpreters: the SSH, web, FTP and
+Telnet honeypots and the dashboard. Each one imported the same modules,
+started its own log sink and wrote its own pid file. This module runs the
+services selected in HONEYPOT_SERVICES (or --services) together, all
+configured from config/honeypot.conf:
+
+* SSH, FTP and Telnet listen on one event loop behind a shared admission
+  controller, as in engine.py.
+* The web honeypot and the dashboard are werkzeug servers on threads.
+* A background thread geolocates the IPs in the logs at startup, then every
+  HONEYPOT_GEO_INTERVAL seconds only the IPs the sink wrote since its last
+  run, keeping one GeoCache open between runs.
+
+Every service logs through the same LogSink. Every HONEYPOT_HEALTH_INTERVAL
+seconds the sensor writes HONEYPOT_HEALTH_FILE, which holds the state of
+each service, the number of events written, admission counters and memory
+use. The dashboard reads its service status from this file, and
+``honeypot.py --health`` exits non-zero when the sensor is down.
+
+SIGTERM or Ctrl-C stops the listeners, lets open SSH sessions unwind and
+flushes the sink before the process exits. If a service dies while the
+sensor is running, it shuts down the same way and exits with status 1, so a
+process manager can restart it.
+"""
+
+import time
+
+STARTED = time.monotonic()
+
+import argparse
+import asyncio
+import datetime
+import importlib
+import json
+import os
+import resource
+import signal
+import sys
+import threading
+
+import engine
+import log_sink
+import settings
+from admission import Admission
+from geo_cache import write_json_atomic
+
+SERVICES = ('ssh', 'web', 'ftp', 'telnet', 'dashboard')
+# Services served over HTTP from threads, and how the sensor finds their app
+HTTP_SERVICES = {
+    'web': ('web_honeypot', 'WEB_PORT'),
+    'dashboard': ('dashboard', 'DASHBOARD_PORT'),
+}
+# How often the sensor checks that its services are still up
+CHECK_INTERVAL = 1
+# Seconds the geolocation thread gets to finish a run when stopping
+STOP_TIMEOUT = 10
+
+
+def read_health(path=None):
+    """The sensor's last health snapshot, or None if there is none. A
+    snapshot that was not refreshed for three intervals is reported as
+    stale, since the process that wrote it is gone."""
+    try:
+        with open(path or settings.HEALTH_FILE) as f:
+            health = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if health.get('status') == 'running' and time.time() - health.get('time', 0) > 3 * settings.HEALTH_INTERVAL:
+        health['status'] = 'stale'
+    return health
+
+
+class Sensor:
+    def __init__(self, services, host=engine.LISTEN_HOST, admission=True, ports=None):
+        unknown = set(services) - set(SERVICES)
+        if unknown:
+            raise ValueError(f"Unknown services: {', '.join(sorted(unknown))}")
+        self.services = list(services)
+        self.host = host
+        self.admission = Admission() if admission else None
+        self.ports = ports or {}
+        self.sink = None
+        # name -> {'port': ..., 'server' or 'task' or 'thread': ...}
+        self.running = {}
+        self.tasks = []
+        self.geo_stop = threading.Event()
+        self.geo_thread = None
+        # Source IPs logged since the last geolocation run
+        self.new_ips = set()
+        self.new_ips_lock = threading.Lock()
+        self.stopping = None
+        self.status = 'starting'
+        self.failed = None
+        self.startup_seconds = None
+
+    async def start(self):
+        """Start every service; raises if one cannot start"""
+        self.sink = log_sink.get_sink()
+        if self.admission is not None:
+            self.tasks.append(asyncio.ensure_future(self.admission.report()))
+        for name in self.services:
+            port = self.ports.get(name)
+            if name in HTTP_SERVICES:
+                self.start_http(name, port)
+                continue
+            port, runner = await engine.start_service(name, self.host, self.admission, port=port)
+            key = 'task' if isinstance(runner, asyncio.Future) else 'server'
+            self.running[name] = {'port': port, key: runner}
+        # Let the SSH listener bind its socket before the sensor counts as up
+        await asyncio.sleep(0)
+        failed = self.check()
+        if failed:
+            raise RuntimeError(f"{failed} did not start")
+
+    def start_http(self, name, port):
+        module_name, port_name = HTTP_SERVICES[name]
+        module = importlib.import_module(module_name)
+        port = port or getattr(module, port_name)
+        server = engine.http_server(module.app, port, self.host)
+        thread = threading.Thread(target=server.serve_forever, name=name, daemon=True)
+        thread.start()
+        self.running[name] = {'port': port, 'server': server, 'thread': thread}
+        print(f"[+] {name.upper()} listening on port {port}")
+
+    def geolocate(self):
+        """Geolocate every IP in the logs now, then every GEO_INTERVAL
+        seconds only the IPs the sink has written since the last run"""
+        import geolocation
+        from geo_cache import GeoCache
+        cache = GeoCache()
+        ips = None
+        try:
+            while True:
+                try:
+                    geolocation.process_ips(cache=cache, ips=ips)
+                except Exception as e:
+                    print(f"[-] Geolocation failed: {e}")
+                if not settings.GEO_INTERVAL or self.geo_stop.wait(settings.GEO_INTERVAL):
+                    break
+                with self.new_ips_lock:
+                    ips, self.new_ips = self.new_ips, set()
+        finally:
+            cache.close()
+
+    def collect_ips(self, batch):
+        """Sink listener noting the source IPs of newly written events"""
+        import geolocation
+        ips = {entry.get('source_ip') for filename, entry in batch if filename in geolocation.IP_LOGS}
+        ips -= {None, '', '127.0.0.1', 'localhost'}
+        if ips:
+            with self.new_ips_lock:
+                self.new_ips |= ips
+
+    def state(self, name):
+        service = self.running.get(name)
+        if service is None:
+            return 'stopped'
+        if 'thread' in service:
+            alive = service['thread'].is_alive()
+        elif 'task' in service:
+            alive = not service['task'].done()
+        else:
+            alive = service['server'].is_serving()
+        if alive:
+            return 'running'
+        return 'failed' if name == self.failed or self.status == 'running' else 'stopped'
+
+    def check(self):
+        """The first service that has died, or None"""
+        for name in self.services:
+            if self.state(name) != 'running':
+                task = self.running.get(name, {}).get('task')
+                if task is not None and task.done() and not task.cancelled() and task.exception():
+                    print(f"[-] {name} failed: {task.exception()}")
+                return name
+        return None
+
+    def health(self):
+        counts = self.admission.counts if self.admission is not None else {}
+        return {
+            'status': self.status,
+            'pid': os.getpid(),
+            'time': time.time(),
+            'updated': datetime.datetime.now().isoformat(),
+            'uptime': round(time.monotonic() - STARTED, 1),
+            'startup_seconds': self.startup_seconds,
+            'services': {name: {'port': self.running.get(name, {}).get('port'), 'state': self.state(name)}
+                         for name in self.services},
+            'failed': self.failed,
+            'events_written': self.sink.written if self.sink is not None else 0,
+            'events_dropped': self.sink.dropped if self.sink is not None else 0,
+            'admission': {
+                'admitted': counts.get('admitted', 0),
+                'shed': counts.get('shed', 0),
+                'open': self.admission.sessions if self.admission is not None else 0,
+            },
+            'threads': threading.active_count(),
+            'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        }
+
+    def write_health(self):
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(settings.HEALTH_FILE)), exist_ok=True)
+            write_json_atomic(settings.HEALTH_FILE, self.health())
+        except OSError as e:
+            print(f"[-] Could not write health file: {e}")
+
+    async def monitor(self):
+        """Write the health file and stop the sensor if a service dies"""
+        last_write = 0
+        while True:
+            failed = self.check()
+            if failed:
+                print(f"[-] {failed} stopped unexpectedly, shutting down")
+                self.failed = failed
+                self.stop()
+                return
+            if time.monotonic() - last_write >= settings.HEALTH_INTERVAL:
+                self.write_health()
+                last_write = time.monotonic()
+            await asyncio.sleep(CHECK_INTERVAL)
+
+    def stop(self, *args):
+        if not self.stopping.is_set():
+            print("[!] Stopping sensor")
+            self.stopping.set()
+
+    async def shutdown(self):
+        self.status = 'stopping'
+        for service in self.running.values():
+            if 'thread' in service:
+                service['server'].shutdown()
+                service['server'].server_close()
+            elif 'server' in service:
+                service['server'].close()
+        tasks = self.tasks + [s['task'] for s in self.running.values() if 'task' in s]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.geo_stop.set()
+        if self.geo_thread is not None:
+            self.geo_thread.join(STOP_TIMEOUT)
+
+    async def serve(self):
+        self.stopping = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(signal.SIGTERM, self.stop)
+        loop.add_signal_handler(signal.SIGINT, self.stop)
+        try:
+            await self.start()
+        except Exception as e:
+            print(f"[-] Sensor failed to start: {e}")
+            self.failed = str(e)
+            await self.shutdown()
+            return
+        self.startup_seconds = round(time.monotonic() - STARTED, 3)
+        self.status = 'running'
+        print(f"[+] Sensor ready in {self.startup_seconds:.2f}s: {', '.join(self.services)}")
+        self.tasks.append(asyncio.ensure_future(self.monitor()))
+        if settings.GEO_INTERVAL:
+            # Listen before the first full scan, so no event falls between the two
+            self.sink.listeners.append(self.collect_ips)
+        self.geo_thread = threading.Thread(target=self.geolocate, name='geolocation', daemon=True)
+        self.geo_thread.start()
+        await self.stopping.wait()
+        await self.shutdown()
+
+    def run(self):
+        """Run the sensor until it is stopped; returns the exit status"""
+        limit = engine.raise_fd_limit()
+        print(f"[+] Open file limit: {limit}")
+        asyncio.run(self.serve())
+        if self.sink is not None:
+            self.sink.close()
+        self.status = 'failed' if self.failed else 'stopped'
+        self.write_health()
+        print(f"[+] Sensor stopped ({self.health()['events_written']} events written)")
+        return 1 if self.failed else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run all honeypot services in one process")
+    parser.add_argument('--services', default=settings.SERVICES,
+                        help=f"comma separated list of services ({', '.join(SERVICES)})")
+    parser.add_argument('--host', default=engine.LISTEN_HOST)
+    parser.add_argument('--no-admission', action='store_true',
+                        help="accept every connection (no rate limits or session caps)")
+    parser.add_argument('--health', action='store_true',
+                        help="print the running sensor's health and exit non-zero if it is down")
+    args = parser.parse_args()
+
+    if args.health:
+        health = read_health()
+        if health is None:
+            print(f"[-] No health file at {settings.HEALTH_FILE}")
+            sys.exit(1)
+        services = ', '.join(f"{name} {s['state']}" for name, s in health['services'].items())
+        print(f"[+] Sensor {health['status']} (pid {health['pid']}, up {health['uptime']}s): {services}")
+        print(f"[+] {health['events_written']} events written, "
+              f"{health['admission']['admitted']} connections admitted, {health['admission']['shed']} shed")
+        sys.exit(0 if health['status'] == 'running' else 1)
+
+    services = [s.strip() for s in args.services.split(',') if s.strip()]
+    sys.exit(Sensor(services, args.host, not args.no_admission).run())
+
+
+if __name__ == '__main__':
+    main()
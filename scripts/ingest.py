@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""Incremental ingestion of the JSON logs for the dashboard.
+
+Each log is tailed from the byte offset reached on the previous poll, so a
+refresh only parses lines appended since then. Parsed events are folded into
+running aggregates and time-bucketed rollups instead of being kept around.
+On the first refresh, rotated segments are read once, skipping those that
+ended before the history window.
+"""
+
+import heapq
+import os
+import threading
+
+import segments
+import settings
+from codec import AuthAttempt, Decoder, WebVisit
+from parallel import log_shards
+from rollups import Rollups
+from sketches import ExactCounter, make_counter, make_distinct
+
+RECENT_LIMIT = 50
+# Bytes read from a log per call, so a large backlog is never held at once
+CHUNK_SIZE = 1 << 20
+
+
+class LogTailer:
+    """Follow one append-only log file across polls and rotations"""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.inode = None
+        self.offset = 0
+        self.partial = b""
+
+    def _open(self):
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return False
+        self.file = f
+        self.inode = os.fstat(f.fileno()).st_ino
+        self.offset = 0
+        self.partial = b""
+        return True
+
+    def _drain(self):
+        """Yield the complete lines from the offset to EOF, one chunk at a
+        time; a trailing partial line is carried into the next chunk"""
+        self.file.seek(self.offset)
+        while True:
+            data = self.file.read(CHUNK_SIZE)
+            if not data:
+                return
+            self.offset += len(data)
+            lines = (self.partial + data).split(b"\n")
+            self.partial = lines.pop()
+            yield from lines
+
+    def _rotated(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        return st.st_ino != self.inode or st.st_size < self.offset
+
+    def _lines(self):
+        if self.file is None and not self._open():
+            return
+        if self._rotated():
+            # Finish the old file if it was moved away, then start the new one
+            if os.fstat(self.file.fileno()).st_size >= self.offset:
+                yield from self._drain()
+            self.file.close()
+            self.file = None
+            if not self._open():
+                return
+        yield from self._drain()
+
+    def poll(self):
+        """Yield the lines appended since the last poll"""
+        return (line for line in self._lines() if line.strip())
+
+
+class AuthAggregates:
+    def __init__(self, recent_limit=RECENT_LIMIT):
+        self.total = 0
+        self.services = ExactCounter()
+        self.ips = make_counter()
+        self.distinct_ips = make_distinct()
+        self.usernames = make_counter()
+        self.passwords = make_counter()
+        self.recent_limit = recent_limit
+        self._recent = []
+        self._seq = 0
+
+    def add(self, entry):
+        self.total += 1
+        self.services.add(entry.get('service', 'unknown'))
+        self.ips.add(entry.get('source_ip', ''))
+        self.distinct_ips.add(entry.get('source_ip', ''))
+        username = entry.get('username', '')
+        if username:
+            self.usernames.add(username)
+        password = entry.get('password', '')
+        if password:
+            self.passwords.add(password)
+
+        # Keep the newest N entries by timestamp in a min-heap
+        self._seq += 1
+        item = (entry.get('timestamp', ''), self._seq, entry)
+        if len(self._recent) < self.recent_limit:
+            heapq.heappush(self._recent, item)
+        elif item > self._recent[0]:
+            heapq.heapreplace(self._recent, item)
+
+    def recent(self, n=10):
+        return [item[2] for item in heapq.nlargest(n, self._recent)]
+
+    def recent_items(self):
+        """All retained (timestamp, seq, entry) items, newest first"""
+        return heapq.nlargest(len(self._recent), self._recent)
+
+
+class Ingester:
+    """Tail the auth and web logs and keep dashboard aggregates up to date.
+
+    ``since`` is an ISO timestamp; older events in rotated segments are not
+    loaded."""
+
+    def __init__(self, logs_dir=None, since=None):
+        logs_dir = self.logs_dir = logs_dir or settings.LOGS_DIR
+        self.since = since
+        self.backfilled = False
+        self.auth_tailer = LogTailer(os.path.join(logs_dir, 'auth_attempts.json'))
+        self.web_tailer = LogTailer(os.path.join(logs_dir, 'web_visits.json'))
+        self.auth = AuthAggregates(max(RECENT_LIMIT, settings.REPORT_RECENT))
+        self.rollups = Rollups()
+        self.web_visits = 0
+        self.unique_ips = make_distinct()
+        self.auth_decoder = Decoder(AuthAttempt)
+        self.web_decoder = Decoder(WebVisit)
+        self.version = 0
+        self.lock = threading.Lock()
+        # Called with each refresh's new auth attempts, outside the lock
+        self.listeners = []
+
+    @property
+    def malformed(self):
+        return self.auth_decoder.malformed + self.web_decoder.malformed
+
+    def _add_auth(self, entry):
+        self.auth.add(entry)
+        self.rollups.add(entry)
+        self.unique_ips.add(entry.get('source_ip', ''))
+
+    def _add_web(self, entry):
+        self.web_visits += 1
+        self.rollups.add_visit(entry)
+        self.unique_ips.add(entry.get('source_ip', ''))
+
+    def _backfill(self):
+        """Load the rotated segments of each log before tailing it"""
+        jobs = ((self.auth_tailer, self.auth_decoder, self._add_auth),
+                (self.web_tailer, self.web_decoder, self._add_web))
+        # Open the live files and list the segments under the rotation lock,
+        # so a rotation cannot slip between the two
+        with segments.rotation_lock(self.logs_dir):
+            for tailer, _, _ in jobs:
+                if tailer.file is None:
+                    tailer._open()
+            paths = [[path for path in log_shards(tailer.path, self.since) if path != tailer.path]
+                     for tailer, _, _ in jobs]
+        count = 0
+        for (_, decoder, add), shard_paths in zip(jobs, paths):
+            for path in shard_paths:
+                try:
+                    with segments.open_segment(path) as f:
+                        for entry in decoder.iter_lines(f):
+                            if self.since is None or entry.get('timestamp', '') >= self.since:
+                                add(entry)
+                                count += 1
+                except FileNotFoundError:
+                    pass
+        self.backfilled = True
+        return count
+
+    def refresh(self):
+        """Fold newly appended lines into the aggregates, return how many"""
+        with self.lock:
+            backfilled = 0 if self.backfilled else self._backfill()
+            attempts = []
+            for entry in self.auth_decoder.iter_lines(self.auth_tailer.poll()):
+                self._add_auth(entry)
+                attempts.append(entry)
+            count = len(attempts)
+            for entry in self.web_decoder.iter_lines(self.web_tailer.poll()):
+                self._add_web(entry)
+                count += 1
+            self.version += count + backfilled
+        if attempts:
+            for listener in self.listeners:
+                listener(attempts)
+        return count
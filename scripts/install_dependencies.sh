@@ -16,4 +16,13 @@ pip3 install flask requests paramiko jinja2 numpy
 # Try to install scikit-learn, but continue if it fails
 pip3 install scikit-learn || echo "[!] scikit-learn installation failed, but continuing anyway"
 
+# Optional: faster JSON encoding and decoding of log events
+pip3 install msgspec || echo "[!] msgspec installation failed, using the standard json module"
+
+# Optional: Parquet archive of old logs
+pip3 install pyarrow || echo "[!] pyarrow installation failed, log archiving will be unavailable"
+
+# Optional: asyncio SSH backend (HONEYPOT_SSH_BACKEND=asyncssh)
+pip3 install asyncssh || echo "[!] asyncssh installation failed, the SSH honeypot will use paramiko"
+
 echo "[+] Dependencies installed successfully!"
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""Buffered writer shared by every honeypot service.
+
+Handlers only put events on an in-memory queue. A background thread drains
+the queue, serializes the events and appends them to the log files in
+batches, keeping each file open between batches. Files are rotated and
+compressed by the rules in segments.py.
+
+Worker processes started by supervisor.py use a ForwardingSink instead,
+which hands its batches to the one LogSink in the supervisor.
+"""
+
+import atexit
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+
+import codec
+import event_store
+import segments
+import settings
+
+FSYNC_POLICIES = ('none', 'batch', 'interval')
+BACKENDS = ('json', 'sqlite', 'both')
+
+
+class LogSink:
+    def __init__(self, logs_dir=None, batch_size=None, flush_interval=None,
+                 fsync=None, fsync_interval=None, backend=None, db_path=None,
+                 rotate_bytes=None, rotate_seconds=None, compression=None):
+        self.logs_dir = logs_dir or settings.LOGS_DIR
+        self.batch_size = batch_size or settings.LOG_BATCH_SIZE
+        self.flush_interval = flush_interval or settings.LOG_FLUSH_INTERVAL
+        self.fsync = fsync or settings.LOG_FSYNC
+        self.fsync_interval = fsync_interval or settings.LOG_FSYNC_INTERVAL
+        self.backend = backend or settings.LOG_BACKEND
+        self.db_path = db_path or settings.EVENT_DB
+        self.rotate_bytes = settings.LOG_ROTATE_BYTES if rotate_bytes is None else rotate_bytes
+        self.rotate_seconds = settings.LOG_ROTATE_SECONDS if rotate_seconds is None else rotate_seconds
+        self.compression = compression or settings.LOG_COMPRESSION
+        if self.fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {self.fsync}")
+        if self.backend not in BACKENDS:
+            raise ValueError(f"Unknown log backend: {self.backend}")
+        if self.compression not in segments.COMPRESSIONS:
+            raise ValueError(f"Unknown log compression: {self.compression}")
+
+        os.makedirs(self.logs_dir, exist_ok=True)
+        self.queue = queue.SimpleQueue()
+        self.files = {}
+        self.encode = codec.make_encoder()
+        # Log file -> when its live file was started, for age-based rotation
+        self.started = {}
+        self.store = None
+        self.written = 0
+        self.dropped = 0
+        # Called with each batch once it is written, on the writer thread
+        self.listeners = []
+        self.last_fsync = time.monotonic()
+        self.thread = threading.Thread(target=self._run, name='log-sink', daemon=True)
+        self.thread.start()
+        if self.backend != 'sqlite':
+            # Finish segments left pending by a process that exited mid-way
+            segments.finish_in_background(self.logs_dir, self.compression)
+
+    def log(self, filename, entry):
+        """Queue one event for the given log file"""
+        self.queue.put((filename, entry))
+
+    def flush(self, timeout=None):
+        """Block until everything queued so far has been written. Returns
+        False on timeout or if the writer thread is gone."""
+        done = threading.Event()
+        self.queue.put((None, done))
+        end = None if timeout is None else time.monotonic() + timeout
+        while self.thread.is_alive():
+            wait = 0.5 if end is None else min(end - time.monotonic(), 0.5)
+            if wait <= 0:
+                break
+            if done.wait(wait):
+                return True
+        return done.is_set()
+
+    def close(self):
+        if self.thread.is_alive():
+            self.queue.put((None, None))
+            self.thread.join()
+
+    def _run(self):
+        running = True
+        while running:
+            batch = []
+            waiters = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    filename, entry = self.queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if filename is None:
+                    if entry is None:
+                        running = False
+                        break
+                    waiters.append(entry)
+                    break
+                batch.append((filename, entry))
+
+            try:
+                if batch:
+                    self._write(batch)
+                self._sync(force=not running)
+            except Exception as e:
+                # Keep the thread alive for later events; the failed batch is lost
+                self.dropped += len(batch)
+                print(f"[-] Failed to write {len(batch)} log events: {e}")
+                self._reset()
+            else:
+                for listener in self.listeners if batch else ():
+                    try:
+                        listener(batch)
+                    except Exception as e:
+                        print(f"[-] Log listener failed: {e}")
+            for waiter in waiters:
+                waiter.set()
+
+        self._reset()
+
+    def _reset(self):
+        """Close the open files and store; the next batch reopens them"""
+        for f in self.files.values():
+            try:
+                f.close()
+            except OSError:
+                pass
+        self.files.clear()
+        if self.store is not None:
+            try:
+                self.store.close()
+            except Exception:
+                pass
+            self.store = None
+
+    def _write(self, batch):
+        if self.backend != 'json':
+            self._write_store(batch)
+        if self.backend != 'sqlite':
+            self._write_json(batch)
+        self.written += len(batch)
+
+    def _write_store(self, batch):
+        if self.store is None:
+            self.store = event_store.EventStore(self.db_path)
+        grouped = {}
+        for filename, entry in batch:
+            grouped.setdefault(filename, []).append(entry)
+        for filename, entries in grouped.items():
+            self.store.insert_many(event_store.LOGS.get(filename, filename), entries)
+
+    def _write_json(self, batch):
+        lines = {}
+        encode = self.encode
+        for filename, entry in batch:
+            lines.setdefault(filename, []).append(encode(entry))
+
+        sizes = {}
+        with segments.rotation_lock(self.logs_dir):
+            for filename, chunk in lines.items():
+                f = self._open(filename)
+                f.write(b"".join(chunk))
+                f.flush()
+                sizes[filename] = os.fstat(f.fileno()).st_size
+
+        if self.fsync == 'batch':
+            self._fsync_all()
+        for filename, size in sizes.items():
+            self._maybe_rotate(filename, size)
+
+    def _open(self, filename):
+        """The open file for a log, reopened if another process rotated it.
+        Callers hold the rotation lock."""
+        path = os.path.join(self.logs_dir, filename)
+        f = self.files.get(filename)
+        if f is not None:
+            try:
+                current = os.stat(path).st_ino == os.fstat(f.fileno()).st_ino
+            except FileNotFoundError:
+                current = False
+            if current:
+                return f
+            if self.fsync != 'none':
+                os.fsync(f.fileno())
+            f.close()
+        f = self.files[filename] = open(path, "ab")
+        return f
+
+    def _maybe_rotate(self, filename, size):
+        started = self.started.get(filename)
+        if started is not None:
+            too_big = self.rotate_bytes and size >= self.rotate_bytes
+            too_old = self.rotate_seconds and time.time() - started >= self.rotate_seconds
+            if not (too_big or too_old):
+                return
+        f = self.files[filename]
+        # The first check also records the live file's start time for other processes
+        rotated, self.started[filename] = segments.rotate(
+            self.logs_dir, filename, self.rotate_bytes, self.rotate_seconds,
+            inode=os.fstat(f.fileno()).st_ino)
+        if rotated:
+            segments.finish_in_background(self.logs_dir, self.compression)
+
+    def _sync(self, force=False):
+        if self.fsync == 'none' and not force:
+            return
+        if force or time.monotonic() - self.last_fsync >= self.fsync_interval:
+            self._fsync_all()
+
+    def _fsync_all(self):
+        for f in self.files.values():
+            os.fsync(f.fileno())
+        self.last_fsync = time.monotonic()
+
+
+class ForwardingSink(LogSink):
+    """Sink for a worker process that batches events the same way but sends
+    each batch over a pipe to the supervisor's LogSink instead of writing
+    the files itself"""
+
+    def __init__(self, conn, batch_size=None, flush_interval=None):
+        self.conn = conn
+        self.batch_size = batch_size or settings.LOG_BATCH_SIZE
+        self.flush_interval = flush_interval or settings.LOG_FLUSH_INTERVAL
+        self.queue = queue.SimpleQueue()
+        self.files = {}
+        self.store = None
+        self.written = 0
+        self.dropped = 0
+        self.listeners = []
+        self.thread = threading.Thread(target=self._run, name='log-forward', daemon=True)
+        self.thread.start()
+
+    def _write(self, batch):
+        try:
+            self.conn.send(batch)
+        except (OSError, ValueError) as e:
+            print(f"[-] Lost {len(batch)} events, log sink unreachable: {e}")
+            self.dropped += len(batch)
+            return
+        self.written += len(batch)
+
+    def _sync(self, force=False):
+        pass
+
+
+_sink = None
+_sink_lock = threading.Lock()
+
+
+def get_sink():
+    """Return the process-wide sink, starting it on first use"""
+    global _sink
+    with _sink_lock:
+        if _sink is None:
+            _sink = LogSink()
+            atexit.register(_sink.close)
+        return _sink
+
+
+def set_sink(sink):
+    """Replace the process-wide sink, e.g. with a ForwardingSink in a worker"""
+    global _sink
+    _sink = sink
+
+
+def log_event(filename, entry):
+    get_sink().log(filename, entry)
+
+
+def exit_on_sigterm():
+    """Turn SIGTERM into a normal exit so queued events are flushed"""
+    def handler(signum, frame):
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        sys.exit(0)
+    signal.signal(signal.SIGTERM, handler)
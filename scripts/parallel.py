@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Parallel aggregation over large or rotated JSON log files.
+
+Each log is cut into byte ranges that start and end on line boundaries
+(compressed segments are read whole).
+Worker processes parse their ranges into partial aggregates, and the parent
+merges the partials back in file order, so exact counters come out identical
+to a serial pass over the same files.
+"""
+
+import concurrent.futures
+import glob
+import os
+
+import segments
+from codec import decoder_for
+
+CHUNK_SIZE = 64 * 1024 * 1024
+
+_factory = None
+
+
+def log_shards(path, since=None, until=None):
+    """Return the files of a log oldest first: shards rotated by logrotate
+    (path.N ... path.1), the segments rotated by the log sink that may hold
+    events in [since, until), and the live file"""
+    shards = []
+    for shard in glob.glob(glob.escape(path) + '.*'):
+        suffix = shard[len(path) + 1:]
+        if suffix.isdigit():
+            shards.append((int(suffix), shard))
+    files = [shard for _, shard in sorted(shards, reverse=True)]
+    files.extend(segments.segments(os.path.dirname(path), os.path.basename(path), since, until))
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+
+def split_ranges(path, chunk_size=CHUNK_SIZE):
+    """Split a file into (start, end) byte ranges aligned to newlines"""
+    if segments.is_compressed(path):
+        return [(0, None)]
+    size = os.path.getsize(path)
+    ranges = []
+    with open(path, "rb") as f:
+        start = 0
+        while start < size:
+            end = start + chunk_size
+            if end >= size:
+                end = size
+            else:
+                f.seek(end)
+                f.readline()
+                end = f.tell()
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def iter_range(path, start, end):
+    """Yield parsed entries from one byte range, counting malformed lines.
+    An end of None reads the whole (compressed) file."""
+    decoder = decoder_for(path)
+    if end is None:
+        with segments.open_segment(path) as f:
+            yield from decoder.iter_lines(f)
+        decoder.report(path)
+        return
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            block = f.read(min(remaining, 1024 * 1024))
+            if not block:
+                break
+            remaining -= len(block)
+            if remaining > 0:
+                # Complete the last line in this block
+                tail = f.readline()
+                remaining -= len(tail)
+                block += tail
+            yield from decoder.iter_lines(block.split(b"\n"))
+    decoder.report(path)
+
+
+def _init_worker(factory):
+    global _factory
+    _factory = factory
+
+
+def _process_range(task):
+    path, start, end, method = task
+    stats = _factory()
+    add = getattr(stats, method)
+    for entry in iter_range(path, start, end):
+        add(entry)
+    return stats
+
+
+def aggregate(jobs, factory, workers=None, chunk_size=CHUNK_SIZE):
+    """Aggregate log files in a process pool.
+
+    ``jobs`` is a list of (paths, method) pairs: every entry read from the
+    paths is passed to ``method`` of an aggregate built by ``factory``.
+    Aggregates must support ``update(other)`` to merge partial results.
+    """
+    tasks = []
+    for paths, method in jobs:
+        for path in paths:
+            for start, end in split_ranges(path, chunk_size):
+                tasks.append((path, start, end, method))
+
+    result = factory()
+    if not tasks:
+        return result
+    with concurrent.futures.ProcessPoolExecutor(workers, initializer=_init_worker,
+                                                initargs=(factory,)) as pool:
+        for partial in pool.map(_process_range, tasks):
+            result.update(partial)
+    return result
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""In-process queue of report generation jobs.
+
+Jobs run on a small worker pool inside the dashboard process, so matplotlib
+and the aggregates are already warm. A request for a report that is already
+queued or running joins that job instead of starting another, and a report
+whose data has not changed since its last successful run is not rebuilt.
+"""
+
+import concurrent.futures
+import datetime
+import itertools
+import threading
+from collections import OrderedDict
+
+import settings
+
+# Finished jobs kept for status queries
+JOB_HISTORY = 100
+
+
+class ReportJobs:
+    def __init__(self, render, workers=None):
+        """``render(params)`` builds one report and returns its path"""
+        self.render = render
+        self.pool = concurrent.futures.ThreadPoolExecutor(workers or settings.REPORT_WORKERS,
+                                                          thread_name_prefix='report')
+        self.jobs = OrderedDict()
+        self.active = {}
+        self.completed = {}
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _key(params):
+        return tuple(sorted(params.items()))
+
+    def submit(self, params, version):
+        """Queue a report for ``params`` built from data at ``version``.
+
+        Returns the job's status. An identical queued or running job is
+        shared, and the last successful job is returned as-is when the data
+        version has not changed since it ran.
+        """
+        key = self._key(params)
+        with self.lock:
+            job_id = self.active.get(key)
+            if job_id is not None:
+                return dict(self.jobs[job_id])
+            last = self.completed.get(key)
+            if last is not None and last['version'] == version:
+                return dict(last, reused=True)
+
+            job = {
+                'id': str(next(self.ids)),
+                'params': params,
+                'version': version,
+                'status': 'queued',
+                'submitted': datetime.datetime.now().isoformat(),
+                'started': None,
+                'finished': None,
+                'path': None,
+                'error': None,
+            }
+            self.jobs[job['id']] = job
+            self.active[key] = job['id']
+            self._trim()
+        self.pool.submit(self._run, key, job)
+        return dict(job)
+
+    def status(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                # Finished jobs outlive the history while they are the latest
+                job = next((j for j in self.completed.values() if j['id'] == job_id), None)
+            return dict(job) if job is not None else None
+
+    def _trim(self):
+        while len(self.jobs) > JOB_HISTORY:
+            oldest = next(iter(self.jobs.values()))
+            if oldest['status'] in ('queued', 'running'):
+                break
+            self.jobs.popitem(last=False)
+
+    def _run(self, key, job):
+        with self.lock:
+            job['status'] = 'running'
+            job['started'] = datetime.datetime.now().isoformat()
+        try:
+            path = self.render(job['params'])
+        except Exception as e:
+            print(f"[-] Report job {job['id']} failed: {e}")
+            status, path, error = 'failed', None, str(e)
+        else:
+            status, error = 'done', None
+        with self.lock:
+            job.update(status=status, path=path, error=error,
+                       finished=datetime.datetime.now().isoformat())
+            del self.active[key]
+            if status == 'done':
+                self.completed[key] = dict(job)
+
+    def shutdown(self, wait=True):
+        self.pool.shutdown(wait=wait)
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""Time-bucketed rollups of auth attempts for dashboard and report queries.
+
+Each event is counted into a bucket keyed by (bucket start, service) that
+holds the attempt total, an hour-of-day histogram and counters of source
+IPs, usernames and passwords. New events land in minute buckets; compaction
+merges minute buckets into hour buckets and hour buckets into day buckets
+once they are older than the configured retention, so a query over any time
+range reads a few hundred buckets instead of every event.
+
+Times are wall-clock timestamps as the honeypots write them (naive ISO
+strings) counted as seconds since the epoch, so bucket boundaries fall on
+the same minutes, hours and midnights as the timestamps in the logs. A
+bucket that straddles a query boundary is counted whole.
+
+Day buckets are kept for good, so the per-bucket counters are SpaceSaving
+sketches holding about 1/HONEYPOT_ROLLUP_SKETCH_ERROR keys each, and the
+distinct source IPs (attempts and web visits) are a small HyperLogLog.
+Both merge when buckets are compacted or a range is queried. An error of 0
+keeps exact counters and sets, whose memory grows with every new IP and
+credential.
+
+Countries are derived from the IP counters at query time, because IPs are
+geolocated some time after their events are logged.
+"""
+
+import datetime
+from collections import Counter
+
+import settings
+from sketches import SpaceSaving, make_counter, make_distinct
+
+MINUTE, HOUR, DAY = 60, 3600, 86400
+RESOLUTIONS = (MINUTE, HOUR, DAY)
+DIMENSIONS = ('ip', 'username', 'password')
+# Compaction runs at most this often, in seconds of event time
+COMPACT_EVERY = 600
+# Relative error of each bucket's distinct-IP HyperLogLog (4 kB per bucket)
+DISTINCT_ERROR = 0.02
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+_SECOND = datetime.timedelta(seconds=1)
+
+
+def to_epoch(timestamp):
+    """Seconds since the epoch for an ISO timestamp, None if unparseable"""
+    try:
+        dt = datetime.datetime.fromisoformat(timestamp)
+    except (TypeError, ValueError):
+        return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return (dt - _EPOCH) // _SECOND
+
+
+def from_epoch(ts):
+    """The naive ISO timestamp for seconds since the epoch"""
+    return (_EPOCH + datetime.timedelta(seconds=ts)).isoformat()
+
+
+def now():
+    """The current wall-clock time on the same scale as to_epoch"""
+    return (datetime.datetime.now() - _EPOCH) // _SECOND
+
+
+def distinct_error(error):
+    return max(error, DISTINCT_ERROR) if error else 0
+
+
+class Bucket:
+    __slots__ = ('total', 'hours', 'ip', 'username', 'password', 'ips')
+
+    def __init__(self, error=0):
+        self.total = 0
+        self.hours = [0] * 24
+        self.ip = make_counter(error)
+        self.username = make_counter(error)
+        self.password = make_counter(error)
+        self.ips = make_distinct(distinct_error(error))
+
+    def add(self, ts, entry):
+        self.total += 1
+        self.hours[ts // HOUR % 24] += 1
+        ip = entry.get('source_ip', '')
+        self.ip.add(ip)
+        self.ips.add(ip)
+        username = entry.get('username', '')
+        if username:
+            self.username.add(username)
+        password = entry.get('password', '')
+        if password:
+            self.password.add(password)
+
+    def update(self, other):
+        self.total += other.total
+        for hour, count in enumerate(other.hours):
+            self.hours[hour] += count
+        for dim in DIMENSIONS:
+            getattr(self, dim).update(getattr(other, dim))
+        self.ips.update(other.ips)
+
+
+class Rollups:
+    def __init__(self, minute_retention=None, hour_retention=None, error=None):
+        self.error = settings.ROLLUP_SKETCH_ERROR if error is None else error
+        self.retention = {
+            MINUTE: settings.ROLLUP_MINUTE_RETENTION if minute_retention is None else minute_retention,
+            HOUR: settings.ROLLUP_HOUR_RETENTION if hour_retention is None else hour_retention,
+        }
+        # resolution -> {(bucket start, service): Bucket}
+        self.levels = {width: {} for width in RESOLUTIONS}
+        self.watermark = None
+        self.undated = 0
+        self._next_compaction = None
+
+    def _resolution(self, ts):
+        """The finest resolution still kept for events at this time"""
+        if self.watermark is None:
+            return MINUTE
+        for width in (MINUTE, HOUR):
+            if ts >= self.watermark - self.retention[width]:
+                return width
+        return DAY
+
+    def _bucket(self, width, start, service):
+        level = self.levels[width]
+        bucket = level.get((start, service))
+        if bucket is None:
+            bucket = level[(start, service)] = Bucket(self.error)
+        return bucket
+
+    def add(self, entry):
+        """Count one auth attempt; entries without a valid timestamp are
+        only counted in ``undated``"""
+        ts = to_epoch(entry.get('timestamp'))
+        if ts is None:
+            self.undated += 1
+            return
+        width = self._resolution(ts)
+        self._bucket(width, ts - ts % width, entry.get('service', 'unknown')).add(ts, entry)
+        self._advance(ts)
+
+    def add_visit(self, entry):
+        """Record a web visitor's IP for the distinct-IP counts"""
+        ts = to_epoch(entry.get('timestamp'))
+        if ts is None:
+            return
+        width = self._resolution(ts)
+        self._bucket(width, ts - ts % width, entry.get('service', 'web')).ips.add(entry.get('source_ip', ''))
+        self._advance(ts)
+
+    def _advance(self, ts):
+        if self.watermark is None or ts > self.watermark:
+            self.watermark = ts
+            if self._next_compaction is None or ts >= self._next_compaction:
+                self.compact()
+
+    def compact(self, now=None):
+        """Merge minute and hour buckets that have aged past their retention
+        into the next coarser resolution"""
+        now = self.watermark if now is None else now
+        if now is None:
+            return
+        for width, coarser in ((MINUTE, HOUR), (HOUR, DAY)):
+            cutoff = now - self.retention[width]
+            level = self.levels[width]
+            for key in [key for key in level if key[0] + width <= cutoff]:
+                start, service = key
+                self._bucket(coarser, start - start % coarser, service).update(level.pop(key))
+        self._next_compaction = now - now % COMPACT_EVERY + COMPACT_EVERY
+
+    def update(self, other):
+        """Merge rollups built from another part of the logs"""
+        for width in RESOLUTIONS:
+            for (start, service), bucket in other.levels[width].items():
+                self._bucket(width, start, service).update(bucket)
+        self.undated += other.undated
+        if other.watermark is not None and (self.watermark is None or other.watermark > self.watermark):
+            self.watermark = other.watermark
+        self.compact()
+
+    def buckets(self, start=None, end=None, services=None):
+        """Yield (bucket start, width, service, bucket) overlapping [start, end)"""
+        for width in RESOLUTIONS:
+            for (bucket_start, service), bucket in self.levels[width].items():
+                if services and service not in services:
+                    continue
+                if start is not None and bucket_start + width <= start:
+                    continue
+                if end is not None and bucket_start >= end:
+                    continue
+                yield bucket_start, width, service, bucket
+
+    def bucket_count(self):
+        return sum(len(level) for level in self.levels.values())
+
+    def total(self, start=None, end=None, services=None):
+        return sum(bucket.total for _, _, _, bucket in self.buckets(start, end, services))
+
+    def services(self, start=None, end=None):
+        counts = Counter()
+        for _, _, service, bucket in self.buckets(start, end):
+            if bucket.total:
+                counts[service] += bucket.total
+        return counts
+
+    def counter(self, dimension, start=None, end=None, services=None):
+        """Merged counter of one dimension ('ip', 'username' or 'password'),
+        a SpaceSaving sketch unless the rollups are exact"""
+        counters = [getattr(bucket, dimension) for _, _, _, bucket in self.buckets(start, end, services)]
+        if self.error:
+            return SpaceSaving.merged(counters, self.error)
+        counts = make_counter(0)
+        for counter in counters:
+            counts.update(counter)
+        return counts
+
+    def distinct_ips(self, start=None, end=None, services=None):
+        """Number of distinct attempt and web visitor IPs"""
+        ips = make_distinct(distinct_error(self.error))
+        for _, _, _, bucket in self.buckets(start, end, services):
+            ips.update(bucket.ips)
+        return len(ips)
+
+    def top(self, dimension, n=10, start=None, end=None, services=None):
+        return self.counter(dimension, start, end, services).most_common(n)
+
+    def countries(self, geo_data, start=None, end=None, services=None):
+        """Distinct attacker IPs per country among those geolocated. Over
+        all time and services every geolocated IP is counted, since each one
+        came from the logs. A range or service filter goes through the IP
+        counters, so with sketched rollups it counts at most 1 / error of
+        the IPs, the heaviest hitters."""
+        if start is None and end is None and not services:
+            return Counter(location.get('country', 'Unknown') for location in geo_data.values() if location)
+        counts = Counter()
+        for ip, _ in self.counter('ip', start, end, services).items():
+            location = geo_data.get(ip)
+            if location:
+                counts[location.get('country', 'Unknown')] += 1
+        return counts
+
+    def hour_of_day(self, start=None, end=None, services=None):
+        hours = [0] * 24
+        for _, _, _, bucket in self.buckets(start, end, services):
+            for hour, count in enumerate(bucket.hours):
+                hours[hour] += count
+        return hours
+
+    def series(self, width, start=None, end=None, services=None):
+        """Sorted (time, count) pairs at the given bucket width; buckets
+        coarser than the width are counted at their start"""
+        counts = Counter()
+        for bucket_start, _, _, bucket in self.buckets(start, end, services):
+            counts[bucket_start - bucket_start % width] += bucket.total
+        return sorted(counts.items())
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""Rotation and compression of the JSON logs.
+
+A log is rotated once it reaches LOG_ROTATE_BYTES or has been written for
+LOG_ROTATE_SECONDS: the live file is renamed to a timestamped segment
+(auth_attempts.json-20240501T120000) and the next write starts a new file.
+Every honeypot process appends while holding logs/.rotate.lock shared and
+rotation holds it exclusively. Writers reopen their file whenever the path
+no longer points at the inode they have open, so no process ever appends to
+a closed segment.
+
+Closed segments are compressed in the background (gzip, or zstd when the
+zstandard package is installed) and recorded in logs/segments.json with
+their first and last timestamps. Readers pass a time window to
+parallel.log_shards() to skip segments that cannot contain matching events.
+"""
+
+import contextlib
+import datetime
+import fcntl
+import gzip
+import io
+import json
+import os
+import shutil
+import threading
+import time
+
+import settings
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MANIFEST = 'segments.json'
+LOCK_FILE = '.rotate.lock'
+COMPRESS_LOCK_FILE = '.compress.lock'
+SUFFIXES = {'gzip': '.gz', 'zstd': '.zst', 'none': ''}
+COMPRESSIONS = tuple(SUFFIXES)
+
+_TIMESTAMP = b'"timestamp":'
+
+# Lock files this process has open. An flock belongs to the open file, which
+# a forked child shares, so a worker forked while the sink or compressor
+# thread held a lock would keep it for its whole life. The child closes its
+# copies right after the fork; the parent's lock is unaffected.
+_lock_fds = set()
+_lock_fds_lock = threading.Lock()
+
+
+def _open_lock(name, logs_dir):
+    with _lock_fds_lock:
+        fd = os.open(os.path.join(logs_dir, name), os.O_RDWR | os.O_CREAT, 0o644)
+        _lock_fds.add(fd)
+    return fd
+
+
+def _close_lock(fd):
+    with _lock_fds_lock:
+        _lock_fds.discard(fd)
+        os.close(fd)
+
+
+def _close_inherited_locks():
+    for fd in _lock_fds:
+        try:
+            os.close(fd)
+        except OSError:
+            pass
+    _lock_fds.clear()
+    _lock_fds_lock.release()
+
+
+os.register_at_fork(before=_lock_fds_lock.acquire, after_in_parent=_lock_fds_lock.release,
+                    after_in_child=_close_inherited_locks)
+
+
+@contextlib.contextmanager
+def rotation_lock(logs_dir, exclusive=False):
+    """Hold the logs directory's rotation lock, shared by writers and
+    exclusive for rotation and manifest updates"""
+    fd = _open_lock(LOCK_FILE, logs_dir)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        yield
+    finally:
+        _close_lock(fd)
+
+
+def is_compressed(path):
+    return path.endswith(('.gz', '.zst'))
+
+
+def open_segment(path, mode='rb'):
+    """Open a log file or segment for reading, decompressing as needed.
+
+    A segment that was compressed after its path was listed is opened under
+    its compressed name instead."""
+    if not os.path.exists(path) and not is_compressed(path):
+        for suffix in ('.gz', '.zst'):
+            if os.path.exists(path + suffix):
+                path += suffix
+                break
+    text = 't' in mode
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', errors='replace') if text else gzip.open(path, 'rb')
+    if path.endswith('.zst'):
+        if zstandard is None:
+            raise RuntimeError(f"Reading {path} needs the zstandard package")
+        f = zstandard.open(path, 'rb')
+        return io.TextIOWrapper(f, errors='replace') if text else f
+    return open(path, 'r', errors='replace') if text else open(path, 'rb')
+
+
+def load_manifest(logs_dir):
+    try:
+        with open(os.path.join(logs_dir, MANIFEST)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {'started': {}, 'segments': []}
+
+
+def _save_manifest(logs_dir, manifest):
+    # Callers hold the exclusive rotation lock
+    path = os.path.join(logs_dir, MANIFEST)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(path + '.tmp', path)
+
+
+def segments(logs_dir, filename, since=None, until=None, pending=True):
+    """Closed segments of one log, oldest first, that may hold events in
+    [since, until). Segments not yet scanned are included unless
+    ``pending`` is false."""
+    paths = []
+    for segment in load_manifest(logs_dir)['segments']:
+        if segment['log'] != filename:
+            continue
+        if 'end' not in segment:
+            if pending:
+                paths.append(os.path.join(logs_dir, segment['file']))
+            continue
+        if since and segment['end'] and segment['end'] < since:
+            continue
+        if until and segment['start'] and segment['start'] >= until:
+            continue
+        paths.append(os.path.join(logs_dir, segment['file']))
+    return paths
+
+
+def rotate(logs_dir, filename, max_bytes=None, max_age=None, inode=None):
+    """Rotate one log if it is over the size or age limit.
+
+    Runs under the exclusive lock and re-checks the limits there, so when
+    several processes decide to rotate at once only the first one does.
+    ``inode`` is the caller's open file; if the path already points at a
+    different file, another process has rotated it. Returns whether this
+    call rotated the log and when the current live file was started.
+    """
+    max_bytes = settings.LOG_ROTATE_BYTES if max_bytes is None else max_bytes
+    max_age = settings.LOG_ROTATE_SECONDS if max_age is None else max_age
+    path = os.path.join(logs_dir, filename)
+    with rotation_lock(logs_dir, exclusive=True):
+        manifest = load_manifest(logs_dir)
+        now = time.time()
+        started = manifest['started'].setdefault(filename, now)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            st = None
+        too_big = st and max_bytes and st.st_size >= max_bytes
+        too_old = st and max_age and now - started >= max_age
+        if not (too_big or too_old) or (inode is not None and st.st_ino != inode):
+            if started == now:
+                _save_manifest(logs_dir, manifest)
+            return False, started
+
+        manifest['started'][filename] = now
+        if st.st_size:
+            stamp = datetime.datetime.now().strftime('%Y%m%dT%H%M%S')
+            name = f"{filename}-{stamp}"
+            suffix = 1
+            while any(os.path.exists(os.path.join(logs_dir, name + s)) for s in SUFFIXES.values()):
+                suffix += 1
+                name = f"{filename}-{stamp}-{suffix}"
+            os.rename(path, os.path.join(logs_dir, name))
+            manifest['segments'].append({'log': filename, 'file': name})
+        _save_manifest(logs_dir, manifest)
+        return True, now
+
+
+def scan_range(path):
+    """First and last timestamp and event count of an uncompressed segment"""
+    start = end = None
+    events = 0
+    with open(path, 'rb') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            events += 1
+            i = line.find(_TIMESTAMP)
+            if i < 0:
+                continue
+            i = line.find(b'"', i + len(_TIMESTAMP)) + 1
+            if i <= 0:
+                continue
+            timestamp = line[i:line.find(b'"', i)].decode('utf-8', 'replace')
+            if start is None or timestamp < start:
+                start = timestamp
+            if end is None or timestamp > end:
+                end = timestamp
+    return start, end, events
+
+
+def _compress_file(src, dst, compression):
+    tmp = dst + '.tmp'
+    with open(src, 'rb') as fin:
+        if compression == 'zstd':
+            fout = zstandard.open(tmp, 'wb')
+        else:
+            fout = gzip.open(tmp, 'wb', compresslevel=6)
+        with fout:
+            shutil.copyfileobj(fin, fout, 1024 * 1024)
+    return tmp
+
+
+def finish_segment(logs_dir, name, compression=None):
+    """Record a closed segment's time range and compress it"""
+    compression = compression or settings.LOG_COMPRESSION
+    if compression == 'zstd' and zstandard is None:
+        compression = 'gzip'
+    src = os.path.join(logs_dir, name)
+    start, end, events = scan_range(src)
+    final = name + SUFFIXES[compression]
+    tmp = _compress_file(src, os.path.join(logs_dir, final), compression) if final != name else None
+
+    with rotation_lock(logs_dir, exclusive=True):
+        if tmp is not None:
+            os.replace(tmp, os.path.join(logs_dir, final))
+        manifest = load_manifest(logs_dir)
+        for segment in manifest['segments']:
+            if segment['file'] == name:
+                segment.update(file=final, start=start, end=end, events=events,
+                               bytes=os.path.getsize(os.path.join(logs_dir, final)))
+        _save_manifest(logs_dir, manifest)
+        if tmp is not None:
+            os.remove(src)
+
+
+def finish_pending(logs_dir, compression=None):
+    """Finish every pending segment. Only one process does this at a time;
+    others return immediately."""
+    fd = _open_lock(COMPRESS_LOCK_FILE, logs_dir)
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return 0
+        done = 0
+        while True:
+            pending = [s['file'] for s in load_manifest(logs_dir)['segments'] if 'end' not in s]
+            if not pending:
+                return done
+            for name in pending:
+                try:
+                    finish_segment(logs_dir, name, compression)
+                except FileNotFoundError:
+                    print(f"[-] Log segment {name} is missing")
+                    with rotation_lock(logs_dir, exclusive=True):
+                        manifest = load_manifest(logs_dir)
+                        manifest['segments'] = [s for s in manifest['segments'] if s['file'] != name]
+                        _save_manifest(logs_dir, manifest)
+                done += 1
+    finally:
+        _close_lock(fd)
+
+
+def finish_in_background(logs_dir, compression=None):
+    thread = threading.Thread(target=finish_pending, args=(logs_dir, compression),
+                              name='log-compress', daemon=True)
+    thread.start()
+    return thread
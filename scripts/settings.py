@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""Shared paths and tunables for the honeypot services.
+
+Every value can be set in the [honeypot] section of config/honeypot.conf
+(or the file named by HONEYPOT_CONFIG), using the HONEYPOT_* variable name
+without its prefix, e.g. ``ssh_backend = asyncssh``. Environment variables
+take precedence over the file.
+"""
+
+import configparser
+import os
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_FILE = os.environ.get('HONEYPOT_CONFIG', os.path.join(BASE_DIR, 'config', 'honeypot.conf'))
+
+
+def _read_config(path):
+    """HONEYPOT_* values from the [honeypot] section of an INI file"""
+    parser = configparser.ConfigParser(interpolation=None)
+    try:
+        with open(path) as f:
+            parser.read_file(f)
+    except FileNotFoundError:
+        return {}
+    if not parser.has_section('honeypot'):
+        return {}
+    return {'HONEYPOT_' + key.upper(): value for key, value in parser.items('honeypot')}
+
+
+_values = {**_read_config(CONFIG_FILE), **os.environ}
+
+
+def _get(name, default):
+    return _values.get(name, default)
+
+
+LOGS_DIR = _get('HONEYPOT_LOGS_DIR', os.path.join(BASE_DIR, 'logs'))
+CONFIG_DIR = _get('HONEYPOT_CONFIG_DIR', os.path.join(BASE_DIR, 'config'))
+REPORTS_DIR = _get('HONEYPOT_REPORTS_DIR', os.path.join(BASE_DIR, 'reports'))
+
+# honeypot.py: services run in the one process, where and how often it writes
+# its health and metrics snapshot, and how often new IPs are geolocated (0 only
+# at startup)
+SERVICES = _get('HONEYPOT_SERVICES', 'ssh,web,ftp,telnet,dashboard')
+HEALTH_FILE = _get('HONEYPOT_HEALTH_FILE', os.path.join(LOGS_DIR, 'honeypot_health.json'))
+HEALTH_INTERVAL = float(_get('HONEYPOT_HEALTH_INTERVAL', '10'))
+GEO_INTERVAL = float(_get('HONEYPOT_GEO_INTERVAL', '3600'))
+
+# Admission control for the socket listeners: concurrent sessions overall and
+# per source IP, per-IP and overall connection rates (per second, with burst),
+# and how long shed connections are held open (0 closes them at once)
+ADMISSION_MAX_SESSIONS = int(_get('HONEYPOT_ADMISSION_MAX_SESSIONS', '512'))
+ADMISSION_IP_SESSIONS = int(_get('HONEYPOT_ADMISSION_IP_SESSIONS', '16'))
+ADMISSION_IP_RATE = float(_get('HONEYPOT_ADMISSION_IP_RATE', '2'))
+ADMISSION_IP_BURST = float(_get('HONEYPOT_ADMISSION_IP_BURST', '20'))
+ADMISSION_ACCEPT_RATE = float(_get('HONEYPOT_ADMISSION_ACCEPT_RATE', '200'))
+ADMISSION_ACCEPT_BURST = float(_get('HONEYPOT_ADMISSION_ACCEPT_BURST', '400'))
+ADMISSION_TARPIT = float(_get('HONEYPOT_ADMISSION_TARPIT', '30'))
+ADMISSION_MAX_TARPIT = int(_get('HONEYPOT_ADMISSION_MAX_TARPIT', '1024'))
+ADMISSION_REPORT_INTERVAL = float(_get('HONEYPOT_ADMISSION_REPORT_INTERVAL', '60'))
+
+# Worker processes per service under supervisor.py; 0 starts one per CPU
+WORKERS = int(_get('HONEYPOT_WORKERS', '0'))
+
+# SSH server implementation: "paramiko" (a worker thread per session) or
+# "asyncssh" (sessions share the engine's event loop)
+SSH_BACKEND = _get('HONEYPOT_SSH_BACKEND', 'paramiko')
+# SSH host key types offered ("ed25519", "ecdsa", "rsa"; generated in CONFIG_DIR
+# on first use) and the algorithm preset: "fast" or paramiko's "default" lists
+SSH_HOST_KEYS = _get('HONEYPOT_SSH_HOST_KEYS', 'ed25519,ecdsa,rsa')
+SSH_ALGORITHMS = _get('HONEYPOT_SSH_ALGORITHMS', 'fast')
+# SSH session limits: seconds to finish the key exchange, then seconds a session
+# may last, password attempts per session and seconds of silence (0 disables)
+SSH_HANDSHAKE_TIMEOUT = float(_get('HONEYPOT_SSH_HANDSHAKE_TIMEOUT', '15'))
+SSH_AUTH_TIMEOUT = float(_get('HONEYPOT_SSH_AUTH_TIMEOUT', '30'))
+SSH_MAX_AUTH_ATTEMPTS = int(_get('HONEYPOT_SSH_MAX_AUTH_ATTEMPTS', '6'))
+SSH_IDLE_TIMEOUT = float(_get('HONEYPOT_SSH_IDLE_TIMEOUT', '10'))
+
+# Parquet archive of closed log shards, partitioned by day and service
+ARCHIVE_DIR = _get('HONEYPOT_ARCHIVE_DIR', os.path.join(LOGS_DIR, 'archive'))
+
+# Log sink: flush when this many events are queued or this many seconds pass
+LOG_BATCH_SIZE = int(_get('HONEYPOT_LOG_BATCH_SIZE', '500'))
+LOG_FLUSH_INTERVAL = float(_get('HONEYPOT_LOG_FLUSH_INTERVAL', '0.5'))
+# fsync policy: "none", "batch" (after every flush) or "interval"
+LOG_FSYNC = _get('HONEYPOT_LOG_FSYNC', 'interval')
+LOG_FSYNC_INTERVAL = float(_get('HONEYPOT_LOG_FSYNC_INTERVAL', '5'))
+# Rotate the JSON logs at this size or age (0 disables either limit) and
+# compress closed segments with "gzip", "zstd" (needs zstandard) or "none"
+LOG_ROTATE_BYTES = int(_get('HONEYPOT_LOG_ROTATE_BYTES', str(100 * 2**20)))
+LOG_ROTATE_SECONDS = float(_get('HONEYPOT_LOG_ROTATE_SECONDS', str(86400)))
+LOG_COMPRESSION = _get('HONEYPOT_LOG_COMPRESSION', 'gzip')
+
+# Where events are recorded: "json", "sqlite" or "both"
+LOG_BACKEND = _get('HONEYPOT_LOG_BACKEND', 'json')
+EVENT_DB = _get('HONEYPOT_EVENT_DB', os.path.join(LOGS_DIR, 'events.db'))
+
+# JSON codec for log events: "msgspec", "orjson" or "json"; empty picks the fastest installed
+JSON_BACKEND = _get('HONEYPOT_JSON_BACKEND', '')
+
+# Relative error for approximate top-N and distinct counts; 0 keeps exact counters
+SKETCH_ERROR = float(_get('HONEYPOT_SKETCH_ERROR', '0'))
+
+# Geolocation cache: successful lookups and failures expire after these many seconds
+GEO_CACHE_PATH = _get('HONEYPOT_GEO_CACHE', os.path.join(LOGS_DIR, 'geo_cache.jsonl'))
+GEO_CACHE_TTL = float(_get('HONEYPOT_GEO_CACHE_TTL', str(30 * 86400)))
+GEO_NEGATIVE_TTL = float(_get('HONEYPOT_GEO_NEGATIVE_TTL', str(86400)))
+
+# Local geolocation database (CSV of CIDR ranges or .mmdb); empty uses ip-api.com
+GEO_DB = _get('HONEYPOT_GEO_DB', '')
+
+# Remote geolocation provider (ip-api.com batch API) and its request budget
+GEO_API_URL = _get('HONEYPOT_GEO_API_URL', 'http://ip-api.com')
+GEO_WORKERS = int(_get('HONEYPOT_GEO_WORKERS', '4'))
+GEO_BATCH_SIZE = int(_get('HONEYPOT_GEO_BATCH_SIZE', '100'))
+GEO_RATE = float(_get('HONEYPOT_GEO_RATE', str(15 / 60)))
+GEO_BURST = float(_get('HONEYPOT_GEO_BURST', '15'))
+
+# Rollups: minute buckets older than this merge into hours, hours into days
+ROLLUP_MINUTE_RETENTION = int(_get('HONEYPOT_ROLLUP_MINUTE_RETENTION', str(2 * 3600)))
+ROLLUP_HOUR_RETENTION = int(_get('HONEYPOT_ROLLUP_HOUR_RETENTION', str(7 * 86400)))
+# Relative error of each rollup bucket's IP, username and password counters
+# (about 1/error keys kept per bucket); 0 keeps exact counters
+ROLLUP_SKETCH_ERROR = float(_get('HONEYPOT_ROLLUP_SKETCH_ERROR', '0.001'))
+
+# Dashboard: rotated log segments older than this many days are not loaded (0 loads all)
+DASHBOARD_HISTORY_DAYS = float(_get('HONEYPOT_DASHBOARD_HISTORY_DAYS', '30'))
+
+# Live dashboard stream: tail poll interval and per-client buffered messages
+STREAM_POLL_INTERVAL = float(_get('HONEYPOT_STREAM_POLL_INTERVAL', '1'))
+STREAM_BUFFER = int(_get('HONEYPOT_STREAM_BUFFER', '256'))
+
+# Report jobs run in the dashboard process on this many worker threads
+REPORT_WORKERS = int(_get('HONEYPOT_REPORT_WORKERS', '1'))
+
+# Report charts: "png" or "svg" files, or "json" drawn inline by the browser
+REPORT_CHART_FORMAT = _get('HONEYPOT_REPORT_CHART_FORMAT', 'png')
+
+# Report: most recent attacks listed, split into HTML pages of this many rows
+REPORT_RECENT = int(_get('HONEYPOT_REPORT_RECENT', '20'))
+REPORT_PAGE_SIZE = int(_get('HONEYPOT_REPORT_PAGE_SIZE', '1000'))
+TEMPLATE_CACHE_DIR = _get('HONEYPOT_TEMPLATE_CACHE_DIR', os.path.join(REPORTS_DIR, '.template_cache'))
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""Bounded-memory sketches for heavy hitters and distinct counts.
+
+SpaceSaving keeps approximate top-K counts for unbounded key spaces such as
+passwords, and HyperLogLog estimates how many distinct IPs were seen. Both
+are mergeable, so sketches built over separate log shards can be combined.
+ExactCounter and set are the exact stand-ins with the same interface.
+"""
+
+import hashlib
+import heapq
+import math
+from collections import Counter
+
+import settings
+
+
+class ExactCounter(Counter):
+    """Counter with the same add/update interface as SpaceSaving"""
+
+    def add(self, key, count=1):
+        self[key] += count
+
+
+class SpaceSaving:
+    """Approximate heavy hitters (Metwally et al.).
+
+    Tracks at most ``capacity`` keys. Every reported count overestimates the
+    true count by at most ``total / capacity``; any key whose true frequency
+    exceeds that bound is guaranteed to be tracked.
+    """
+
+    def __init__(self, error=0.001, capacity=None):
+        self.capacity = capacity or math.ceil(1 / error)
+        self.counts = {}
+        self.errors = {}
+        self.total = 0
+        self._heap = []
+        self._seq = 0
+
+    def __len__(self):
+        return len(self.counts)
+
+    def __getitem__(self, key):
+        return self.counts.get(key, 0)
+
+    def __contains__(self, key):
+        return key in self.counts
+
+    def items(self):
+        return self.counts.items()
+
+    def _min(self):
+        # Lazy heap: skip entries whose count has since changed
+        heap = self._heap
+        while True:
+            count, seq, key = heap[0]
+            if self.counts.get(key) == count:
+                return count, key
+            heapq.heappop(heap)
+
+    def _push(self, key):
+        self._seq += 1
+        heapq.heappush(self._heap, (self.counts[key], self._seq, key))
+        if len(self._heap) > 4 * self.capacity:
+            self._rebuild_heap()
+
+    def _rebuild_heap(self):
+        self._heap = [(c, -i, k) for i, (k, c) in enumerate(self.counts.items())]
+        heapq.heapify(self._heap)
+
+    def add(self, key, count=1):
+        self.total += count
+        if key in self.counts:
+            self.counts[key] += count
+        elif len(self.counts) < self.capacity:
+            self.counts[key] = count
+            self.errors[key] = 0
+        else:
+            floor, victim = self._min()
+            del self.counts[victim]
+            del self.errors[victim]
+            self.counts[key] = floor + count
+            self.errors[key] = floor
+        self._push(key)
+
+    def error_bound(self):
+        return self.total / self.capacity
+
+    def most_common(self, n=None):
+        ranked = sorted(self.counts.items(), key=lambda x: x[1], reverse=True)
+        return ranked if n is None else ranked[:n]
+
+    def update(self, other):
+        """Merge another SpaceSaving sketch into this one"""
+        floor = self._min()[0] if len(self.counts) >= self.capacity else 0
+        other_floor = other._min()[0] if len(other.counts) >= other.capacity else 0
+
+        counts = {}
+        errors = {}
+        for key in set(self.counts) | set(other.counts):
+            counts[key] = self.counts.get(key, floor) + other.counts.get(key, other_floor)
+            errors[key] = self.errors.get(key, floor) + other.errors.get(key, other_floor)
+
+        kept = heapq.nlargest(self.capacity, counts.items(), key=lambda x: x[1])
+        self.counts = dict(kept)
+        self.errors = {key: errors[key] for key in self.counts}
+        self.total += other.total
+        self._rebuild_heap()
+
+    @classmethod
+    def merged(cls, sketches, error=0.001, capacity=None):
+        """Merge many sketches in one pass over their keys, rather than
+        truncating to the capacity after every pairwise update()"""
+        result = cls(error, capacity)
+        counts = {}
+        errors = {}
+        # A key a sketch does not track counts as that sketch's floor
+        base = 0
+        for sketch in sketches:
+            floor = sketch._min()[0] if len(sketch.counts) >= sketch.capacity else 0
+            base += floor
+            for key, count in sketch.counts.items():
+                counts[key] = counts.get(key, 0) + count - floor
+                errors[key] = errors.get(key, 0) + sketch.errors[key] - floor
+            result.total += sketch.total
+        kept = heapq.nlargest(result.capacity, counts.items(), key=lambda x: x[1])
+        result.counts = {key: count + base for key, count in kept}
+        result.errors = {key: errors[key] + base for key in result.counts}
+        result._rebuild_heap()
+        return result
+
+
+def hash64(value):
+    """Stable 64-bit hash, identical across processes unlike hash()"""
+    if not isinstance(value, bytes):
+        value = str(value).encode('utf-8', 'surrogatepass')
+    return int.from_bytes(hashlib.blake2b(value, digest_size=8).digest(), 'big')
+
+
+class HyperLogLog:
+    """Distinct-count estimator with relative standard error ~1.04/sqrt(2**p)"""
+
+    def __init__(self, error=0.01, precision=None):
+        if precision is None:
+            precision = math.ceil(math.log2((1.04 / error) ** 2))
+        self.p = min(max(precision, 4), 18)
+        self.m = 1 << self.p
+        self.registers = bytearray(self.m)
+
+    def add(self, value):
+        h = hash64(value)
+        index = h >> (64 - self.p)
+        rest = h & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, other):
+        """Merge another HyperLogLog with the same precision into this one"""
+        if other.p != self.p:
+            raise ValueError("Cannot merge HyperLogLogs with different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def estimate(self):
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            return m * math.log(m / zeros)
+        return raw
+
+    def __len__(self):
+        return int(round(self.estimate()))
+
+
+def make_counter(error=None):
+    """Return a SpaceSaving sketch when an error bound is configured, else an
+    exact counter"""
+    error = settings.SKETCH_ERROR if error is None else error
+    return SpaceSaving(error) if error else ExactCounter()
+
+
+def make_distinct(error=None):
+    """Return a HyperLogLog when an error bound is configured, else a set"""
+    error = settings.SKETCH_ERROR if error is None else error
+    return HyperLogLog(error) if error else set()
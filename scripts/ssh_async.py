@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""SSH honeypot on asyncssh, selected with HONEYPOT_SSH_BACKEND=asyncssh.
+
+ssh_honeypot.py needs a worker thread per session plus paramiko's own
+transport thread. Here every session is a coroutine on the engine's event
+loop, like FTP and Telnet, so thousands of brute-forcers share one thread.
+
+Password attempts are logged exactly as in ssh_honeypot.py and always
+fail. Both backends use the same port and host key files (ssh_keys.py),
+HONEYPOT_SSH_* settings and admission control. A stalled handshake counts as silence, so it is cut
+off by the idle timeout.
+"""
+
+import asyncio
+import datetime
+import os
+
+import asyncssh
+
+import settings
+import ssh_keys
+from engine import listen_socket
+from log_sink import log_event
+from ssh_keys import SSH_PORT
+
+KEY_ALGORITHMS = {
+    'rsa': ('ssh-rsa', {'key_size': 2048}),
+    'ecdsa': ('ecdsa-sha2-nistp256', {}),
+    'ed25519': ('ssh-ed25519', {}),
+}
+
+# asyncssh options per HONEYPOT_SSH_ALGORITHMS preset
+ALGORITHMS = {
+    'default': {},
+    'fast': {
+        'kex_algs': ['curve25519-sha256', 'curve25519-sha256@libssh.org', 'ecdh-sha2-nistp256',
+                     'diffie-hellman-group14-sha256'],
+        'encryption_algs': ['aes128-ctr', 'aes256-ctr', 'aes128-gcm@openssh.com', 'aes256-gcm@openssh.com',
+                            'chacha20-poly1305@openssh.com'],
+        'mac_algs': ['hmac-sha2-256', 'hmac-sha2-512'],
+    },
+}
+
+
+def read_key(key_type, path):
+    return asyncssh.read_private_key(path)
+
+
+def generate_key(key_type, path):
+    algorithm, options = KEY_ALGORITHMS[key_type]
+    key = asyncssh.generate_private_key(algorithm, **options)
+    # PEM for RSA and ECDSA, which paramiko cannot read in the OpenSSH format
+    key.write_private_key(path, 'openssh' if key_type == 'ed25519' else 'pkcs1-pem')
+    os.chmod(path, 0o600)
+    return key
+
+
+ssh_keys.check_backend(KEY_ALGORITHMS, ALGORITHMS)
+HOST_KEYS = ssh_keys.load_host_keys(read_key, generate_key)
+
+
+class SSHServer(asyncssh.SSHServer):
+    """Per-connection callbacks; mirrors ssh_honeypot.SSHServer"""
+
+    def __init__(self, max_attempts=None, idle_timeout=None):
+        self.max_attempts = settings.SSH_MAX_AUTH_ATTEMPTS if max_attempts is None else max_attempts
+        self.idle_timeout = settings.SSH_IDLE_TIMEOUT if idle_timeout is None else idle_timeout
+        self.attempts = 0
+        self.conn = None
+        self.client_address = ('', 0)
+        self.idle_timer = None
+
+    def connection_made(self, conn):
+        self.conn = conn
+        self.client_address = (conn.get_extra_info('peername') or ('', 0))[:2]
+        self._touch()
+
+    def connection_lost(self, exc):
+        if self.idle_timer is not None:
+            self.idle_timer.cancel()
+
+    def _touch(self):
+        if self.idle_timer is not None:
+            self.idle_timer.cancel()
+        if self.idle_timeout:
+            self.idle_timer = asyncio.get_running_loop().call_later(self.idle_timeout, self._close, 'idle')
+
+    def _close(self, reason):
+        print(f"[-] Closing SSH session from {self.client_address[0]} ({reason}, {self.attempts} attempts)")
+        self.conn.close()
+
+    def begin_auth(self, username):
+        self._touch()
+        return True
+
+    def password_auth_supported(self):
+        return True
+
+    def validate_password(self, username, password):
+        self._touch()
+        self.attempts += 1
+
+        log_entry = {
+            "timestamp": datetime.datetime.now().isoformat(),
+            "source_ip": self.client_address[0],
+            "source_port": self.client_address[1],
+            "username": username,
+            "password": password,
+            "service": "ssh"
+        }
+
+        log_event('auth_attempts.json', log_entry)
+
+        print(f"[+] Login attempt: {username}:{password} from {self.client_address[0]}")
+
+        if self.max_attempts and self.attempts >= self.max_attempts:
+            # Let the failure reply go out first
+            asyncio.get_running_loop().call_soon(self._close, 'attempts')
+        return False
+
+
+async def server_options(algorithms=None):
+    return await asyncssh.SSHServerConnectionOptions.construct(
+        server_factory=SSHServer, server_host_keys=HOST_KEYS,
+        login_timeout=settings.SSH_AUTH_TIMEOUT or None, keepalive_interval=0,
+        **ALGORITHMS[algorithms or settings.SSH_ALGORITHMS])
+
+
+async def handle_connection(client, addr, options):
+    """Run one SSH session until the client gives up or is cut off"""
+    print(f"[+] Connection from: {addr[0]}:{addr[1]}")
+    try:
+        await asyncssh.run_server(client, options=options)
+    except (asyncssh.Error, OSError, asyncio.TimeoutError):
+        # Authentication never succeeds, so every session ends here
+        pass
+    finally:
+        client.close()
+
+
+async def serve(port=SSH_PORT, host='0.0.0.0', admission=None, reuse_port=False):
+    """Accept SSH connections on the running loop until cancelled.
+
+    Admission control runs on the raw socket, before asyncssh sends its
+    banner or starts a key exchange."""
+    loop = asyncio.get_running_loop()
+    options = await server_options()
+    sessions = set()
+    sock = listen_socket(host, port, reuse_port)
+
+    def release(task, ip):
+        sessions.discard(task)
+        if admission is not None:
+            admission.release(ip)
+
+    try:
+        while True:
+            client, addr = await loop.sock_accept(sock)
+            if admission is not None and admission.admit(addr[0]) is not None:
+                admission.shed(client.close)
+                continue
+            task = asyncio.ensure_future(handle_connection(client, addr, options))
+            sessions.add(task)
+            task.add_done_callback(lambda t, ip=addr[0]: release(t, ip))
+    finally:
+        sock.close()
+        for task in list(sessions):
+            task.cancel()
@@ -1,110 +1,158 @@
 #!/usr/bin/env python3
+"""SSH honeypot: logs password attempts and never lets anyone in.
+
+The server offers the host keys named in HONEYPOT_SSH_HOST_KEYS. Clients
+pick the first key type they support, and most prefer Ed25519 or ECDSA,
+which sign far faster than RSA. The "fast" algorithm preset drops the
+expensive key exchanges (4096-bit Diffie-Hellman, group exchange) and the
+legacy ciphers. A session is torn down once the client disconnects, uses up
+HONEYPOT_SSH_MAX_AUTH_ATTEMPTS, stays silent for HONEYPOT_SSH_IDLE_TIMEOUT
+seconds or has been connected for HONEYPOT_SSH_AUTH_TIMEOUT seconds.
+"""
 
-import socket
 import threading
+import time
 import paramiko
 import datetime
-import json
 import os
 
-# Setup logging
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-LOGS_DIR = os.path.join(BASE_DIR, 'logs')
-CONFIG_DIR = os.path.join(BASE_DIR, 'config')
-KEY_PATH = os.path.join(CONFIG_DIR, 'server.key')
+import settings
+import ssh_keys
+from log_sink import log_event
+from ssh_keys import SSH_PORT
+
+KEY_CLASSES = {'rsa': paramiko.RSAKey, 'ecdsa': paramiko.ECDSAKey, 'ed25519': paramiko.Ed25519Key}
+
+# Security option overrides per HONEYPOT_SSH_ALGORITHMS preset
+ALGORITHMS = {
+    'default': {},
+    'fast': {
+        'kex': ('curve25519-sha256@libssh.org', 'ecdh-sha2-nistp256', 'diffie-hellman-group14-sha256'),
+        'ciphers': ('aes128-ctr', 'aes256-ctr', 'aes128-gcm@openssh.com', 'aes256-gcm@openssh.com'),
+        'digests': ('hmac-sha2-256', 'hmac-sha2-512'),
+    },
+}
+
+# How often a waiting session checks its attempt count and timeouts
+POLL_INTERVAL = 0.5
+
 
-if not os.path.exists(LOGS_DIR):
-    os.makedirs(LOGS_DIR)
+def read_key(key_type, path):
+    return KEY_CLASSES[key_type](filename=path)
 
 
-try:
-    HOST_KEY = paramiko.RSAKey(filename=KEY_PATH)
-    print(f"[+] Loaded SSH key from {KEY_PATH}")
-except Exception as e:
-    print(f"[!] Error loading SSH key: {e}")
-    print(f"[+] Generating new SSH key...")
-    if not os.path.exists(CONFIG_DIR):
-        os.makedirs(CONFIG_DIR)
-    HOST_KEY = paramiko.RSAKey.generate(2048)
-    HOST_KEY.write_private_key_file(KEY_PATH)
-    print(f"[+] New SSH key generated at {KEY_PATH}")
+def generate_key(key_type, path):
+    if key_type == 'ed25519':
+        # paramiko cannot generate Ed25519 keys itself
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+        data = Ed25519PrivateKey.generate().private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.OpenSSH,
+            serialization.NoEncryption())
+        with os.fdopen(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'wb') as f:
+            f.write(data)
+        return paramiko.Ed25519Key(filename=path)
+    if key_type == 'ecdsa':
+        key = paramiko.ECDSAKey.generate(bits=256)
+    else:
+        key = paramiko.RSAKey.generate(2048)
+    key.write_private_key_file(path)
+    return key
+
+
+ssh_keys.check_backend(KEY_CLASSES, ALGORITHMS)
+HOST_KEYS = ssh_keys.load_host_keys(read_key, generate_key)
 
-SSH_PORT = 2222
 
 class SSHServer(paramiko.ServerInterface):
-    def __init__(self, client_address):
+    def __init__(self, client_address, max_attempts=None):
         self.client_address = client_address
-        self.event = threading.Event()
+        self.max_attempts = settings.SSH_MAX_AUTH_ATTEMPTS if max_attempts is None else max_attempts
+        self.attempts = 0
+        self.last_activity = time.monotonic()
+        # Set once the client has used up its password attempts
+        self.done = threading.Event()
 
     def check_auth_password(self, username, password):
+        self.last_activity = time.monotonic()
+        self.attempts += 1
 
-    	log_entry = {
-        	"timestamp": datetime.datetime.now().isoformat(),
-       		"source_ip": self.client_address[0],
-        	"source_port": self.client_address[1],
-        	"username": username,
-        	"password": password,
-        	"service": "ssh"
-   	 }
-
-    	log_file = os.path.join(LOGS_DIR, 'auth_attempts.json')
-    	with open(log_file, "a") as f:
-        	f.write(json.dumps(log_entry) + "\n")
+        log_entry = {
+            "timestamp": datetime.datetime.now().isoformat(),
+            "source_ip": self.client_address[0],
+            "source_port": self.client_address[1],
+            "username": username,
+            "password": password,
+            "service": "ssh"
+        }
 
-    	print(f"[+] Login attempt: {username}:{password} from {self.client_address[0]}")
+        log_event('auth_attempts.json', log_entry)
 
+        print(f"[+] Login attempt: {username}:{password} from {self.client_address[0]}")
 
-    	return paramiko.AUTH_FAILED
+        if self.max_attempts and self.attempts >= self.max_attempts:
+            self.done.set()
+        return paramiko.AUTH_FAILED
 
     def get_allowed_auths(self, username):
+        self.last_activity = time.monotonic()
         return 'password'
 
-    def check_channel_request(self, kind, chanid):
-        self.event.set()
-        return paramiko.OPEN_SUCCEEDED
+    def wait(self, transport, auth_timeout=None, idle_timeout=None):
+        """Block until the session should end; returns why it ended"""
+        auth_timeout = settings.SSH_AUTH_TIMEOUT if auth_timeout is None else auth_timeout
+        idle_timeout = settings.SSH_IDLE_TIMEOUT if idle_timeout is None else idle_timeout
+        deadline = time.monotonic() + auth_timeout if auth_timeout else None
+        while True:
+            if self.done.is_set():
+                return 'attempts'
+            if not transport.is_active():
+                return 'disconnected'
+            now = time.monotonic()
+            if deadline is not None and now >= deadline:
+                return 'auth timeout'
+            if idle_timeout and now - self.last_activity >= idle_timeout:
+                return 'idle'
+            # Returns as soon as the client disconnects and the transport thread ends
+            transport.join(POLL_INTERVAL)
+
+
+def configure_transport(transport, algorithms=None):
+    """Add the host keys, algorithm preset and handshake timeouts"""
+    for key in HOST_KEYS:
+        transport.add_server_key(key)
+    options = transport.get_security_options()
+    for name, values in ALGORITHMS[algorithms or settings.SSH_ALGORITHMS].items():
+        setattr(options, name, values)
+    transport.banner_timeout = settings.SSH_HANDSHAKE_TIMEOUT
+    transport.handshake_timeout = settings.SSH_HANDSHAKE_TIMEOUT
+
 
 def handle_connection(client, addr):
     print(f"[+] Connection from: {addr[0]}:{addr[1]}")
 
+    transport = None
     try:
         transport = paramiko.Transport(client)
-        transport.add_server_key(HOST_KEY)
+        configure_transport(transport)
         server = SSHServer(addr)
         transport.start_server(server=server)
 
-        channel = transport.accept(20)
-        if channel is None:
-            print(f"[-] No channel from {addr[0]}")
-            return
-
-        server.event.wait(10)
-        transport.close()
+        reason = server.wait(transport)
+        if reason != 'disconnected':
+            print(f"[-] Closing SSH session from {addr[0]} ({reason}, {server.attempts} attempts)")
 
     except Exception as e:
         print(f"[-] Error: {e}")
-        try:
+    finally:
+        if transport is not None:
             transport.close()
-        except:
-            pass
+        else:
+            client.close()
 
 def main():
+    import engine
+    engine.run(['ssh'])
 
-    try:
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        sock.bind(('0.0.0.0', SSH_PORT))
-        sock.listen(100)
-        print(f"[+] SSH honeypot listening on port {SSH_PORT}...")
-
-        while True:
-            client, addr = sock.accept()
-            thread = threading.Thread(target=handle_connection, args=(client, addr))
-            thread.daemon = True
-            thread.start()
-
-    except Exception as e:
-        print(f"[-] Error: {e}")
-    finally:
-        sock.close()
 if __name__ == '__main__':
     main()
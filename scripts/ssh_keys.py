@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""Host keys and algorithm presets shared by the two SSH backends.
+
+ssh_honeypot.py (paramiko) and ssh_async.py (asyncssh) listen on the same
+port and use the same key files, so switching HONEYPOT_SSH_BACKEND keeps the
+server's identity. Each backend supplies its own key reader and generator
+and its own option names for each preset; this module owns the file names,
+the load-or-generate flow and the list of key types and presets, and checks
+that a backend covers all of them.
+"""
+
+import os
+
+import settings
+
+SSH_PORT = 2222
+KEY_FILES = {
+    'rsa': 'server.key',
+    'ecdsa': 'server_ecdsa.key',
+    'ed25519': 'server_ed25519.key',
+}
+# Values of HONEYPOT_SSH_ALGORITHMS
+PRESETS = ('default', 'fast')
+
+
+def check_backend(key_types, presets):
+    """Raise unless a backend handles every key type and preset, and the
+    configured preset exists"""
+    if set(key_types) != set(KEY_FILES):
+        raise ValueError(f"SSH backend key types {sorted(key_types)} do not match {sorted(KEY_FILES)}")
+    if set(presets) != set(PRESETS):
+        raise ValueError(f"SSH backend presets {sorted(presets)} do not match {sorted(PRESETS)}")
+    if settings.SSH_ALGORITHMS not in PRESETS:
+        raise ValueError(f"Unknown SSH algorithm preset: {settings.SSH_ALGORITHMS} "
+                         f"(choose from {', '.join(PRESETS)})")
+
+
+def load_host_key(key_type, read, generate):
+    """Load the host key of one type with ``read(key_type, path)``, or create
+    it with ``generate(key_type, path)`` on first use"""
+    if key_type not in KEY_FILES:
+        raise ValueError(f"Unknown SSH host key type: {key_type} (choose from {', '.join(KEY_FILES)})")
+    path = os.path.join(settings.CONFIG_DIR, KEY_FILES[key_type])
+    try:
+        key = read(key_type, path)
+        print(f"[+] Loaded SSH {key_type} key from {path}")
+        return key
+    except Exception as e:
+        print(f"[!] Error loading SSH {key_type} key: {e}")
+    print(f"[+] Generating new SSH {key_type} key...")
+    os.makedirs(settings.CONFIG_DIR, exist_ok=True)
+    key = generate(key_type, path)
+    print(f"[+] New SSH key generated at {path}")
+    return key
+
+
+def load_host_keys(read, generate):
+    """The host keys named in HONEYPOT_SSH_HOST_KEYS, in order of preference"""
+    return [load_host_key(t.strip(), read, generate) for t in settings.SSH_HOST_KEYS.split(',') if t.strip()]
@@ -1,48 +1,41 @@
 #!/bin/bash
 
+# Run from the repository root, like stop_honeypot.sh
+cd "$(dirname "$0")/.."
 
 # Create log directories if they don't exist
 mkdir -p logs
 mkdir -p reports/images
 
-# Start SSH honeypot in background
-echo "[+] Starting SSH honeypot..."
-cd scripts
-python3 ssh_honeypot.py > ../logs/ssh_honeypot.log 2>&1 &
-SSH_PID=$!
-echo $SSH_PID > ../logs/ssh_honeypot.pid
-
-# Start Web honeypot in background
-echo "[+] Starting Web honeypot..."
-python3 web_honeypot.py > ../logs/web_honeypot.log 2>&1 &
-WEB_PID=$!
-echo $WEB_PID > ../logs/web_honeypot.pid
-
-# Start FTP honeypot in background
-echo "[+] Starting FTP honeypot..."
-python3 ftp_honeypot.py > ../logs/ftp_honeypot.log 2>&1 &
-FTP_PID=$!
-echo $FTP_PID > ../logs/ftp_honeypot.pid
-
-# Start Telnet honeypot in background
-echo "[+] Starting Telnet honeypot..."
-python3 telnet_honeypot.py > ../logs/telnet_honeypot.log 2>&1 &
-TELNET_PID=$!
-echo $TELNET_PID > ../logs/telnet_honeypot.pid
-
-# Start Dashboard in background
-echo "[+] Starting Dashboard..."
-python3 dashboard.py > ../logs/dashboard.log 2>&1 &
-DASHBOARD_PID=$!
-echo $DASHBOARD_PID > ../logs/dashboard.pid
-
-# Run geolocation processing
-echo "[+] Processing geolocation data..."
-python3 geolocation.py > ../logs/geolocation.log 2>&1
-
+if [ -f logs/honeypot.pid ] && ps -p $(cat logs/honeypot.pid) > /dev/null; then
+    echo "[!] Honeypot already running (pid $(cat logs/honeypot.pid))."
+    exit 1
+fi
+
+# Every service runs in one process, configured from config/honeypot.conf
+echo "[+] Starting honeypot services..."
+python3 scripts/honeypot.py > logs/honeypot.log 2>&1 &
+HONEYPOT_PID=$!
+echo $HONEYPOT_PID > logs/honeypot.pid
+
+# Wait for the sensor to report that its listeners are up
+for i in $(seq 1 50); do
+    if grep -q "Sensor ready" logs/honeypot.log 2>/dev/null; then
+        break
+    fi
+    if ! ps -p $HONEYPOT_PID > /dev/null; then
+        echo "[-] Honeypot failed to start, see logs/honeypot.log"
+        rm logs/honeypot.pid
+        exit 1
+    fi
+    sleep 0.1
+done
+
+grep "Sensor ready" logs/honeypot.log
 echo "[+] All honeypot services started!"
 echo "[+] Dashboard available at: http://localhost:5000"
 echo "[+] Web honeypot available at: http://localhost:8080"
 echo "[+] SSH honeypot available at: localhost:2222"
 echo "[+] FTP honeypot available at: localhost:2121"
 echo "[+] Telnet honeypot available at: localhost:2323"
+echo "[+] Check health with: python3 scripts/honeypot.py --health"
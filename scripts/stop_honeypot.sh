@@ -1,63 +1,39 @@
 #!/bin/bash
 
-echo "[+] Stopping honeypot services..."
+cd "$(dirname "$0")/.."
 
-# Stop SSH honeypot
-if [ -f logs/ssh_honeypot.pid ]; then
-    PID=$(cat logs/ssh_honeypot.pid)
-    if ps -p $PID > /dev/null; then
-        kill $PID
-        echo "[+] SSH honeypot stopped."
-    else
-        echo "[!] SSH honeypot not running."
-    fi
-    rm logs/ssh_honeypot.pid
-fi
+echo "[+] Stopping honeypot services..."
 
-# Stop Web honeypot
-if [ -f logs/web_honeypot.pid ]; then
-    PID=$(cat logs/web_honeypot.pid)
+if [ -f logs/honeypot.pid ]; then
+    PID=$(cat logs/honeypot.pid)
     if ps -p $PID > /dev/null; then
+        # SIGTERM closes the listeners and flushes the logs; give it time
         kill $PID
-        echo "[+] Web honeypot stopped."
+        for i in $(seq 1 150); do
+            ps -p $PID > /dev/null || break
+            sleep 0.1
+        done
+        if ps -p $PID > /dev/null; then
+            echo "[!] Honeypot did not exit in time, killing it."
+            kill -9 $PID
+        fi
+        echo "[+] Honeypot stopped."
     else
-        echo "[!] Web honeypot not running."
+        echo "[!] Honeypot not running."
     fi
-    rm logs/web_honeypot.pid
+    rm logs/honeypot.pid
 fi
 
-# Stop FTP honeypot
-if [ -f logs/ftp_honeypot.pid ]; then
-    PID=$(cat logs/ftp_honeypot.pid)
-    if ps -p $PID > /dev/null; then
-        kill $PID
-        echo "[+] FTP honeypot stopped."
-    else
-        echo "[!] FTP honeypot not running."
+# Services started on their own with the older per-script pid files
+for NAME in ssh_honeypot web_honeypot ftp_honeypot telnet_honeypot dashboard; do
+    if [ -f logs/$NAME.pid ]; then
+        PID=$(cat logs/$NAME.pid)
+        if ps -p $PID > /dev/null; then
+            kill $PID
+            echo "[+] $NAME stopped."
+        fi
+        rm logs/$NAME.pid
     fi
-    rm logs/ftp_honeypot.pid
-fi
-# Stop Telnet honeypot
-if [ -f logs/telnet_honeypot.pid ]; then
-    PID=$(cat logs/telnet_honeypot.pid)
-    if ps -p $PID > /dev/null; then
-        kill $PID
-        echo "[+] Telnet honeypot stopped."
-    else
-        echo "[!] Telnet honeypot not running."
-    fi
-    rm logs/telnet_honeypot.pid
-fi
-# Stop Dashboard
-if [ -f logs/dashboard.pid ]; then
-    PID=$(cat logs/dashboard.pid)
-    if ps -p $PID > /dev/null; then
-        kill $PID
-        echo "[+] Dashboard stopped."
-    else
-        echo "[!] Dashboard not running."
-    fi
-    rm logs/dashboard.pid
-fi
+done
 
 echo "[+] All honeypot services stopped!"
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""Multi-process supervisor for the honeypot listeners.
+
+One Python process runs on one core at a time, and during scan storms the
+SSH key exchanges alone can saturate it. The supervisor forks N workers per
+service. Each worker binds the service's port with SO_REUSEPORT, so the
+kernel spreads incoming connections across them.
+
+Workers do not write the logs themselves. Their ForwardingSink sends event
+batches over a pipe, and the supervisor feeds them into its single LogSink,
+so rotation, compression and the SQLite store still have one writer.
+
+A worker that exits unexpectedly is restarted, after a growing delay if it
+keeps dying soon after starting. SIGTERM or Ctrl-C stops the workers,
+collects their last events and flushes the sink.
+"""
+
+import argparse
+import importlib
+import multiprocessing
+import os
+import signal
+import time
+from multiprocessing.connection import wait
+
+import engine
+import log_sink
+import settings
+
+SERVICES = ('ftp', 'telnet', 'ssh', 'web')
+# A worker exiting sooner than this after it started counts as crashing
+MIN_UPTIME = 10
+MAX_RESTART_DELAY = 30
+# Seconds workers get to exit after SIGTERM before they are killed
+STOP_TIMEOUT = 10
+
+
+def worker_main(service, conn, host, admission, workers, port):
+    """Run one service in a worker process until it is terminated"""
+    # Only the supervisor reacts to Ctrl-C; it stops the workers with SIGTERM
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    sink = log_sink.ForwardingSink(conn)
+    log_sink.set_sink(sink)
+    try:
+        if service == 'web':
+            import web_honeypot
+            log_sink.exit_on_sigterm()
+            web_honeypot.serve(host, port or web_honeypot.WEB_PORT, reuse_port=True)
+        else:
+            engine.run([service], host, admission, reuse_port=True,
+                       ports={service: port} if port else None, workers=workers)
+    finally:
+        sink.close()
+
+
+class Worker:
+    def __init__(self, service, index):
+        self.service = service
+        self.index = index
+        self.process = None
+        self.conn = None
+        self.started = 0
+        self.delay = 0
+        self.restart_at = None
+
+    @property
+    def name(self):
+        return f"{self.service} worker {self.index}"
+
+
+class Supervisor:
+    def __init__(self, services, workers=None, host=engine.LISTEN_HOST, admission=True, ports=None, sink=None):
+        unknown = set(services) - set(SERVICES)
+        if unknown:
+            raise ValueError(f"Unknown services: {', '.join(sorted(unknown))}")
+        self.count = workers or settings.WORKERS or os.cpu_count() or 1
+        self.host = host
+        self.admission = admission
+        self.ports = ports or {}
+        self.sink = sink
+        self.context = multiprocessing.get_context('fork')
+        self.workers = [Worker(service, i) for service in services for i in range(self.count)]
+        self.stopping = False
+        self.stop_deadline = None
+        self.restarts = 0
+
+    def start(self, worker):
+        reader, writer = self.context.Pipe(duplex=False)
+        worker.process = self.context.Process(
+            target=worker_main, name=f"honeypot-{worker.service}-{worker.index}",
+            args=(worker.service, writer, self.host, self.admission, self.count,
+                  self.ports.get(worker.service)))
+        worker.process.start()
+        writer.close()
+        worker.conn = reader
+        worker.started = time.monotonic()
+        worker.restart_at = None
+        print(f"[+] Started {worker.name} (pid {worker.process.pid})")
+
+    def receive(self, worker):
+        """Pass the batches waiting on a worker's pipe to the sink"""
+        try:
+            while worker.conn.poll():
+                for filename, entry in worker.conn.recv():
+                    self.sink.log(filename, entry)
+        except (EOFError, OSError):
+            worker.conn.close()
+            worker.conn = None
+
+    def reap(self, worker):
+        """Collect an exited worker and schedule its restart"""
+        if worker.conn is not None:
+            self.receive(worker)
+            if worker.conn is not None:
+                worker.conn.close()
+                worker.conn = None
+        worker.process.join()
+        code = worker.process.exitcode
+        worker.process = None
+        if self.stopping:
+            return
+        now = time.monotonic()
+        uptime = now - worker.started
+        worker.delay = 0 if uptime >= MIN_UPTIME else min(max(worker.delay * 2, 1), MAX_RESTART_DELAY)
+        worker.restart_at = now + worker.delay
+        self.restarts += 1
+        print(f"[-] {worker.name} exited with code {code} after {uptime:.0f}s, "
+              f"restarting in {worker.delay}s")
+
+    def stop(self, signum=None, frame=None):
+        if self.stopping:
+            return
+        print("[!] Stopping workers")
+        self.stopping = True
+        self.stop_deadline = time.monotonic() + STOP_TIMEOUT
+        for worker in self.workers:
+            if worker.process is not None:
+                worker.process.terminate()
+
+    def run(self):
+        """Start the workers and supervise them until stopped"""
+        self.sink = self.sink or log_sink.get_sink()
+        if any(w.service == 'ssh' for w in self.workers):
+            # Load or generate the host keys once, before forking
+            importlib.import_module('ssh_async' if settings.SSH_BACKEND == 'asyncssh' else 'ssh_honeypot')
+        engine.raise_fd_limit()
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for worker in self.workers:
+            self.start(worker)
+        print(f"[+] Supervising {len(self.workers)} workers ({self.count} per service)")
+
+        while True:
+            live = [w for w in self.workers if w.process is not None]
+            if self.stopping and not live:
+                break
+            if self.stopping and time.monotonic() > self.stop_deadline:
+                for worker in live:
+                    worker.process.kill()
+
+            pipes = {w.conn: w for w in live if w.conn is not None}
+            sentinels = {w.process.sentinel: w for w in live}
+            timeout = 1.0
+            pending = [w.restart_at for w in self.workers if w.restart_at is not None]
+            if pending and not self.stopping:
+                timeout = min(timeout, max(min(pending) - time.monotonic(), 0))
+            for ready in wait(list(pipes) + list(sentinels), timeout):
+                if ready in pipes:
+                    self.receive(pipes[ready])
+                else:
+                    self.reap(sentinels[ready])
+
+            now = time.monotonic()
+            for worker in self.workers:
+                if not self.stopping and worker.restart_at is not None and worker.restart_at <= now:
+                    self.start(worker)
+
+        self.sink.flush()
+        print(f"[+] All workers stopped ({self.restarts} restarts)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run honeypot services in several worker processes")
+    parser.add_argument('--services', default='ftp,telnet,ssh,web',
+                        help="comma separated list of services (ftp, telnet, ssh, web)")
+    parser.add_argument('--workers', type=int, default=settings.WORKERS,
+                        help="worker processes per service (default: one per CPU)")
+    parser.add_argument('--host', default=engine.LISTEN_HOST)
+    parser.add_argument('--no-admission', action='store_true',
+                        help="accept every connection (no rate limits or session caps)")
+    args = parser.parse_args()
+    services = [s.strip() for s in args.services.split(',') if s.strip()]
+    Supervisor(services, args.workers, args.host, not args.no_admission).run()
+
+
+if __name__ == '__main__':
+    main()
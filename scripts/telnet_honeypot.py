@@ -1,22 +1,18 @@
 #!/usr/bin/env python3
-import socket
-import threading
+import asyncio
 import datetime
-import json
-import os
 import re
 
+from log_sink import log_event
 
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-LOGS_DIR = os.path.join(BASE_DIR, 'logs')
 TELNET_PORT = 2323
+IDLE_TIMEOUT = 300
 
-def handle_client(client_socket, addr):
-    client_ip = addr[0]
-    client_port = addr[1]
+async def handle_client(reader, writer):
+    client_ip, client_port = writer.get_extra_info('peername')[:2]
 
 
-    client_socket.send(b"\r\nLogin: ")
+    writer.write(b"\r\nLogin: ")
 
     username = ""
     password = ""
@@ -24,7 +20,7 @@ def handle_client(client_socket, addr):
 
     try:
         while True:
-            data = client_socket.recv(1024)
+            data = await asyncio.wait_for(reader.read(1024), IDLE_TIMEOUT)
             if not data:
                 break
 
@@ -34,7 +30,7 @@ def handle_client(client_socket, addr):
 
             if login_stage == "username":
                 username = text
-                client_socket.send(b"Password: ")
+                writer.write(b"Password: ")
                 login_stage = "password"
             elif login_stage == "password":
                 password = text
@@ -49,41 +45,27 @@ def handle_client(client_socket, addr):
                     "service": "telnet"
                 }
 
-                with open(os.path.join(LOGS_DIR, 'auth_attempts.json'), "a") as f:
-                    f.write(json.dumps(log_entry) + "\n")
+                log_event('auth_attempts.json', log_entry)
 
                 print(f"[+] Telnet login attempt: {username}:{password} from {client_ip}")
 
-                client_socket.send(b"\r\nLogin incorrect\r\n")
-                time.sleep(1) 
-                client_socket.close()
+                writer.write(b"\r\nLogin incorrect\r\n")
+                await writer.drain()
+                await asyncio.sleep(1)
                 break
-                login_stage="username"
 
+            await writer.drain()
+
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
     except Exception as e:
         print(f"[-] Error: {e}")
     finally:
-        client_socket.close()
+        writer.close()
 
 def main():
-    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-
-    server.bind(('0.0.0.0', TELNET_PORT))
-    server.listen(5)
-
-    print(f"[+] Telnet honeypot listening on port {TELNET_PORT}")
-
-    try:
-        while True:
-            client, addr = server.accept()
-            client_handler = threading.Thread(target=handle_client, args=(client, addr))
-            client_handler.daemon = True
-            client_handler.start()
-    except KeyboardInterrupt:
-        print("[!] Shutting down Telnet honeypot")
-    finally:
-        server.close()
+    import engine
+    engine.run(['telnet'])
 
 if __name__ == "__main__":
     main()
@@ -2,15 +2,13 @@
 
 from flask import Flask, request, render_template_string, redirect
 import datetime
-import json
-import os
 
-
-if not os.path.exists("../logs"):
-    os.makedirs("../logs")
+from log_sink import log_event, exit_on_sigterm
 
 app = Flask(__name__)
 
+WEB_PORT = 8080
+
 
 LOGIN_PAGE = '''
 <!DOCTYPE html>
@@ -54,8 +52,7 @@ def home():
         "service": "web"
     }
 
-    with open("../logs/web_visits.json", "a") as f:
-        f.write(json.dumps(log_entry) + "\n")
+    log_event('web_visits.json', log_entry)
 
     print(f"[+] Web visit from {request.remote_addr} to {request.path}")
 
@@ -75,13 +72,24 @@ def login():
         "user_agent": request.headers.get('User-Agent', ''),
         "service": "web_login"
     }
-    with open("../logs/auth_attempts.json", "a") as f:
-        f.write(json.dumps(log_entry) + "\n")
+    log_event('auth_attempts.json', log_entry)
 
     print(f"[+] Web login attempt: {username}:{password} from {request.remote_addr}")
 
 
     return render_template_string(LOGIN_PAGE, error="Invalid username or password")
 
+def serve(host='0.0.0.0', port=WEB_PORT, reuse_port=False):
+    """Serve the app with werkzeug's threaded server on our own listening
+    socket, so several processes can share the port"""
+    from engine import http_server
+    server = http_server(app, port, host, reuse_port)
+    print(f"[+] WEB honeypot listening on port {port}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=8080, debug=False)
+    exit_on_sigterm()
+    app.run(host='0.0.0.0', port=WEB_PORT, debug=False)